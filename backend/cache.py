@@ -1,16 +1,17 @@
-import copy
 import hashlib
 import json
 import logging
 import os
 import threading
 from datetime import datetime, timedelta, timezone
-from decimal import Decimal
 from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from psycopg2.extras import Json
-
+from cache_l1 import l1_available, l1_cache
+from frozen import freeze, thaw
+from json_utils import Json
+from meta_rate_limit import PRIORITY_WARMUP, current_priority, request_priority
 from postgres_client import get_postgres_client
+from singleflight import SingleFlight
 
 PostgresClient = Any
 
@@ -42,6 +43,7 @@ PLATFORM_TABLES: Dict[str, str] = {
 
 _refresh_lock = threading.Lock()
 _refreshing_keys: set[str] = set()
+_refresh_flight = SingleFlight("cache_refresh")
 
 
 def get_table_name(platform: Optional[str] = "instagram") -> str:
@@ -95,19 +97,6 @@ def _make_extra(extra: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
     return json.loads(json.dumps(extra, sort_keys=True))
 
 
-def _sanitize_json(value: Any) -> Any:
-    if isinstance(value, Decimal):
-        try:
-            return float(value)
-        except (TypeError, ValueError):
-            return None
-    if isinstance(value, dict):
-        return {key: _sanitize_json(val) for key, val in value.items()}
-    if isinstance(value, list):
-        return [_sanitize_json(item) for item in value]
-    return value
-
-
 def _compute_cache_key(
     resource: str,
     owner_id: str,
@@ -156,11 +145,12 @@ def _format_timestamp(value: Optional[Any]) -> Optional[str]:
     return str(value)
 
 
-def _clone_payload(payload: Any) -> Any:
-    try:
-        return copy.deepcopy(payload)
-    except Exception:  # noqa: BLE001
-        return payload
+def _read_payload(payload: Any, mutable: bool = False) -> Any:
+    """
+    Payload entregue ao chamador: por padrão a versão somente leitura (sem cópia quando já
+    está congelada no L1); com mutable=True, uma cópia profunda alterável.
+    """
+    return thaw(payload) if mutable else freeze(payload)
 
 
 def _get_postgres_client() -> Optional[PostgresClient]:
@@ -178,14 +168,37 @@ def _select_entry(client: PostgresClient, table_name: str, cache_key: str) -> Op
     return data[0] if data else None
 
 
+def _entry_version(record: Dict[str, Any]) -> Optional[float]:
+    updated_at = _parse_dt(record.get("updated_at"))
+    return updated_at.timestamp() if updated_at else None
+
+
+def _load_entry(client: PostgresClient, table_name: str, cache_key: str) -> Optional[Dict[str, Any]]:
+    """
+    Lê a entrada do L1 em memória e, na falta dela, do Postgres (populando o L1).
+    """
+    use_l1 = l1_available()
+    if use_l1:
+        cached = l1_cache.get(table_name, cache_key)
+        if cached is not None:
+            return cached
+        generation = l1_cache.generation()
+    stored = _select_entry(client, table_name, cache_key)
+    if stored:
+        stored["payload"] = freeze(stored.get("payload"))
+    if use_l1 and stored:
+        l1_cache.put(table_name, cache_key, stored, _entry_version(stored), since_generation=generation)
+    return stored
+
+
 def _persist_entry(client: PostgresClient, table_name: str, record: Dict[str, Any]) -> None:
     serialized = dict(record)
     extra_value = serialized.get("extra")
     if extra_value is not None:
-        serialized["extra"] = Json(_sanitize_json(extra_value))
+        serialized["extra"] = Json(extra_value)
     payload_value = serialized.get("payload")
     if payload_value is not None:
-        serialized["payload"] = Json(_sanitize_json(payload_value))
+        serialized["payload"] = Json(payload_value)
     try:
         client.table(table_name).upsert(serialized, on_conflict="cache_key").execute()
     except Exception as err:  # noqa: BLE001
@@ -198,6 +211,7 @@ def get_latest_cached_payload(
     owner_id: Optional[str],
     extra: Optional[Dict[str, Any]] = None,
     platform: str = "instagram",
+    mutable: bool = False,
 ) -> Optional[Tuple[Any, Dict[str, Any]]]:
     """
     Recupera a entrada mais recente armazenada no cache para o recurso/owner fornecido.
@@ -206,6 +220,7 @@ def get_latest_cached_payload(
         resource: Nome do recurso (por exemplo, "instagram_metrics").
         owner_id: Identificador do recurso (por exemplo, ID do Instagram).
         extra: Parâmetros extras que compõem a chave (opcional).
+        mutable: Devolve uma cópia alterável em vez do payload somente leitura.
 
     Returns:
         Tuple contendo (payload, metadata) ou None caso não exista cache disponível.
@@ -225,7 +240,7 @@ def get_latest_cached_payload(
 
     normalized_extra = _make_extra(extra)
     if normalized_extra:
-        query = query.eq("extra", Json(_sanitize_json(normalized_extra)))
+        query = query.eq("extra", Json(normalized_extra))
 
     try:
         response = query.order("fetched_at", desc=True).limit(1).execute()
@@ -238,17 +253,25 @@ def get_latest_cached_payload(
         return None
 
     record = data[0]
-    payload = _clone_payload(record.get("payload"))
+    payload = _read_payload(record.get("payload"), mutable)
     metadata = _build_metadata(record, stale=True, source="cache-fallback")
     metadata["fallback"] = True
     metadata["platform"] = platform
     return payload, metadata
 
 
+def _is_stale(record: Dict[str, Any], now: datetime) -> bool:
+    fetched_at = _parse_dt(record.get("fetched_at"))
+    ttl_hours = int(record.get("ttl_hours") or DEFAULT_TTL_HOURS)
+    stale_threshold = fetched_at + timedelta(hours=ttl_hours) if fetched_at else None
+    return bool(stale_threshold and stale_threshold <= now)
+
+
 def _build_metadata(record: Dict[str, Any], stale: bool, source: str) -> Dict[str, Any]:
     return {
         "cache_key": record.get("cache_key"),
         "fetched_at": _format_timestamp(record.get("fetched_at")),
+        "updated_at": _format_timestamp(record.get("updated_at")),
         "next_refresh_at": _format_timestamp(record.get("next_refresh_at")),
         "stale": stale,
         "source": source,
@@ -275,7 +298,7 @@ def _refresh_cache_entry(
     refresh_reason: Optional[str],
     stored: Optional[Dict[str, Any]],
 ) -> Tuple[Any, Dict[str, Any]]:
-    payload = fetcher(owner_id, since_ts_requested, until_ts_requested, extra)
+    payload = freeze(fetcher(owner_id, since_ts_requested, until_ts_requested, extra))
     now = datetime.now(timezone.utc)
     fetched_at_iso = now.isoformat()
     expires_at_iso = (now + timedelta(hours=DEFAULT_TTL_HOURS)).isoformat()
@@ -301,6 +324,8 @@ def _refresh_cache_entry(
     }
 
     _persist_entry(db_client, table_name, record)
+    if l1_available():
+        l1_cache.put(table_name, cache_key, record, _entry_version(record))
     metadata = _build_metadata(record, stale=False, source="refresh" if stored else "prime")
     return payload, metadata
 
@@ -320,21 +345,25 @@ def _schedule_background_refresh(
 ) -> None:
     def run() -> None:
         try:
-            _refresh_cache_entry(
-                db_client,
-                table_name,
-                cache_key,
-                resource,
-                owner_id,
-                since_ts_requested,
-                until_ts_requested,
-                cache_since_ts,
-                cache_until_ts,
-                extra,
-                fetcher,
-                refresh_reason="auto-stale",
-                stored=_select_entry(db_client, table_name, cache_key),
-            )
+            with request_priority(PRIORITY_WARMUP):
+                _refresh_flight.do(
+                    (table_name, cache_key, current_priority()),
+                    lambda: _refresh_cache_entry(
+                        db_client,
+                        table_name,
+                        cache_key,
+                        resource,
+                        owner_id,
+                        since_ts_requested,
+                        until_ts_requested,
+                        cache_since_ts,
+                        cache_until_ts,
+                        extra,
+                        fetcher,
+                        refresh_reason="auto-stale",
+                        stored=_select_entry(db_client, table_name, cache_key),
+                    ),
+                )
             logger.info("Cache %s atualizado em segundo plano.", cache_key)
         except Exception as err:  # noqa: BLE001
             logger.exception("Falha ao atualizar cache %s em segundo plano: %s", cache_key, err)
@@ -362,9 +391,14 @@ def get_cached_payload(
     force: bool = False,
     refresh_reason: Optional[str] = None,
     platform: str = "instagram",
+    mutable: bool = False,
 ) -> Tuple[Any, Dict[str, Any]]:
     """
     Recupera dados do cache armazenado no Postgres, buscando na Graph API se necessário.
+
+    O payload devolvido é somente leitura (frozen.FrozenDict/FrozenList) e pode ser o mesmo
+    objeto entregue a outras requisições. Para enriquecer, copie o topo com dict(payload);
+    para alterar estruturas internas, passe mutable=True.
     """
     db_client = _get_postgres_client()
     fetcher = fetcher or FETCHERS.get(resource)
@@ -388,7 +422,7 @@ def get_cached_payload(
             "last_refresh_error": None,
             "platform": platform,
         }
-        return _clone_payload(payload), meta
+        return _read_payload(payload, mutable), meta
 
     requested_since_ts = _normalize_ts(since_ts)
     requested_until_ts = _normalize_ts(until_ts)
@@ -398,14 +432,11 @@ def get_cached_payload(
 
     table_name = get_table_name(platform)
     cache_key = _compute_cache_key(resource, owner_id, cache_since_ts, cache_until_ts, extra)
-    stored = _select_entry(db_client, table_name, cache_key)
+    stored = _load_entry(db_client, table_name, cache_key)
     now = datetime.now(timezone.utc)
 
     if stored and not force:
-        fetched_at = _parse_dt(stored.get("fetched_at"))
-        ttl_hours = int(stored.get("ttl_hours") or DEFAULT_TTL_HOURS)
-        stale_threshold = fetched_at + timedelta(hours=ttl_hours) if fetched_at else None
-        is_stale = bool(stale_threshold and stale_threshold <= now)
+        is_stale = _is_stale(stored, now)
 
         if is_stale:
             _schedule_background_refresh(
@@ -425,25 +456,84 @@ def get_cached_payload(
         source = "stale" if is_stale else "cache"
         metadata = _build_metadata(stored, stale=is_stale, source=source)
         metadata["platform"] = platform
-        return _clone_payload(stored.get("payload")), metadata
+        return _read_payload(stored.get("payload"), mutable), metadata
+
+    # Vários cards pedindo o mesmo recurso ao mesmo tempo aguardam uma única atualização.
+    # A prioridade entra na chave para que uma requisição interativa não espere um refresh em
+    # segundo plano (warmup/ingestão), que pode aguardar o orçamento da Graph API por minutos.
+    payload, metadata = _refresh_flight.do(
+        (table_name, cache_key, current_priority()),
+        lambda: _refresh_cache_entry(
+            db_client,
+            table_name,
+            cache_key,
+            resource,
+            owner_id,
+            requested_since_ts,
+            requested_until_ts,
+            cache_since_ts,
+            cache_until_ts,
+            extra,
+            fetcher,
+            refresh_reason,
+            stored,
+        ),
+        clone=lambda result: (result[0], dict(result[1])),
+    )
+    metadata["platform"] = platform
+    return _read_payload(payload, mutable), metadata
+
+
+def peek_cache_validator(
+    resource: str,
+    owner_id: str,
+    since_ts: Optional[int] = None,
+    until_ts: Optional[int] = None,
+    extra: Optional[Dict[str, Any]] = None,
+    platform: str = "instagram",
+) -> Optional[Dict[str, Any]]:
+    """
+    Metadados que identificam a versão da entrada (cache_key, fetched_at, updated_at,
+    next_refresh_at, stale),
+    lidos do L1 ou só das colunas de controle no Postgres, sem carregar o payload.
+    Usado para responder If-None-Match antes de montar a resposta. None quando não há entrada.
+    """
+    db_client = _get_postgres_client()
+    if db_client is None:
+        return None
 
-    payload, metadata = _refresh_cache_entry(
-        db_client,
-        table_name,
-        cache_key,
+    table_name = get_table_name(platform)
+    cache_key = _compute_cache_key(
         resource,
         owner_id,
-        requested_since_ts,
-        requested_until_ts,
-        cache_since_ts,
-        cache_until_ts,
-        extra,
-        fetcher,
-        refresh_reason,
-        stored,
+        _bucket_ts(_normalize_ts(since_ts)),
+        _bucket_ts(_normalize_ts(until_ts)),
+        _make_extra(extra),
     )
-    metadata["platform"] = platform
-    return _clone_payload(payload), metadata
+    record = l1_cache.get(table_name, cache_key) if l1_available() else None
+    if record is None:
+        try:
+            response = (
+                db_client.table(table_name)
+                .select("cache_key,fetched_at,updated_at,next_refresh_at,ttl_hours")
+                .eq("cache_key", cache_key)
+                .limit(1)
+                .execute()
+            )
+        except Exception as err:  # noqa: BLE001
+            logger.error("Falha ao consultar metadados do cache: %s", err)
+            return None
+        data = getattr(response, "data", None) or []
+        record = data[0] if data else None
+    if not record:
+        return None
+    return {
+        "cache_key": cache_key,
+        "fetched_at": _format_timestamp(record.get("fetched_at")),
+        "updated_at": _format_timestamp(record.get("updated_at")),
+        "next_refresh_at": _format_timestamp(record.get("next_refresh_at")),
+        "stale": _is_stale(record, datetime.now(timezone.utc)),
+    }
 
 
 def mark_cache_error(
@@ -470,6 +560,7 @@ def mark_cache_error(
     record = _select_entry(db_client, table_name, cache_key)
     if not record:
         return
+    l1_cache.invalidate(table_name, cache_key)
     try:
         db_client.table(table_name).update(
             {
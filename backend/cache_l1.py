@@ -0,0 +1,207 @@
+# backend/cache_l1.py
+"""
+Cache L1 em memória (por processo) na frente das tabelas ig_cache/fb_cache/ads_cache.
+
+LRU limitado por bytes (tamanho aproximado do JSON do payload). A invalidação entre
+processos (workers do gunicorn, scheduler) usa LISTEN/NOTIFY: as tabelas de cache
+têm um trigger que publica "tabela|cache_key|updated_at" em CACHE_L1_NOTIFY_CHANNEL.
+Sem o listener conectado o L1 fica desligado e toda leitura vai ao Postgres.
+"""
+
+import logging
+import os
+import select
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from db import connect_dedicated
+from json_utils import dumps_bytes
+
+logger = logging.getLogger(__name__)
+
+CACHE_L1_ENABLED = os.getenv("CACHE_L1_ENABLED", "1") != "0"
+CACHE_L1_MAX_BYTES = int(os.getenv("CACHE_L1_MAX_BYTES", str(64 * 1024 * 1024)))
+# Entradas maiores que esta fração do limite não entram no L1 (evita expulsar todo o resto).
+CACHE_L1_MAX_ENTRY_FRACTION = 0.25
+CACHE_L1_NOTIFY_CHANNEL = "meta_cache_invalidate"
+LISTEN_POLL_SECONDS = 30.0
+
+_Key = Tuple[str, str]
+
+
+class _Entry:
+    __slots__ = ("record", "version", "size")
+
+    def __init__(self, record: Dict[str, Any], version: Optional[float], size: int):
+        self.record = record
+        self.version = version
+        self.size = size
+
+
+class L1Cache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[_Key, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._generation = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0, "skipped_puts": 0}
+
+    def generation(self) -> int:
+        """Marca o início de uma leitura no Postgres; ver put(since_generation=...)."""
+        with self._lock:
+            return self._generation
+
+    def get(self, table_name: str, cache_key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get((table_name, cache_key))
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end((table_name, cache_key))
+            self._stats["hits"] += 1
+            return entry.record
+
+    def put(
+        self,
+        table_name: str,
+        cache_key: str,
+        record: Dict[str, Any],
+        version: Optional[float],
+        since_generation: Optional[int] = None,
+    ) -> None:
+        try:
+            # x2: o payload servido também guarda seus fragmentos JSON (json_response).
+            size = 2 * len(dumps_bytes(record.get("payload"))) + len(cache_key)
+        except (TypeError, ValueError):
+            return
+        key = (table_name, cache_key)
+        with self._lock:
+            if size > self.max_bytes * CACHE_L1_MAX_ENTRY_FRACTION:
+                self._stats["skipped_puts"] += 1
+                return
+            if since_generation is not None and since_generation != self._generation:
+                # Houve invalidação durante a leitura: o registro lido pode já estar velho.
+                self._stats["skipped_puts"] += 1
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[key] = _Entry(record, version, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self._stats["evictions"] += 1
+
+    def invalidate(self, table_name: str, cache_key: str, version: Optional[float] = None) -> None:
+        key = (table_name, cache_key)
+        with self._lock:
+            self._generation += 1
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            if version is not None and entry.version is not None and abs(entry.version - version) < 0.001:
+                # Notificação da própria escrita que já está no L1.
+                return
+            del self._entries[key]
+            self._bytes -= entry.size
+            self._stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+l1_cache = L1Cache(CACHE_L1_MAX_BYTES)
+
+_listener_ready = threading.Event()
+_listener_lock = threading.Lock()
+_listener_pid: Optional[int] = None
+
+
+def _handle_notification(payload: str) -> None:
+    table_name, _, rest = (payload or "").partition("|")
+    cache_key, _, version_raw = rest.rpartition("|")
+    if not table_name or not cache_key:
+        return
+    try:
+        version = float(version_raw) if version_raw else None
+    except ValueError:
+        version = None
+    l1_cache.invalidate(table_name, cache_key, version)
+
+
+def _listen_forever() -> None:
+    backoff = 1.0
+    while True:
+        conn = None
+        try:
+            conn = connect_dedicated()
+            if conn is None:
+                return
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {CACHE_L1_NOTIFY_CHANNEL}")
+            _listener_ready.set()
+            backoff = 1.0
+            logger.info("Cache L1 ativo (LISTEN %s).", CACHE_L1_NOTIFY_CHANNEL)
+            while True:
+                if select.select([conn], [], [], LISTEN_POLL_SECONDS) == ([], [], []):
+                    # Sem notificações: confirma que a conexão segue viva.
+                    with conn.cursor() as cur:
+                        cur.execute("SELECT 1")
+                else:
+                    conn.poll()
+                while conn.notifies:
+                    _handle_notification(conn.notifies.pop(0).payload)
+        except Exception as err:  # noqa: BLE001
+            logger.warning("Listener do cache L1 caiu (%s). Reconectando em %.0fs.", err, backoff)
+        finally:
+            # Notificações podem ter sido perdidas: nada do L1 é confiável até reconectar.
+            _listener_ready.clear()
+            l1_cache.clear()
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:  # noqa: BLE001
+                    pass
+        time.sleep(backoff)
+        backoff = min(backoff * 2, 60.0)
+
+
+def l1_available() -> bool:
+    """True quando o L1 pode ser usado neste processo (inicia o listener na primeira chamada)."""
+    global _listener_pid
+    if not CACHE_L1_ENABLED:
+        return False
+    pid = os.getpid()
+    if _listener_pid != pid:
+        with _listener_lock:
+            if _listener_pid != pid:
+                # Após fork (gunicorn) a thread do pai não existe no filho.
+                _listener_pid = pid
+                _listener_ready.clear()
+                l1_cache.clear()
+                threading.Thread(target=_listen_forever, name="cache-l1-listener", daemon=True).start()
+    return _listener_ready.is_set()
+
+
+def get_l1_stats() -> Dict[str, Any]:
+    stats = l1_cache.stats()
+    stats["enabled"] = CACHE_L1_ENABLED
+    stats["listening"] = _listener_ready.is_set()
+    return stats
@@ -2,36 +2,211 @@ from __future__ import annotations
 
 import os
 import threading
+import time
+from collections import deque
 from contextlib import contextmanager
 from typing import Any, Iterable, Mapping, Optional, Sequence, Union
 
 import psycopg2
 from psycopg2 import sql
 from psycopg2 import pool as pg_pool
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
 from psycopg2.extras import RealDictCursor
 
 PoolQuery = Union[str, sql.Composable]
 
 
-class _ConnectionPoolWrapper:
+POOL_TIMEOUT_SECONDS = float(os.getenv("DATABASE_POOL_TIMEOUT", "10"))
+POOL_MAX_LIFETIME_SECONDS = float(os.getenv("DATABASE_POOL_MAX_LIFETIME", "1800"))
+# Conexões paradas há mais que isso recebem um SELECT 1 antes de voltar ao uso.
+POOL_CHECK_IDLE_SECONDS = float(os.getenv("DATABASE_POOL_CHECK_IDLE", "30"))
+
+
+class PoolTimeout(pg_pool.PoolError):
+    """Nenhuma conexão ficou livre dentro de DATABASE_POOL_TIMEOUT."""
+
+
+class _PooledConnection:
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn: Any):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
     """
-    Pequeno adaptador para expor uma API compatível com psycopg_pool.ConnectionPool
-    usando psycopg2.pool.SimpleConnectionPool sob o capô.
+    Pool de conexões psycopg2 seguro entre threads (gunicorn gthread + threads de refresh).
+
+    - Esgotado, espera até `timeout` segundos por uma conexão (PoolTimeout depois disso).
+    - Na retirada descarta conexões fechadas, vencidas (`max_lifetime`) e, se paradas há
+      mais de `check_idle` segundos, que não respondem a SELECT 1.
+    - Na devolução desfaz transações abertas ou abortadas, para que a próxima requisição
+      não herde um estado "idle in transaction".
     """
 
-    def __init__(self, min_size: int, max_size: int, conninfo: Mapping[str, Any]):
-        self._pool = pg_pool.SimpleConnectionPool(min_size, max_size, **conninfo)
+    def __init__(
+        self,
+        min_size: int,
+        max_size: int,
+        conninfo: Mapping[str, Any],
+        timeout: float = POOL_TIMEOUT_SECONDS,
+        max_lifetime: float = POOL_MAX_LIFETIME_SECONDS,
+        check_idle: float = POOL_CHECK_IDLE_SECONDS,
+    ):
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check_idle = check_idle
+        self._conninfo = dict(conninfo)
+        self._cond = threading.Condition(threading.Lock())
+        self._idle: "deque[_PooledConnection]" = deque()
+        self._owners: dict[int, _PooledConnection] = {}
+        self._size = 0
+        self._waiting = 0
+        self._stats = {
+            "checkouts": 0,
+            "timeouts": 0,
+            "created": 0,
+            "discarded": 0,
+            "rolled_back": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+        }
+        for _ in range(self.min_size):
+            pooled = self._open()
+            with self._cond:
+                self._size += 1
+                self._idle.append(pooled)
+
+    def _open(self) -> _PooledConnection:
+        conn = psycopg2.connect(**self._conninfo)
+        with self._cond:
+            self._stats["created"] += 1
+        return _PooledConnection(conn)
+
+    def _close(self, pooled: _PooledConnection) -> None:
+        try:
+            pooled.conn.close()
+        except Exception:  # noqa: BLE001
+            pass
+        with self._cond:
+            self._size -= 1
+            self._stats["discarded"] += 1
+            self._cond.notify()
+
+    def _usable(self, pooled: _PooledConnection) -> bool:
+        conn = pooled.conn
+        now = time.monotonic()
+        if conn.closed or now - pooled.created_at > self.max_lifetime:
+            return False
+        if conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            return False
+        if now - pooled.last_used > self.check_idle:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                conn.rollback()
+            except Exception:  # noqa: BLE001
+                return False
+        return True
+
+    def getconn(self) -> Any:
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            pooled: Optional[_PooledConnection] = None
+            with self._cond:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(
+                            f"nenhuma conexão livre em {self.timeout:.0f}s (max_size={self.max_size})"
+                        )
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+                if self._idle:
+                    pooled = self._idle.pop()
+                else:
+                    self._size += 1
+            if pooled is None:
+                try:
+                    pooled = self._open()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._usable(pooled):
+                self._close(pooled)
+                continue
+            waited = time.monotonic() - started
+            with self._cond:
+                self._owners[id(pooled.conn)] = pooled
+                self._stats["checkouts"] += 1
+                self._stats["wait_seconds_total"] += waited
+                self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], waited)
+            return pooled.conn
+
+    def putconn(self, conn: Any) -> None:
+        with self._cond:
+            pooled = self._owners.pop(id(conn), None)
+        if pooled is None:
+            return
+        if not conn.closed and conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+                with self._cond:
+                    self._stats["rolled_back"] += 1
+            except Exception:  # noqa: BLE001
+                pass
+        if (
+            conn.closed
+            or conn.get_transaction_status() != TRANSACTION_STATUS_IDLE
+            or time.monotonic() - pooled.created_at > self.max_lifetime
+        ):
+            self._close(pooled)
+            return
+        pooled.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(pooled)
+            self._cond.notify()
 
     @contextmanager
     def connection(self):
-        conn = self._pool.getconn()
+        conn = self.getconn()
         try:
             yield conn
         finally:
-            self._pool.putconn(conn)
-
-
-_pool: Optional[_ConnectionPoolWrapper] = None
+            self.putconn(conn)
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            checkouts = self._stats["checkouts"]
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": len(self._owners),
+                "waiting": self._waiting,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "checkouts": checkouts,
+                "timeouts": self._stats["timeouts"],
+                "created": self._stats["created"],
+                "discarded": self._stats["discarded"],
+                "rolled_back": self._stats["rolled_back"],
+                "wait_ms_avg": round(self._stats["wait_seconds_total"] * 1000 / checkouts, 3) if checkouts else 0.0,
+                "wait_ms_max": round(self._stats["wait_seconds_max"] * 1000, 3),
+            }
+
+
+_pool: Optional[ConnectionPool] = None
 _lock = threading.Lock()
 
 
@@ -75,7 +250,7 @@ def _build_conninfo() -> Optional[Mapping[str, str]]:
     return conn_params
 
 
-def get_pool() -> Optional[_ConnectionPoolWrapper]:
+def get_pool() -> Optional[ConnectionPool]:
     global _pool
     if _pool is not None:
         return _pool
@@ -88,7 +263,7 @@ def get_pool() -> Optional[_ConnectionPoolWrapper]:
         if _pool is None:
             max_size = int(os.getenv("DATABASE_POOL_MAX", "10") or "10")
             min_size = int(os.getenv("DATABASE_POOL_MIN", "1") or "1")
-            _pool = _ConnectionPoolWrapper(
+            _pool = ConnectionPool(
                 min_size=min_size,
                 max_size=max_size,
                 conninfo=conninfo,
@@ -96,6 +271,13 @@ def get_pool() -> Optional[_ConnectionPoolWrapper]:
     return _pool
 
 
+def get_pool_stats() -> dict[str, Any]:
+    pool = _pool
+    if pool is None:
+        return {"configured": False}
+    return {"configured": True, **pool.stats()}
+
+
 def is_configured() -> bool:
     return get_pool() is not None
 
@@ -159,6 +341,16 @@ def execute_script(script: str) -> None:
         conn.commit()
 
 
+def connect_dedicated():
+    """
+    Abre uma conexão fora do pool (ex.: LISTEN de longa duração). Cabe ao chamador fechá-la.
+    """
+    conninfo = _build_conninfo()
+    if not conninfo:
+        return None
+    return psycopg2.connect(**conninfo)
+
+
 def format_identifier(name: str) -> sql.Identifier:
     return sql.Identifier(name)
 
@@ -0,0 +1,88 @@
+# backend/frozen.py
+"""
+Payloads somente leitura para o cache.
+
+FrozenDict/FrozenList são subclasses de dict/list (jsonify e json.dumps funcionam
+sem conversão) que recusam qualquer alteração. Assim o mesmo objeto em cache pode
+ser entregue a várias requisições sem deepcopy: quem precisa enriquecer faz uma
+cópia rasa (dict(payload)) e troca só as chaves de topo; quem precisa alterar
+estruturas internas pede uma cópia mutável (thaw / mutable=True).
+"""
+
+from typing import Any
+
+
+def _readonly(self, *args: Any, **kwargs: Any) -> Any:
+    raise TypeError(
+        "payload em cache é somente leitura; use dict(payload) para uma cópia rasa "
+        "ou mutable=True para uma cópia alterável"
+    )
+
+
+class FrozenDict(dict):
+    # _json_fragments: JSON das chaves de topo, preenchido sob demanda por json_response.
+    __slots__ = ("_json_fragments",)
+
+    __setitem__ = _readonly
+    __delitem__ = _readonly
+    __ior__ = _readonly
+    clear = _readonly
+    pop = _readonly
+    popitem = _readonly
+    setdefault = _readonly
+    update = _readonly
+
+    def __copy__(self) -> dict:
+        return dict(self)
+
+    def __deepcopy__(self, memo: Any) -> dict:
+        return thaw(self)
+
+    def __reduce__(self) -> Any:
+        return (dict, (thaw(self),))
+
+
+class FrozenList(list):
+    __slots__ = ()
+
+    __setitem__ = _readonly
+    __delitem__ = _readonly
+    __iadd__ = _readonly
+    __imul__ = _readonly
+    append = _readonly
+    clear = _readonly
+    extend = _readonly
+    insert = _readonly
+    pop = _readonly
+    remove = _readonly
+    reverse = _readonly
+    sort = _readonly
+
+    def __copy__(self) -> list:
+        return list(self)
+
+    def __deepcopy__(self, memo: Any) -> list:
+        return thaw(self)
+
+    def __reduce__(self) -> Any:
+        return (list, (thaw(self),))
+
+
+def freeze(value: Any) -> Any:
+    """Converte dict/list (recursivamente) para as versões somente leitura. Idempotente."""
+    if isinstance(value, (FrozenDict, FrozenList)):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return FrozenList(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Cópia profunda mutável (dict/list comuns) de um payload congelado ou não."""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [thaw(item) for item in value]
+    return value
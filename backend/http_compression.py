@@ -0,0 +1,225 @@
+# backend/http_compression.py
+"""
+Compressão das respostas /api/* (zstd, brotli ou gzip, conforme o Accept-Encoding).
+
+- zstd e brotli só entram quando os pacotes `zstandard` / `brotli` estão instalados;
+  gzip está sempre disponível.
+- Respostas com ETag (entradas do cache, ver server._cache_etag): o resultado comprimido
+  fica num LRU em memória por (ETag, codificação, hash do corpo) e os próximos hits com o
+  mesmo corpo enviam os bytes prontos, sem comprimir de novo. O hash entra na chave porque
+  o ETag não cobre tudo o que vai no corpo; nunca se envia bytes de outro corpo.
+- O ETag forte ganha o sufixo da codificação ("<etag>-gzip"), já que os bytes enviados
+  mudam. O sufixo é removido do If-None-Match antes do handler, então as comparações
+  em server continuam usando o ETag base.
+"""
+
+import gzip
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from flask import Flask, Response, g, request
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli é opcional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard é opcional
+    zstandard = None
+
+HTTP_COMPRESSION_ENABLED = os.getenv("HTTP_COMPRESSION_ENABLED", "1") != "0"
+HTTP_COMPRESSION_MIN_BYTES = int(os.getenv("HTTP_COMPRESSION_MIN_BYTES", "1024"))
+HTTP_COMPRESSION_GZIP_LEVEL = int(os.getenv("HTTP_COMPRESSION_GZIP_LEVEL", "6"))
+HTTP_COMPRESSION_BROTLI_LEVEL = int(os.getenv("HTTP_COMPRESSION_BROTLI_LEVEL", "5"))
+HTTP_COMPRESSION_ZSTD_LEVEL = int(os.getenv("HTTP_COMPRESSION_ZSTD_LEVEL", "3"))
+HTTP_COMPRESSION_CACHE_MAX_BYTES = int(os.getenv("HTTP_COMPRESSION_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+COMPRESSIBLE_MIMETYPES = {"application/json", "text/plain", "text/csv", "text/html"}
+API_PREFIX = "/api/"
+
+
+def _gzip(data: bytes) -> bytes:
+    # mtime=0: mesmo corpo -> mesmos bytes (importante para o ETag por codificação).
+    return gzip.compress(data, compresslevel=HTTP_COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def _brotli(data: bytes) -> bytes:
+    return brotli.compress(data, quality=HTTP_COMPRESSION_BROTLI_LEVEL)
+
+
+def _zstd(data: bytes) -> bytes:
+    return zstandard.ZstdCompressor(level=HTTP_COMPRESSION_ZSTD_LEVEL).compress(data)
+
+
+# Ordem de preferência do servidor quando o cliente aceita várias com o mesmo peso.
+_CODECS: "OrderedDict[str, Callable[[bytes], bytes]]" = OrderedDict()
+if zstandard is not None:
+    _CODECS["zstd"] = _zstd
+if brotli is not None:
+    _CODECS["br"] = _brotli
+_CODECS["gzip"] = _gzip
+
+
+class _CompressedBodies:
+    """LRU (limitado por bytes) de corpos já comprimidos, por (ETag, codificação, hash do corpo)."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str, bytes], bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str, bytes]) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key: Tuple[str, str, bytes], body: bytes) -> None:
+        if len(body) > self.max_bytes // 4:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = body
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+_bodies = _CompressedBodies(HTTP_COMPRESSION_CACHE_MAX_BYTES)
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, int]] = {}
+
+
+def _record(coding: str, raw_size: int, sent_size: int, precompressed: bool) -> None:
+    with _stats_lock:
+        entry = _stats.setdefault(
+            coding, {"responses": 0, "precompressed_hits": 0, "bytes_in": 0, "bytes_out": 0}
+        )
+        entry["responses"] += 1
+        entry["precompressed_hits"] += int(precompressed)
+        entry["bytes_in"] += raw_size
+        entry["bytes_out"] += sent_size
+
+
+def negotiate(accept_encoding: Any) -> Optional[str]:
+    """Melhor codificação disponível para o Accept-Encoding (werkzeug Accept) da requisição."""
+    if not accept_encoding:
+        return None
+    coding = accept_encoding.best_match(list(_CODECS))
+    return coding if coding in _CODECS else None
+
+
+def strip_etag_suffix(etag: str) -> Tuple[str, Optional[str]]:
+    for coding in _CODECS:
+        suffix = f"-{coding}"
+        if etag.endswith(suffix):
+            return etag[: -len(suffix)], coding
+    return etag, None
+
+
+def _strip_if_none_match() -> None:
+    header = request.environ.get("HTTP_IF_NONE_MATCH")
+    if not header or not request.path.startswith(API_PREFIX):
+        return
+    stripped = []
+    for tag in header.split(","):
+        tag = tag.strip()
+        weak = tag.startswith("W/")
+        value = tag[2:] if weak else tag
+        if len(value) >= 2 and value.startswith('"') and value.endswith('"'):
+            base, coding = strip_etag_suffix(value[1:-1])
+            if coding:
+                g.etag_coding = coding
+            value = f'"{base}"'
+        stripped.append(f"W/{value}" if weak else value)
+    request.environ["HTTP_IF_NONE_MATCH"] = ", ".join(stripped)
+
+
+def _suffix_etag(response: Response, coding: str) -> Optional[str]:
+    etag, weak = response.get_etag()
+    if not etag:
+        return None
+    response.set_etag(f"{etag}-{coding}", weak=weak)
+    return etag
+
+
+def _compress_response(response: Response) -> Response:
+    if not HTTP_COMPRESSION_ENABLED or not request.path.startswith(API_PREFIX):
+        return response
+    response.vary.add("Accept-Encoding")
+    coding = negotiate(request.accept_encodings)
+    if response.status_code == 304:
+        # Devolve o ETag na forma que o cliente guardou.
+        echoed = getattr(g, "etag_coding", None)
+        if echoed:
+            _suffix_etag(response, echoed)
+        return response
+    if (
+        coding is None
+        or response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+    raw = response.get_data()
+    if len(raw) < HTTP_COMPRESSION_MIN_BYTES:
+        return response
+
+    base_etag = _suffix_etag(response, coding)
+    body_key = (base_etag, coding, hashlib.blake2b(raw, digest_size=16).digest()) if base_etag else None
+    body = _bodies.get(body_key) if body_key else None
+    precompressed = body is not None
+    if body is None:
+        try:
+            body = _CODECS[coding](raw)
+        except Exception as err:  # noqa: BLE001
+            logger.warning("Falha ao comprimir resposta (%s): %s", coding, err)
+            if base_etag:
+                response.set_etag(base_etag)
+            return response
+        if body_key:
+            _bodies.put(body_key, body)
+    response.set_data(body)
+    response.headers["Content-Encoding"] = coding
+    _record(coding, len(raw), len(body), precompressed)
+    return response
+
+
+def register_compression(app: Flask) -> None:
+    app.before_request(_strip_if_none_match)
+    app.after_request(_compress_response)
+
+
+def get_compression_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        codecs = {}
+        for coding, entry in _stats.items():
+            codecs[coding] = {
+                **entry,
+                "ratio": round(entry["bytes_out"] / entry["bytes_in"], 4) if entry["bytes_in"] else None,
+            }
+    return {
+        "enabled": HTTP_COMPRESSION_ENABLED,
+        "available": list(_CODECS),
+        "min_bytes": HTTP_COMPRESSION_MIN_BYTES,
+        "codecs": codecs,
+        "precompressed_cache": _bodies.stats(),
+    }
@@ -4,8 +4,7 @@ from datetime import datetime, timezone, date
 from typing import Any, Dict, Optional, Tuple
 from zoneinfo import ZoneInfo
 
-from psycopg2.extras import Json
-
+from json_utils import Json
 from postgres_client import get_postgres_client
 
 logger = logging.getLogger(__name__)
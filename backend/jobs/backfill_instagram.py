@@ -49,7 +49,7 @@ def _insert_log(account_id: str) -> Tuple[Optional[object], Optional[object]]:
         "error_message": None,
     }
     try:
-        response = client.table(INGEST_LOGS_TABLE).insert(record).execute()
+        response = client.table(INGEST_LOGS_TABLE).insert(record, returning="id").execute()
         data = getattr(response, "data", None) or []
         log_id = data[0].get("id") if data else None
         return client, log_id
@@ -0,0 +1,224 @@
+import argparse
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+CURRENT_DIR = os.path.dirname(__file__)
+BACKEND_ROOT = os.path.dirname(CURRENT_DIR)
+if BACKEND_ROOT not in sys.path:
+    sys.path.insert(0, BACKEND_ROOT)
+
+from jobs.instagram_comments_ingest import (
+    CommentBatchWriter,
+    CommentTables,
+    parse_timestamp,
+    reindex_comment_tokens,
+)
+from meta import MetaAPIError, gget, get_page_access_token
+from meta_rate_limit import PRIORITY_INGEST, request_priority
+
+logger = logging.getLogger(__name__)
+
+FB_COMMENTS_TABLE = "fb_comments"
+FB_COMMENTS_DAILY_TABLE = "fb_comments_daily"
+FB_COMMENT_TOKENS_TABLE = "fb_comment_tokens"
+FB_COMMENT_TABLES = CommentTables(FB_COMMENTS_TABLE, FB_COMMENTS_DAILY_TABLE, FB_COMMENT_TOKENS_TABLE)
+DEFAULT_DAYS_LOOKBACK = 30
+GRAPH_PAGE_LIMIT_POSTS = 100
+GRAPH_PAGE_LIMIT_COMMENTS = 100
+
+
+def graph_get(path: str, token: str, params: Optional[Dict[str, object]] = None) -> Dict[str, object]:
+    """
+    Wrapper around meta.gget at ingest priority, using the page access token.
+    """
+    with request_priority(PRIORITY_INGEST):
+        return gget(path, params=params, token=token)
+
+
+def iterate_posts(page_id: str, since_utc: datetime, token: str) -> Iterator[Dict[str, object]]:
+    """
+    Yield page posts created since since_utc (inclusive).
+    """
+    after: Optional[str] = None
+    while True:
+        params = {
+            "fields": "id,created_time",
+            "limit": GRAPH_PAGE_LIMIT_POSTS,
+            "since": int(since_utc.timestamp()),
+        }
+        if after:
+            params["after"] = after
+        payload = graph_get(f"/{page_id}/posts", token, params=params)
+        data = payload.get("data") or []
+        if not isinstance(data, list) or not data:
+            break
+
+        stop_paging = False
+        for post in data:
+            try:
+                timestamp = parse_timestamp(str(post.get("created_time") or ""))
+            except ValueError:
+                logger.debug("Skipping post without valid created_time: %s", post)
+                continue
+            if timestamp < since_utc:
+                stop_paging = True
+                continue
+            yield {"id": str(post.get("id")), "timestamp": timestamp}
+
+        paging = payload.get("paging") or {}
+        cursors = paging.get("cursors") or {}
+        after = cursors.get("after")
+        if stop_paging or not after:
+            break
+
+
+def iterate_post_comments(post_id: str, since_utc: datetime, token: str) -> Iterator[Dict[str, object]]:
+    """
+    Yield comments and replies of a post, newest first, until since_utc.
+    filter=stream returns replies in the same listing, so no per-comment reply walk is needed.
+    """
+    after: Optional[str] = None
+    while True:
+        params = {
+            "fields": "id,message,created_time,from,like_count",
+            "filter": "stream",
+            "order": "reverse_chronological",
+            "limit": GRAPH_PAGE_LIMIT_COMMENTS,
+        }
+        if after:
+            params["after"] = after
+        payload = graph_get(f"/{post_id}/comments", token, params=params)
+        data = payload.get("data") or []
+        if not isinstance(data, list) or not data:
+            break
+
+        stop_paging = False
+        for comment in data:
+            try:
+                timestamp = parse_timestamp(str(comment.get("created_time") or ""))
+            except ValueError:
+                logger.debug("Skipping comment without valid created_time: %s", comment)
+                continue
+            if timestamp < since_utc:
+                stop_paging = True
+                continue
+            yield {
+                "id": str(comment.get("id")),
+                "text": comment.get("message") or "",
+                "username": ((comment.get("from") or {}).get("name") or ""),
+                "timestamp": timestamp,
+                "like_count": int(comment.get("like_count") or 0),
+            }
+
+        paging = payload.get("paging") or {}
+        cursors = paging.get("cursors") or {}
+        after = cursors.get("after")
+        if stop_paging or not after:
+            break
+
+
+def normalize_comment_record(
+    page_id: str,
+    post_id: str,
+    comment: Dict[str, object],
+    fetched_at: datetime,
+) -> Optional[Dict[str, object]]:
+    """
+    Build a Postgres row for a Facebook comment or reply.
+    """
+    comment_id = str(comment.get("id") or "").strip()
+    text = (comment.get("text") or "").strip()
+    if not comment_id or not text:
+        return None
+    created_at = comment.get("timestamp")
+    if not isinstance(created_at, datetime):
+        return None
+    return {
+        "id": comment_id,
+        "account_id": page_id,
+        "post_id": post_id,
+        "username": (comment.get("username") or "").strip() or None,
+        "text": text,
+        "like_count": int(comment.get("like_count") or 0),
+        "timestamp": created_at.isoformat(),
+        "created_at": fetched_at.isoformat(),
+        "updated_at": fetched_at.isoformat(),
+    }
+
+
+def ingest_page_comments(page_id: str, days: int) -> Tuple[int, int, int]:
+    """
+    Fetch post comments for the given Facebook page and persist them.
+    """
+    start_ts = time.perf_counter()
+    since_utc = datetime.now(timezone.utc) - timedelta(days=days)
+    fetched_at = datetime.now(timezone.utc)
+    token = get_page_access_token(page_id)
+
+    writer = CommentBatchWriter(page_id, FB_COMMENT_TABLES)
+    total_posts = 0
+
+    for post in iterate_posts(page_id, since_utc, token):
+        post_id = post["id"]
+        total_posts += 1
+        logger.info("[fb-comments] Fetching comments for post %s (%s)", post_id, post["timestamp"].isoformat())
+        try:
+            for comment in iterate_post_comments(post_id, since_utc, token):
+                writer.add(normalize_comment_record(page_id, post_id, comment, fetched_at))
+        except MetaAPIError as err:
+            logger.warning("[fb-comments] Failed to fetch comments for post %s: %s", post_id, err)
+
+    writer.flush()
+    duration = time.perf_counter() - start_ts
+    logger.info(
+        "[fb-comments] %s: posts=%s total_comments=%s inserted=%s updated=%s duration=%.2fs",
+        page_id,
+        total_posts,
+        writer.total,
+        writer.inserted,
+        writer.updated,
+        duration,
+    )
+    return total_posts, writer.inserted, writer.updated
+
+
+def parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Ingest Facebook comments from recent page posts.")
+    parser.add_argument("--page", dest="page_ids", action="append", required=True, help="Facebook Page ID.")
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS_LOOKBACK, help="Lookback window in days (default: 30).")
+    parser.add_argument(
+        "--reindex-tokens",
+        action="store_true",
+        help="Only rebuild the comment search index (fb_comment_tokens) from stored comments.",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s :: %(message)s")
+    args = parse_args(argv)
+    days = max(1, args.days or DEFAULT_DAYS_LOOKBACK)
+    page_ids = [item.strip() for item in (args.page_ids or []) if item and item.strip()]
+    if not page_ids:
+        logger.error("No Facebook page IDs provided.")
+        return 1
+
+    exit_code = 0
+    for page_id in page_ids:
+        try:
+            if args.reindex_tokens:
+                reindex_comment_tokens(page_id, tables=FB_COMMENT_TABLES)
+            else:
+                ingest_page_comments(page_id, days=days)
+        except Exception:  # noqa: BLE001
+            logger.exception("Failed to ingest Facebook comments for %s", page_id)
+            exit_code = 1
+    return exit_code
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,33 +1,53 @@
 import argparse
 import logging
 import os
-import random
 import sys
+import threading
 import time
-from collections import defaultdict
-from datetime import datetime, timedelta, timezone
-from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
 
 CURRENT_DIR = os.path.dirname(__file__)
 BACKEND_ROOT = os.path.dirname(CURRENT_DIR)
 if BACKEND_ROOT not in sys.path:
     sys.path.insert(0, BACKEND_ROOT)
 
+from db import execute
 from meta import MetaAPIError, gget
+from meta_rate_limit import PRIORITY_INGEST, request_priority
 from postgres_client import get_postgres_client
+from wordcloud_text import count_wordcloud_tokens
 
 logger = logging.getLogger(__name__)
 
 IG_COMMENTS_TABLE = "ig_comments"
 IG_COMMENTS_DAILY_TABLE = "ig_comments_daily"
+IG_COMMENT_TOKENS_TABLE = "ig_comment_tokens"
+IG_COMMENT_SYNC_TABLE = "ig_media_comment_sync"
 DEFAULT_DAYS_LOOKBACK = 30
 GRAPH_PAGE_LIMIT_MEDIA = 100
 GRAPH_PAGE_LIMIT_COMMENTS = 50
 GRAPH_PAGE_LIMIT_REPLIES = 50
-RETRYABLE_STATUS = {429, 500, 502, 503, 504}
-OUTER_GRAPH_RETRIES = 5
-INITIAL_BACKOFF_SECONDS = 1.0
-MAX_BACKOFF_SECONDS = 32.0
+# Tokens mais frequentes guardados por dia em ig_comments_daily.word_freq.
+DAILY_WORD_FREQ_MAX_TOKENS = int(os.getenv("COMMENTS_DAILY_WORD_FREQ_MAX_TOKENS", "1000"))
+# Comentários acumulados em memória antes de cada gravação (e checkpoint) no banco.
+INGEST_FLUSH_SIZE = int(os.getenv("COMMENTS_INGEST_FLUSH_SIZE", "500"))
+# Contas e mídias processadas em paralelo pelo driver de ingestão (cada limite vale para o
+# processo inteiro; o ritmo das chamadas ao Graph segue o governador de meta_rate_limit).
+INGEST_ACCOUNT_CONCURRENCY = max(1, int(os.getenv("COMMENTS_INGEST_ACCOUNT_CONCURRENCY", "4")))
+INGEST_MEDIA_CONCURRENCY = max(1, int(os.getenv("COMMENTS_INGEST_MEDIA_CONCURRENCY", "8")))
+
+
+class CommentTables(NamedTuple):
+    """Tabelas de uma plataforma: comentários, agregado diário e índice de tokens."""
+
+    comments: str
+    daily: str
+    tokens: str
+
+
+IG_COMMENT_TABLES = CommentTables(IG_COMMENTS_TABLE, IG_COMMENTS_DAILY_TABLE, IG_COMMENT_TOKENS_TABLE)
 
 
 def parse_timestamp(value: str) -> datetime:
@@ -50,29 +70,11 @@ def parse_timestamp(value: str) -> datetime:
 
 def graph_get(path: str, params: Optional[Dict[str, object]] = None) -> Dict[str, object]:
     """
-    Wrapper around meta.gget that adds outer retries with jitter for rate limiting.
+    Wrapper around meta.gget at ingest priority: throttling and rate-limit retries
+    are handled by the shared governor in meta_rate_limit.
     """
-    backoff = INITIAL_BACKOFF_SECONDS
-    for attempt in range(OUTER_GRAPH_RETRIES):
-        try:
-            return gget(path, params=params)
-        except MetaAPIError as err:
-            if err.status in RETRYABLE_STATUS and attempt < OUTER_GRAPH_RETRIES - 1:
-                jitter = random.uniform(0, backoff)
-                sleep_for = backoff + jitter
-                logger.warning(
-                    "Graph API throttled (%s) on %s. Backing off %.2fs (attempt %s/%s).",
-                    err.status,
-                    path,
-                    sleep_for,
-                    attempt + 1,
-                    OUTER_GRAPH_RETRIES,
-                )
-                time.sleep(sleep_for)
-                backoff = min(backoff * 2, MAX_BACKOFF_SECONDS)
-                continue
-            raise
-    raise RuntimeError(f"Graph API retry exhaustion for {path}")
+    with request_priority(PRIORITY_INGEST):
+        return gget(path, params=params)
 
 
 def iterate_media(ig_user_id: str, since_utc: datetime) -> Iterator[Dict[str, object]]:
@@ -107,6 +109,7 @@ def iterate_media(ig_user_id: str, since_utc: datetime) -> Iterator[Dict[str, ob
                 "id": str(media.get("id")),
                 "caption": media.get("caption") or "",
                 "timestamp": timestamp,
+                "comments_count": media.get("comments_count"),
             }
 
         paging = payload.get("paging") or {}
@@ -116,11 +119,15 @@ def iterate_media(ig_user_id: str, since_utc: datetime) -> Iterator[Dict[str, ob
             break
 
 
-def iterate_comments(media_id: str, since_utc: datetime) -> Iterator[Dict[str, object]]:
+def iterate_comment_pages(
+    media_id: str,
+    since_utc: datetime,
+    after: Optional[str] = None,
+) -> Iterator[Tuple[List[Dict[str, object]], Optional[str]]]:
     """
-    Yield comment payloads for a given media filtered by timestamp.
+    Yield (comments, next_cursor) per Graph page for a given media, filtered by timestamp.
+    next_cursor is None on the last page; `after` resumes from a saved cursor.
     """
-    after: Optional[str] = None
     while True:
         params = {
             "fields": "id,text,username,timestamp,like_count,comment_count",
@@ -134,6 +141,7 @@ def iterate_comments(media_id: str, since_utc: datetime) -> Iterator[Dict[str, o
             break
 
         stop_paging = False
+        comments: List[Dict[str, object]] = []
         for comment in data:
             timestamp_raw = str(comment.get("timestamp") or "")
             try:
@@ -144,7 +152,7 @@ def iterate_comments(media_id: str, since_utc: datetime) -> Iterator[Dict[str, o
             if timestamp < since_utc:
                 stop_paging = True
                 continue
-            yield {
+            comments.append({
                 "id": str(comment.get("id")),
                 "text": comment.get("text") or "",
                 "username": comment.get("username") or "",
@@ -156,15 +164,24 @@ def iterate_comments(media_id: str, since_utc: datetime) -> Iterator[Dict[str, o
                     or (((comment.get("replies") or {}).get("summary") or {}).get("total_count"))
                     or 0
                 ),
-            }
+            })
 
         paging = payload.get("paging") or {}
         cursors = paging.get("cursors") or {}
-        after = cursors.get("after")
-        if stop_paging or not after:
+        after = None if stop_paging else cursors.get("after")
+        yield comments, after
+        if not after:
             break
 
 
+def iterate_comments(media_id: str, since_utc: datetime) -> Iterator[Dict[str, object]]:
+    """
+    Yield comment payloads for a given media filtered by timestamp.
+    """
+    for comments, _ in iterate_comment_pages(media_id, since_utc):
+        yield from comments
+
+
 def iterate_replies(comment_id: str, since_utc: datetime) -> Iterator[Dict[str, object]]:
     """
     Yield replies for a given comment filtered by timestamp.
@@ -242,33 +259,10 @@ def normalize_comment_record(
     return record
 
 
-def chunked(items: Sequence[Dict[str, object]], size: int) -> Iterable[Sequence[Dict[str, object]]]:
-    for index in range(0, len(items), size):
-        yield items[index:index + size]
-
-
-def fetch_existing_comment_ids(client, comment_ids: Sequence[str]) -> set[str]:
-    existing: set[str] = set()
-    if not comment_ids:
-        return existing
-    chunk_size = 500
-    for chunk_start in range(0, len(comment_ids), chunk_size):
-        chunk = comment_ids[chunk_start:chunk_start + chunk_size]
-        response = (
-            client.table(IG_COMMENTS_TABLE)
-            .select("id")
-            .in_("id", chunk)
-            .execute()
-        )
-        data = getattr(response, "data", None) or []
-        for row in data:
-            comment_id = row.get("id")
-            if comment_id:
-                existing.add(str(comment_id))
-    return existing
-
-
-def upsert_comments(rows: Sequence[Dict[str, object]]) -> Tuple[int, int]:
+def upsert_comments(
+    rows: Sequence[Dict[str, object]],
+    tables: CommentTables = IG_COMMENT_TABLES,
+) -> Tuple[int, int]:
     if not rows:
         return 0, 0
     client = get_postgres_client()
@@ -280,138 +274,567 @@ def upsert_comments(rows: Sequence[Dict[str, object]]) -> Tuple[int, int]:
         deduplicated[row["id"]] = row
     deduped_rows = list(deduplicated.values())
 
-    existing_ids = fetch_existing_comment_ids(client, [row["id"] for row in deduped_rows])
-    inserted = 0
-    updated = 0
-    for row in deduped_rows:
-        if row["id"] in existing_ids:
-            updated += 1
-        else:
-            inserted += 1
-
-    for chunk in chunked(deduped_rows, 500):
-        response = (
-            client.table(IG_COMMENTS_TABLE)
-            .upsert(chunk, on_conflict="id")
-            .execute()
-        )
-        if getattr(response, "error", None):
-            raise RuntimeError(f"Failed to upsert comments: {response.error}")
-    return inserted, updated
+    response = (
+        client.table(tables.comments)
+        .bulk_upsert(deduped_rows, on_conflict="id")
+        .execute()
+    )
+    if getattr(response, "error", None):
+        raise RuntimeError(f"Failed to upsert comments: {response.error}")
+    return response.inserted, response.updated
+
+
+def iterate_comment_tokens(account_id: str, comments: Iterable[Dict[str, object]]) -> Iterator[Dict[str, object]]:
+    for comment in comments:
+        timestamp = comment.get("timestamp")
+        if not timestamp:
+            continue
+        for token, occurrences in count_wordcloud_tokens(str(comment.get("text") or "")).items():
+            yield {
+                "account_id": account_id,
+                "token": token,
+                "comment_id": comment["id"],
+                "comment_timestamp": timestamp,
+                "occurrences": occurrences,
+            }
 
 
-def refresh_daily_rollup(account_id: str, comments: Sequence[Dict[str, object]]) -> None:
+def index_comment_tokens(
+    account_id: str,
+    comments: Sequence[Dict[str, object]],
+    tables: CommentTables = IG_COMMENT_TABLES,
+) -> int:
+    """
+    Atualiza o índice invertido token -> comentário (ig_comment_tokens) usado pela busca.
+    Os tokens antigos desses comentários são removidos antes, já que o texto pode ter mudado;
+    DELETE e COPY/upsert rodam na mesma transação (uma falha no upsert não apaga o índice).
+    """
     if not comments:
-        return
+        return 0
     client = get_postgres_client()
     if client is None:
         raise RuntimeError("Database client is not configured.")
 
-    counts: Dict[str, int] = defaultdict(int)
-    for comment in comments:
-        created_at_iso = comment.get("timestamp") or comment.get("created_at")
-        if not created_at_iso:
-            continue
-        created_at = parse_timestamp(created_at_iso)
-        day_key = created_at.date().isoformat()
-        counts[day_key] += 1
-
-    payload = [
-        {
-            "account_id": account_id,
-            "comment_date": day,
-            "total_comments": count,
-        }
-        for day, count in counts.items()
-    ]
-    if not payload:
+    comment_ids = list({str(comment["id"]) for comment in comments})
+    response = (
+        client.table(tables.tokens)
+        .bulk_upsert(
+            iterate_comment_tokens(account_id, comments),
+            on_conflict="account_id,token,comment_id",
+            columns=["account_id", "token", "comment_id", "comment_timestamp", "occurrences"],
+            before=[
+                (
+                    f"DELETE FROM {tables.tokens} WHERE account_id = %(account_id)s AND comment_id = ANY(%(ids)s)",
+                    {"account_id": account_id, "ids": comment_ids},
+                )
+            ],
+        )
+        .execute()
+    )
+    if getattr(response, "error", None):
+        raise RuntimeError(f"Failed to index comment tokens: {response.error}")
+    return response.inserted + response.updated
+
+
+def reindex_comment_tokens(
+    account_id: str,
+    batch_size: int = 1000,
+    tables: CommentTables = IG_COMMENT_TABLES,
+) -> int:
+    """
+    Reconstrói ig_comment_tokens (e o word_freq diário) a partir dos comentários já
+    salvos (contas ingeridas antes do índice existir).
+    """
+    client = get_postgres_client()
+    if client is None:
+        raise RuntimeError("Database client is not configured.")
+    total = 0
+    pages = (
+        client.table(tables.comments)
+        .select("id,text,timestamp")
+        .eq("account_id", account_id)
+        .keyset_pages("timestamp,id", page_size=batch_size)
+    )
+    for page in pages:
+        total += index_comment_tokens(account_id, page, tables)
+        refresh_daily_word_freq(account_id, page, tables)
+    logger.info("[comments] %s: %s tokens reindexados", account_id, total)
+    return total
+
+
+def touched_days(comments: Sequence[Dict[str, object]]) -> List[date]:
+    """Dias (UTC) dos comentários do lote, em ordem."""
+    return sorted({
+        parse_timestamp(str(comment["timestamp"])).date()
+        for comment in comments
+        if comment.get("timestamp")
+    })
+
+
+def _day_bounds(days: Sequence[date]) -> Dict[str, object]:
+    return {
+        "days": list(days),
+        "since": datetime.combine(days[0], datetime.min.time(), tzinfo=timezone.utc),
+        "until": datetime.combine(days[-1] + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc),
+    }
+
+
+def refresh_daily_rollup(
+    account_id: str,
+    comments: Sequence[Dict[str, object]],
+    tables: CommentTables = IG_COMMENT_TABLES,
+) -> None:
+    """
+    Recalcula ig_comments_daily.total_comments dos dias tocados pelo lote com um único
+    INSERT ... SELECT ... GROUP BY sobre ig_comments. O total é sempre o do dia inteiro,
+    não só o dos comentários desta execução.
+    """
+    days = touched_days(comments)
+    if not days:
         return
+    execute(
+        f"""
+        INSERT INTO {tables.daily} (account_id, comment_date, total_comments)
+        SELECT account_id, (timestamp AT TIME ZONE 'UTC')::date AS comment_date, count(*)
+        FROM {tables.comments}
+        WHERE account_id = %(account_id)s
+          AND timestamp >= %(since)s
+          AND timestamp < %(until)s
+          AND (timestamp AT TIME ZONE 'UTC')::date = ANY(%(days)s::date[])
+        GROUP BY account_id, comment_date
+        ON CONFLICT (account_id, comment_date)
+        DO UPDATE SET total_comments = EXCLUDED.total_comments, updated_at = NOW()
+        """,
+        {"account_id": account_id, **_day_bounds(days)},
+    )
+
 
-    for chunk in chunked(payload, 500):
-        response = (
-            client.table(IG_COMMENTS_DAILY_TABLE)
-            .upsert(chunk, on_conflict="account_id,comment_date")
-            .execute()
+def refresh_daily_word_freq(
+    account_id: str,
+    comments: Sequence[Dict[str, object]],
+    tables: CommentTables = IG_COMMENT_TABLES,
+) -> None:
+    """
+    Recalcula ig_comments_daily.word_freq dos dias tocados pelo lote a partir de
+    ig_comment_tokens (dia em UTC), no próprio Postgres. Recalcular o dia inteiro, em vez
+    de somar o lote ao mapa existente, mantém o valor certo quando a ingestão revisita
+    comentários já contados.
+    """
+    days = touched_days(comments)
+    if not days:
+        return
+    execute(
+        f"""
+        WITH day_tokens AS (
+            SELECT (comment_timestamp AT TIME ZONE 'UTC')::date AS comment_date,
+                   token,
+                   sum(occurrences) AS total
+            FROM {tables.tokens}
+            WHERE account_id = %(account_id)s
+              AND comment_timestamp >= %(since)s
+              AND comment_timestamp < %(until)s
+            GROUP BY 1, 2
+        ), ranked AS (
+            SELECT comment_date, token, total,
+                   row_number() OVER (PARTITION BY comment_date ORDER BY total DESC, token) AS position
+            FROM day_tokens
+        ), freq AS (
+            SELECT comment_date, jsonb_object_agg(token, total) AS word_freq
+            FROM ranked
+            WHERE position <= %(max_tokens)s
+            GROUP BY comment_date
         )
-        if getattr(response, "error", None):
-            raise RuntimeError(f"Failed to upsert daily counts: {response.error}")
+        UPDATE {tables.daily} AS daily
+        SET word_freq = coalesce(freq.word_freq, '{{}}'::jsonb), updated_at = NOW()
+        FROM unnest(%(days)s::date[]) AS touched(comment_date)
+        LEFT JOIN freq USING (comment_date)
+        WHERE daily.account_id = %(account_id)s AND daily.comment_date = touched.comment_date
+        """,
+        {"account_id": account_id, "max_tokens": DAILY_WORD_FREQ_MAX_TOKENS, **_day_bounds(days)},
+    )
 
 
-def ingest_account_comments(ig_user_id: str, days: int) -> Tuple[int, int, int]:
+def store_comments(
+    account_id: str,
+    rows: Sequence[Dict[str, object]],
+    tables: CommentTables = IG_COMMENT_TABLES,
+) -> Tuple[int, int]:
+    """Grava os comentários e atualiza índice de tokens e agregados diários dos dias tocados."""
+    inserted, updated = upsert_comments(rows, tables)
+    index_comment_tokens(account_id, rows, tables)
+    refresh_daily_rollup(account_id, rows, tables)
+    refresh_daily_word_freq(account_id, rows, tables)
+    return inserted, updated
+
+
+class CommentBatchWriter:
     """
-    Fetch media comments for the given Instagram account and persist them.
+    Buffer de comentários da ingestão: grava (store_comments) a cada `flush_size` linhas,
+    então a memória fica limitada ao lote e não ao tamanho da conta. Checkpoints de mídia
+    registrados via checkpoint() só são gravados depois do flush dos comentários que
+    eles cobrem, para nunca apontar além do que já está no banco. Seguro entre threads
+    (as mídias de uma conta podem ser ingeridas em paralelo).
     """
-    start_ts = time.perf_counter()
-    since_utc = datetime.now(timezone.utc) - timedelta(days=days)
-    fetched_at = datetime.now(timezone.utc)
 
-    total_media = 0
-    collected_comments: List[Dict[str, object]] = []
-    seen_comment_ids: set[str] = set()
+    def __init__(
+        self,
+        account_id: str,
+        tables: CommentTables = IG_COMMENT_TABLES,
+        sync_table: Optional[str] = None,
+        flush_size: int = INGEST_FLUSH_SIZE,
+    ):
+        self.account_id = account_id
+        self.tables = tables
+        self.sync_table = sync_table
+        self.flush_size = max(1, flush_size)
+        self.total = 0
+        self.inserted = 0
+        self.updated = 0
+        self._rows: Dict[str, Dict[str, object]] = {}
+        self._checkpoints: Dict[str, Dict[str, object]] = {}
+        # RLock: add() pode chamar flush(). O flush acontece sob o lock para que um
+        # checkpoint nunca seja gravado antes dos comentários que ele cobre.
+        self._lock = threading.RLock()
+
+    def add(self, record: Optional[Dict[str, object]]) -> None:
+        if not record:
+            return
+        with self._lock:
+            self._rows[str(record["id"])] = record
+            if len(self._rows) >= self.flush_size:
+                self.flush()
+
+    def checkpoint(self, media_id: str, state: Dict[str, object]) -> None:
+        with self._lock:
+            self._checkpoints[media_id] = {"media_id": media_id, "account_id": self.account_id, **state}
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._rows:
+                rows = list(self._rows.values())
+                inserted, updated = store_comments(self.account_id, rows, self.tables)
+                self.total += len(rows)
+                self.inserted += inserted
+                self.updated += updated
+                self._rows = {}
+            if self._checkpoints and self.sync_table:
+                save_media_checkpoints(self.sync_table, list(self._checkpoints.values()))
+            self._checkpoints = {}
+
+
+def load_media_checkpoints(sync_table: str, account_id: str) -> Dict[str, Dict[str, object]]:
+    client = get_postgres_client()
+    if client is None:
+        raise RuntimeError("Database client is not configured.")
+    response = (
+        client.table(sync_table)
+        .select("media_id,comments_count,last_comment_at,resume_cursor,resume_comment_at,synced_at")
+        .eq("account_id", account_id)
+        .execute()
+    )
+    return {str(row["media_id"]): row for row in response.data or []}
 
-    for media in iterate_media(ig_user_id, since_utc):
-        media_id = media["id"]
-        media_ts = media["timestamp"]
-        total_media += 1
-        logger.info("[comments] Fetching comments for media %s (%s)", media_id, media_ts.isoformat())
 
-        try:
-            for comment in iterate_comments(media_id, since_utc):
-                record = normalize_comment_record(
-                    account_id=ig_user_id,
+def save_media_checkpoints(sync_table: str, checkpoints: Sequence[Dict[str, object]]) -> None:
+    client = get_postgres_client()
+    if client is None:
+        raise RuntimeError("Database client is not configured.")
+    now = datetime.now(timezone.utc)
+    rows = [{**checkpoint, "updated_at": now} for checkpoint in checkpoints]
+    response = (
+        client.table(sync_table)
+        .bulk_upsert(rows, on_conflict="media_id")
+        .execute()
+    )
+    if getattr(response, "error", None):
+        raise RuntimeError(f"Failed to save comment checkpoints: {response.error}")
+
+
+def _latest(current: Optional[datetime], candidate: Optional[datetime]) -> Optional[datetime]:
+    if candidate is None:
+        return current
+    if current is None or candidate > current:
+        return candidate
+    return current
+
+
+def _comments_count(value: object) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def media_needs_sync(media: Dict[str, object], checkpoint: Optional[Dict[str, object]]) -> bool:
+    """
+    Mídia sem passada completa registrada, com passada interrompida ou cujo comments_count
+    mudou desde o último sync. As demais não têm nada novo e não geram chamadas ao Graph.
+    """
+    if not checkpoint or checkpoint.get("resume_cursor") or checkpoint.get("synced_at") is None:
+        return True
+    current = _comments_count(media.get("comments_count"))
+    stored = _comments_count(checkpoint.get("comments_count"))
+    return current is None or stored is None or current != stored
+
+
+def ingest_media_comments(
+    writer: CommentBatchWriter,
+    media: Dict[str, object],
+    since_utc: datetime,
+    fetched_at: datetime,
+    checkpoint: Optional[Dict[str, object]],
+) -> int:
+    """
+    Percorre os comentários (e respostas) de uma mídia, da mais nova para a mais antiga,
+    parando no high-water mark salvo (`last_comment_at`) ou no início da janela. Cada
+    página concluída vira um checkpoint com o cursor seguinte; uma passada interrompida
+    é retomada desse cursor na próxima execução. Retorna quantos comentários e respostas
+    a passada encontrou.
+    """
+    media_id = str(media["id"])
+    media_ts = media["timestamp"]
+    checkpoint = checkpoint or {}
+    last_comment_at = checkpoint.get("last_comment_at")
+    lower_bound = max(since_utc, last_comment_at) if last_comment_at else since_utc
+    resume_cursor = checkpoint.get("resume_cursor")
+    walk_latest = checkpoint.get("resume_comment_at") if resume_cursor else None
+    found = 0
+    if resume_cursor:
+        logger.info("[comments] Resuming media %s from saved cursor", media_id)
+
+    try:
+        pages = iterate_comment_pages(media_id, lower_bound, after=resume_cursor)
+        for comments, next_cursor in pages:
+            for comment in comments:
+                found += 1
+                walk_latest = _latest(walk_latest, comment["timestamp"])
+                writer.add(normalize_comment_record(
+                    account_id=writer.account_id,
                     media_id=media_id,
                     media_timestamp=media_ts,
                     comment=comment,
                     parent_id=None,
                     fetched_at=fetched_at,
-                )
-                if record and record["id"] not in seen_comment_ids:
-                    collected_comments.append(record)
-                    seen_comment_ids.add(record["id"])
-
-                reply_count = comment.get("comment_count") or 0
-                if reply_count:
-                    try:
-                        for reply in iterate_replies(comment["id"], since_utc):
-                            reply_record = normalize_comment_record(
-                                account_id=ig_user_id,
-                                media_id=media_id,
-                                media_timestamp=media_ts,
-                                comment=reply,
-                                parent_id=comment["id"],
-                                fetched_at=fetched_at,
-                            )
-                            if reply_record and reply_record["id"] not in seen_comment_ids:
-                                collected_comments.append(reply_record)
-                                seen_comment_ids.add(reply_record["id"])
-                    except MetaAPIError as err:
-                        logger.warning(
-                            "[comments] Failed to fetch replies for %s: %s",
-                            comment["id"],
-                            err,
-                        )
-        except MetaAPIError as err:
-            logger.warning("[comments] Failed to fetch comments for media %s: %s", media_id, err)
+                ))
+                if not comment.get("comment_count"):
+                    continue
+                try:
+                    for reply in iterate_replies(comment["id"], since_utc):
+                        found += 1
+                        walk_latest = _latest(walk_latest, reply["timestamp"])
+                        writer.add(normalize_comment_record(
+                            account_id=writer.account_id,
+                            media_id=media_id,
+                            media_timestamp=media_ts,
+                            comment=reply,
+                            parent_id=comment["id"],
+                            fetched_at=fetched_at,
+                        ))
+                except MetaAPIError as err:
+                    logger.warning("[comments] Failed to fetch replies for %s: %s", comment["id"], err)
+            if next_cursor:
+                writer.checkpoint(media_id, {
+                    "comments_count": checkpoint.get("comments_count"),
+                    "last_comment_at": last_comment_at,
+                    "resume_cursor": next_cursor,
+                    "resume_comment_at": walk_latest,
+                    "synced_at": checkpoint.get("synced_at"),
+                })
+    except MetaAPIError as err:
+        logger.warning("[comments] Failed to fetch comments for media %s: %s", media_id, err)
+        if resume_cursor:
+            # Cursor salvo pode ter expirado: a próxima execução refaz a passada inteira.
+            writer.checkpoint(media_id, {
+                "comments_count": checkpoint.get("comments_count"),
+                "last_comment_at": last_comment_at,
+                "resume_cursor": None,
+                "resume_comment_at": None,
+                "synced_at": checkpoint.get("synced_at"),
+            })
+        return found
+
+    writer.checkpoint(media_id, {
+        "comments_count": _comments_count(media.get("comments_count")),
+        "last_comment_at": _latest(last_comment_at, walk_latest),
+        "resume_cursor": None,
+        "resume_comment_at": None,
+        "synced_at": fetched_at,
+    })
+    return found
+
+
+def sync_media(
+    writer: CommentBatchWriter,
+    media: Dict[str, object],
+    since_utc: datetime,
+    fetched_at: datetime,
+    checkpoint: Optional[Dict[str, object]],
+) -> bool:
+    """
+    Sincroniza os comentários de uma mídia, se preciso. Retorna False quando a mídia foi
+    pulada (comments_count inalterado).
+    """
+    if not media_needs_sync(media, checkpoint):
+        return False
+    logger.info("[comments] Fetching comments for media %s (%s)", media["id"], media["timestamp"].isoformat())
+    found = ingest_media_comments(writer, media, since_utc, fetched_at, checkpoint)
+    if checkpoint and checkpoint.get("last_comment_at") and not checkpoint.get("resume_cursor"):
+        # O comments_count subiu mais do que a passada incremental achou: há respostas
+        # novas em comentários abaixo do high-water mark. Refaz a mídia na janela toda.
+        previous = _comments_count(checkpoint.get("comments_count")) or 0
+        current = _comments_count(media.get("comments_count")) or 0
+        if found < current - previous:
+            logger.info("[comments] Full pass for media %s (found %s of %s new)", media["id"], found, current - previous)
+            ingest_media_comments(writer, media, since_utc, fetched_at, None)
+    return True
+
+
+def ingest_account_comments(
+    ig_user_id: str,
+    days: int,
+    media_executor: Optional[ThreadPoolExecutor] = None,
+) -> Tuple[int, int, int]:
+    """
+    Fetch media comments for the given Instagram account and persist them in batches.
+    With `media_executor`, media are synced in parallel on that (shared) pool.
+    """
+    start_ts = time.perf_counter()
+    since_utc = datetime.now(timezone.utc) - timedelta(days=days)
+    fetched_at = datetime.now(timezone.utc)
+
+    checkpoints = load_media_checkpoints(IG_COMMENT_SYNC_TABLE, ig_user_id)
+    writer = CommentBatchWriter(ig_user_id, sync_table=IG_COMMENT_SYNC_TABLE)
+    total_media = 0
+    synced_media = 0
+
+    if media_executor is None:
+        for media in iterate_media(ig_user_id, since_utc):
+            total_media += 1
+            synced_media += sync_media(writer, media, since_utc, fetched_at, checkpoints.get(media["id"]))
+    else:
+        futures = []
+        for media in iterate_media(ig_user_id, since_utc):
+            total_media += 1
+            futures.append(media_executor.submit(
+                sync_media, writer, media, since_utc, fetched_at, checkpoints.get(media["id"])
+            ))
+        errors = []
+        for future in as_completed(futures):
+            try:
+                synced_media += future.result()
+            except Exception as err:  # noqa: BLE001
+                errors.append(err)
+        if errors:
+            # Grava o que as outras mídias já trouxeram antes de falhar a conta.
+            writer.flush()
+            raise errors[0]
+    writer.flush()
 
-    inserted, updated = upsert_comments(collected_comments)
-    refresh_daily_rollup(ig_user_id, collected_comments)
     duration = time.perf_counter() - start_ts
     logger.info(
-        "[comments] %s: medias=%s total_comments=%s inserted=%s updated=%s duration=%.2fs",
+        "[comments] %s: medias=%s unchanged=%s total_comments=%s inserted=%s updated=%s duration=%.2fs",
         ig_user_id,
         total_media,
-        len(collected_comments),
-        inserted,
-        updated,
+        total_media - synced_media,
+        writer.total,
+        writer.inserted,
+        writer.updated,
         duration,
     )
-    return total_media, inserted, updated
+    return total_media, writer.inserted, writer.updated
+
+
+def ingest_accounts_comments(
+    account_ids: Sequence[str],
+    days: int,
+    account_concurrency: int = INGEST_ACCOUNT_CONCURRENCY,
+    media_concurrency: int = INGEST_MEDIA_CONCURRENCY,
+) -> Dict[str, Dict[str, object]]:
+    """
+    Ingere várias contas em paralelo: até `account_concurrency` contas listam mídias ao
+    mesmo tempo e as mídias de todas elas dividem um único pool de `media_concurrency`
+    workers. Os dois pools são separados, então uma conta esperando suas mídias nunca
+    ocupa um worker de mídia. Não usa meta.run_bounded: os slots por token de lá ficam
+    presos durante toda a função e, aninhados, esgotariam os slots das chamadas internas.
+
+    Returns:
+        dict: Por conta, {"medias", "inserted", "updated", "duration", "error"}; falhas da
+        Graph API trazem também "graph" ({"status", "code", "type"} do MetaAPIError).
+    """
+    results: Dict[str, Dict[str, object]] = {}
+    if not account_ids:
+        return results
+    started = time.perf_counter()
+
+    def _run(account_id: str, media_executor: ThreadPoolExecutor) -> Dict[str, object]:
+        account_start = time.perf_counter()
+        graph = None
+        try:
+            medias, inserted, updated = ingest_account_comments(account_id, days, media_executor=media_executor)
+            error = None
+        except MetaAPIError as err:
+            logger.warning("Failed to ingest comments for %s: %s", account_id, err)
+            medias, inserted, updated, error = 0, 0, 0, str(err)
+            graph = {"status": err.status, "code": err.code, "type": err.error_type}
+        except Exception as err:  # noqa: BLE001
+            logger.exception("Failed to ingest comments for %s", account_id)
+            medias, inserted, updated, error = 0, 0, 0, str(err)
+        result = {
+            "medias": medias,
+            "inserted": inserted,
+            "updated": updated,
+            "duration": round(time.perf_counter() - account_start, 2),
+            "error": error,
+        }
+        if graph is not None:
+            result["graph"] = graph
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, media_concurrency), thread_name_prefix="comments-media") as media_pool:
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(account_concurrency, len(account_ids))),
+            thread_name_prefix="comments-account",
+        ) as account_pool:
+            futures = {account_pool.submit(_run, account_id, media_pool): account_id for account_id in account_ids}
+            for done, future in enumerate(as_completed(futures), start=1):
+                account_id = futures[future]
+                results[account_id] = future.result()
+                logger.info(
+                    "[comments] %s/%s contas | %s: medias=%s inserted=%s updated=%s em %.2fs%s",
+                    done,
+                    len(account_ids),
+                    account_id,
+                    results[account_id]["medias"],
+                    results[account_id]["inserted"],
+                    results[account_id]["updated"],
+                    results[account_id]["duration"],
+                    " (falhou)" if results[account_id]["error"] else "",
+                )
+    logger.info("[comments] %s contas em %.2fs", len(account_ids), time.perf_counter() - started)
+    return results
 
 
 def parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Ingest Instagram comments from recent media.")
     parser.add_argument("--ig", dest="ig_user_ids", action="append", required=True, help="Instagram Business account ID.")
     parser.add_argument("--days", type=int, default=DEFAULT_DAYS_LOOKBACK, help="Lookback window in days (default: 30).")
+    parser.add_argument(
+        "--reindex-tokens",
+        action="store_true",
+        help="Only rebuild the comment search index (ig_comment_tokens) from stored comments.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=INGEST_ACCOUNT_CONCURRENCY,
+        help="Accounts ingested in parallel (default: COMMENTS_INGEST_ACCOUNT_CONCURRENCY).",
+    )
+    parser.add_argument(
+        "--media-concurrency",
+        type=int,
+        default=INGEST_MEDIA_CONCURRENCY,
+        help="Media synced in parallel across all accounts (default: COMMENTS_INGEST_MEDIA_CONCURRENCY).",
+    )
     return parser.parse_args(argv)
 
 
@@ -424,12 +847,21 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
         logger.error("No Instagram account IDs provided.")
         return 1
 
+    if not args.reindex_tokens:
+        results = ingest_accounts_comments(
+            account_ids,
+            days,
+            account_concurrency=max(1, args.concurrency),
+            media_concurrency=max(1, args.media_concurrency),
+        )
+        return 1 if any(result["error"] for result in results.values()) else 0
+
     exit_code = 0
     for ig_user_id in account_ids:
         try:
-            ingest_account_comments(ig_user_id, days=days)
+            reindex_comment_tokens(ig_user_id)
         except Exception:  # noqa: BLE001
-            logger.exception("Failed to ingest comments for %s", ig_user_id)
+            logger.exception("Failed to reindex comment tokens for %s", ig_user_id)
             exit_code = 1
     return exit_code
 
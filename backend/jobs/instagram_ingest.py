@@ -7,9 +7,10 @@ from zoneinfo import ZoneInfo
 from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 from cache import get_cached_payload, get_fetcher, register_fetcher
-from meta import MetaAPIError, ig_window, ig_recent_posts, gget
+from json_utils import Json
+from meta import MetaAPIError, ig_window_daily, ig_recent_posts, gget
+from meta_rate_limit import PRIORITY_INGEST, request_priority
 from postgres_client import get_postgres_client
-from psycopg2.extras import Json
 
 logger = logging.getLogger(__name__)
 
@@ -39,7 +40,7 @@ def _insert_ingest_log(client, account_id: str, started_at: str) -> Optional[str
         "error_message": None,
     }
     try:
-        response = client.table(INGEST_LOGS_TABLE).insert(record).execute()
+        response = client.table(INGEST_LOGS_TABLE).insert(record, returning="id").execute()
     except Exception as err:  # noqa: BLE001
         print(f"[ingest-log] Falha ao registrar início para {account_id}: {err}")
         return None
@@ -264,75 +265,24 @@ def upsert_metrics(rows: Sequence[Dict[str, object]]) -> Tuple[int, int]:
     if client is None:
         raise RuntimeError("Banco não configurado para ingestão.")
 
-    account_ids = {str(row.get("account_id")) for row in rows if row.get("account_id")}
-    metric_keys = {str(row.get("metric_key")) for row in rows if row.get("metric_key")}
-    metric_dates = {
-        parsed
-        for row in rows
-        for parsed in [_parse_metric_date(row.get("metric_date"))]
-        if parsed is not None
-    }
-
-    existing_keys: set[Tuple[str, str, str]] = set()
-    try:
-        query = (
-            client.table(METRICS_TABLE)
-            .select("account_id,metric_key,metric_date")
-            .eq("platform", PLATFORM)
-        )
-        account_list = list(account_ids)
-        if account_list:
-            if len(account_list) == 1:
-                query = query.eq("account_id", account_list[0])
-            else:
-                query = query.in_("account_id", account_list)
-        if metric_keys:
-            query = query.in_("metric_key", list(metric_keys))
-        if metric_dates:
-            query = query.in_("metric_date", list(metric_dates))
-        response = query.execute()
-        for item in getattr(response, "data", None) or []:
-            existing_keys.add(
-                (
-                    str(item.get("account_id")),
-                    str(item.get("metric_key")),
-                    str(item.get("metric_date")),
-                )
-            )
-    except Exception as err:  # noqa: BLE001
-        logger.warning("Falha ao consultar registros existentes em %s: %s", METRICS_TABLE, err)
-
-    inserted = 0
-    updated = 0
     normalized_rows: List[Dict[str, object]] = []
     for row in rows:
-        account_id = str(row.get("account_id"))
-        metric_key = str(row.get("metric_key"))
-        metric_date = _format_metric_date_value(row.get("metric_date"))
-        row["metric_date"] = metric_date
+        row["metric_date"] = _format_metric_date_value(row.get("metric_date"))
         row["platform"] = PLATFORM
         metadata_value = row.get("metadata")
         if isinstance(metadata_value, (dict, list)):
             row["metadata"] = Json(metadata_value)
-        key = (account_id, metric_key, metric_date)
-        if key in existing_keys:
-            updated += 1
-        else:
-            inserted += 1
         normalized_rows.append(dict(row))
 
-    chunk_size = 500
-    for index in range(0, len(normalized_rows), chunk_size):
-        chunk = normalized_rows[index:index + chunk_size]
-        response = (
-            client.table(METRICS_TABLE)
-            .upsert(chunk, on_conflict="account_id,platform,metric_key,metric_date")
-            .execute()
-        )
-        if getattr(response, "error", None):
-            raise RuntimeError(f"Falha ao inserir {METRICS_TABLE}: {response.error}")
-
-    return inserted, updated
+    # COPY + um único INSERT ... ON CONFLICT; as contagens vêm do próprio statement.
+    response = (
+        client.table(METRICS_TABLE)
+        .bulk_upsert(normalized_rows, on_conflict="account_id,platform,metric_key,metric_date")
+        .execute()
+    )
+    if getattr(response, "error", None):
+        raise RuntimeError(f"Falha ao inserir {METRICS_TABLE}: {response.error}")
+    return response.inserted, response.updated
 
 
 def build_rollup_payload(
@@ -480,10 +430,19 @@ def ingest_account_range(
     all_rows: List[Dict[str, object]] = []
     metric_keys_touched: defaultdict[str, set] = defaultdict(set)
 
-    for daily_date in daterange(since, until):
+    days = list(daterange(since, until))
+    day_windows = []
+    for daily_date in days:
         bounds = day_bounds(daily_date)
-        snapshot = ig_window(ig_id, bounds["since"], bounds["until"])
-        rows = snapshot_to_rows(ig_id, daily_date, snapshot)
+        day_windows.append((daily_date.isoformat(), bounds["since"], bounds["until"]))
+
+    # Séries diárias em blocos de até 30 dias; só métricas total_value saem por dia (em batch).
+    with request_priority(PRIORITY_INGEST):
+        snapshots = ig_window_daily(ig_id, day_windows)
+
+    for daily_date in days:
+        snapshot = snapshots.get(daily_date.isoformat())
+        rows = snapshot_to_rows(ig_id, daily_date, snapshot) if snapshot else []
         if not rows:
             logger.info("[%s] Nenhum dado para %s", ig_id, daily_date)
             continue
@@ -499,7 +458,8 @@ def ingest_account_range(
         updated_total += updated
 
         if warm_posts:
-            warm_instagram_posts_cache(ig_id)
+            with request_priority(PRIORITY_INGEST):
+                warm_instagram_posts_cache(ig_id)
 
         if refresh_rollup:
             for date_iso, keys in metric_keys_touched.items():
@@ -0,0 +1,98 @@
+# backend/json_response.py
+"""
+Respostas JSON montadas a partir de fragmentos já serializados.
+
+Payloads do cache (frozen.FrozenDict) guardam, na primeira vez que são servidos, o
+JSON de cada chave de topo. Os handlers continuam trabalhando com uma cópia rasa
+(dict(payload)) e trocando só algumas chaves; `splice_payload` reaproveita os bytes
+das chaves que não mudaram e serializa apenas o que foi alterado. O envelope
+(meta/error) é pequeno e é serializado normalmente ao redor dos bytes prontos.
+
+A saída é a mesma de jsonify com json_utils.FastJSONProvider.
+"""
+
+import os
+from typing import Any, Dict, List, Optional
+
+from flask import Response
+from flask.json.provider import DefaultJSONProvider
+
+from frozen import FrozenDict
+from json_utils import response_bytes
+
+
+class RawJSON:
+    """Trecho de JSON já serializado, inserido como está na resposta."""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+
+def _encode_member(key: str, value: Any) -> bytes:
+    # '{"chave":valor}' -> '"chave":valor'
+    return response_bytes({key: value})[1:-1]
+
+
+def payload_fragments(payload: FrozenDict) -> Dict[str, bytes]:
+    """
+    JSON de cada chave de topo ('"chave":valor'), calculado uma vez e guardado no próprio
+    payload congelado (vive e sai do L1 junto com ele).
+    """
+    fragments = getattr(payload, "_json_fragments", None)
+    if fragments is None:
+        fragments = {key: _encode_member(key, value) for key, value in payload.items()}
+        object.__setattr__(payload, "_json_fragments", fragments)
+    return fragments
+
+
+def splice_payload(data: Dict[str, Any], source: Any) -> Any:
+    """
+    Serializa `data` (cópia rasa de `source`, possivelmente com chaves trocadas)
+    reaproveitando os fragmentos de `source` para os valores que são o mesmo objeto.
+    """
+    if not isinstance(source, FrozenDict) or not isinstance(data, dict):
+        return data
+    fragments = payload_fragments(source)
+    parts: List[bytes] = []
+    for key in sorted(data):
+        value = data[key]
+        fragment = fragments.get(key)
+        if fragment is not None and key in source and source[key] is value:
+            parts.append(fragment)
+        else:
+            parts.append(_encode_member(key, value))
+    return RawJSON(b"{" + b",".join(parts) + b"}")
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Serializa como json_utils.response_bytes, aceitando RawJSON em qualquer ponto da estrutura."""
+    raws: List[bytes] = []
+    nonce = os.urandom(6).hex()
+
+    def default(value: Any) -> Any:
+        if isinstance(value, RawJSON):
+            raws.append(value.data)
+            return f"\x00{nonce}:{len(raws) - 1}\x00"
+        return DefaultJSONProvider.default(value)
+
+    encoded = response_bytes(obj, default)
+    for index, raw in enumerate(raws):
+        encoded = encoded.replace(response_bytes(f"\x00{nonce}:{index}\x00"), raw, 1)
+    return encoded
+
+
+def json_response(obj: Any, status: int = 200, source: Optional[Any] = None) -> Response:
+    """
+    Equivalente a jsonify(obj). Quando `source` é o payload congelado do cache e
+    obj["data"] (envelope) ou o próprio obj foi derivado dele, reaproveita os fragmentos.
+    """
+    if source is not None and isinstance(obj, dict):
+        if isinstance(obj.get("data"), dict):
+            obj = dict(obj)
+            obj["data"] = splice_payload(obj["data"], source)
+        else:
+            obj = splice_payload(obj, source)
+    body = dumps_bytes(obj) + b"\n"
+    return Response(body, status=status, mimetype="application/json")
@@ -0,0 +1,108 @@
+# backend/json_utils.py
+"""
+Serialização JSON rápida para respostas HTTP e colunas JSONB.
+
+Usa orjson quando instalado e o json da stdlib como reserva. Decimal, date e datetime
+são convertidos no próprio encoder (Decimal -> float, datas -> ISO 8601), então os
+payloads não precisam de uma passada recursiva de limpeza antes de serializar.
+
+- `dumps` / `dumps_bytes` / `loads`: uso geral.
+- `Json`: substituto de psycopg2.extras.Json para parâmetros JSONB.
+- `FastJSONProvider`: provedor JSON do Flask (jsonify, request.get_json).
+"""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Optional
+
+from flask.json.provider import DefaultJSONProvider
+from psycopg2.extras import Json as _PsycopgJson
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson é opcional
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _encode(value: Any, sort_keys: bool, default: Callable[[Any], Any], native_dates: bool) -> bytes:
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if not native_dates:
+            option |= orjson.OPT_PASSTHROUGH_DATETIME
+        try:
+            return orjson.dumps(value, default=default, option=option)
+        except TypeError:
+            # Inteiros acima de 64 bits, chaves não suportadas etc.: a stdlib resolve.
+            pass
+    return json.dumps(
+        value,
+        default=default,
+        sort_keys=sort_keys,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def dumps_bytes(value: Any, sort_keys: bool = False) -> bytes:
+    """JSON compacto em UTF-8 (datas em ISO 8601, Decimal como número)."""
+    return _encode(value, sort_keys, _default, native_dates=True)
+
+
+def dumps(value: Any, sort_keys: bool = False) -> str:
+    return dumps_bytes(value, sort_keys=sort_keys).decode("utf-8")
+
+
+def response_bytes(value: Any, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """
+    Corpo de resposta no mesmo formato do jsonify padrão do Flask (chaves ordenadas,
+    datas em HTTP-date, Decimal/UUID como string), exceto pelo UTF-8 sem escapes \\uXXXX.
+    """
+    return _encode(value, True, default or DefaultJSONProvider.default, native_dates=False)
+
+
+def loads(data: Any) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class Json(_PsycopgJson):
+    """psycopg2.extras.Json serializando com o encoder rápido."""
+
+    def dumps(self, obj: Any) -> str:
+        return dumps(obj)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Provedor JSON do Flask com o encoder rápido. Em modo debug (saída indentada) usa o
+    provedor padrão.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs.get("indent"):
+            return super().dumps(obj, **kwargs)
+        return response_bytes(obj, self.default).decode("utf-8")
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return loads(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Any:
+        if self._app.debug:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(response_bytes(obj, self.default) + b"\n", mimetype=self.mimetype)
@@ -5,14 +5,24 @@ import hmac
 import hashlib
 import logging
 import copy
+import contextvars
+import json
+import threading
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from zoneinfo import ZoneInfo
 import requests
-from typing import Optional, List, Dict, Any, Sequence
+from requests.adapters import HTTPAdapter
+from typing import Optional, List, Dict, Any, Iterator, Sequence, Tuple
 from urllib.parse import urlencode
 
 from dotenv import load_dotenv
 
+from meta_rate_limit import current_priority, governor as rate_limit_governor, is_rate_limit_error
+from frozen import freeze
+from singleflight import SingleFlight
+
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"), override=False)
 
 # Configurar logging estruturado
@@ -30,6 +40,21 @@ BASE = f"https://graph.facebook.com/{VERSION}"
 # Configurações
 REQUEST_TIMEOUT = 30  # segundos
 MAX_RETRIES = 3
+# Pool HTTP compartilhado: por padrão comporta 2 conexões por thread do gunicorn (gthread).
+HTTP_POOL_CONNECTIONS = int(os.getenv("META_HTTP_POOL_CONNECTIONS", "4") or "4")
+HTTP_POOL_MAXSIZE = int(
+    os.getenv("META_HTTP_POOL_MAXSIZE")
+    or max(10, int(os.getenv("GUNICORN_THREADS", "8") or "8") * 2)
+)
+HTTP_POOL_BLOCK = os.getenv("META_HTTP_POOL_BLOCK", "1") != "0"
+# Endpoint batch da Graph API: até 50 sub-requisições por POST.
+BATCH_MAX_REQUESTS = 50
+BATCH_ENABLED = os.getenv("META_BATCH_ENABLED", "1") != "0"
+# Insights de conta com period=day: a API aceita janelas de até 30 dias por chamada.
+IG_DAILY_SERIES_MAX_DAYS = 30
+# Fan-out concorrente (insights por mídia, chunks de batch): limite de chamadas simultâneas por token.
+MAX_IN_FLIGHT_PER_TOKEN = max(1, int(os.getenv("META_MAX_IN_FLIGHT_PER_TOKEN", "4") or "4"))
+FANOUT_MAX_WORKERS = max(1, int(os.getenv("META_FANOUT_MAX_WORKERS", "8") or "8"))
 IG_POSTS_MEM_CACHE_TTL_SEC = int(os.getenv("IG_POSTS_MEM_CACHE_TTL_SEC", "1800"))
 IG_POSTS_MEM_CACHE: Dict[str, Dict[str, Any]] = {}
 FB_POST_INSIGHTS_MAX_DAYS = int(os.getenv("FB_POST_INSIGHTS_MAX_DAYS", "90"))
@@ -71,81 +96,162 @@ def appsecret_proof(token: Optional[str]) -> Optional[str]:
     return hmac.new(SECRET.encode(), token.encode(), hashlib.sha256).hexdigest()
 
 
-def gget(path: str, params: Optional[dict] = None, token: Optional[str] = None):
-    """
-    Faz requisição GET à Meta Graph API com retry exponencial e timeout configurável.
+_http_session: Optional[requests.Session] = None
+_http_session_lock = threading.Lock()
 
-    Args:
-        path: Caminho da API (ex: "/me")
-        params: Parâmetros da query string
-        token: Token de acesso (usa TOKEN global se não fornecido)
 
-    Returns:
-        dict: Resposta JSON da API
+def _get_http_session() -> requests.Session:
+    """
+    Sessão HTTP compartilhada (keep-alive) para todas as chamadas à Graph API.
 
-    Raises:
-        MetaAPIError: Se a requisição falhar após todos os retries
+    O HTTPAdapter mantém um pool limitado de conexões por host; com `pool_block`
+    as threads aguardam uma conexão livre em vez de abrir conexões descartáveis.
     """
-    request_token = token or TOKEN
-    if not request_token:
-        raise RuntimeError("META_SYSTEM_USER_TOKEN is not configured")
+    global _http_session
+    if _http_session is not None:
+        return _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=HTTP_POOL_CONNECTIONS,
+                pool_maxsize=HTTP_POOL_MAXSIZE,
+                pool_block=HTTP_POOL_BLOCK,
+                max_retries=0,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({
+                "Accept-Encoding": "gzip, deflate",
+                "Connection": "keep-alive",
+            })
+            _http_session = session
+    return _http_session
 
-    query = {"access_token": request_token}
-    proof = appsecret_proof(request_token)
-    if proof:
-        query["appsecret_proof"] = proof
-    if params:
-        query.update(params)
 
-    url = f"{BASE}{path}?{urlencode(query, doseq=True)}"
+def get_http_pool_stats() -> Dict[str, Any]:
+    """
+    Estatísticas do pool HTTP da Graph API (conexões abertas, ociosas e reutilizadas).
+    """
+    stats: Dict[str, Any] = {
+        "pool_maxsize": HTTP_POOL_MAXSIZE,
+        "pool_block": HTTP_POOL_BLOCK,
+        "hosts": [],
+        "connections_opened": 0,
+        "connections_idle": 0,
+        "connections_in_use": 0,
+        "requests": 0,
+        "connections_reused": 0,
+    }
+    session = _http_session
+    if session is None:
+        return stats
+
+    seen_managers = set()
+    for adapter in session.adapters.values():
+        manager = getattr(adapter, "poolmanager", None)
+        if manager is None or id(manager) in seen_managers:
+            continue
+        seen_managers.add(id(manager))
+        for key in list(manager.pools.keys()):
+            pool = manager.pools.get(key)
+            if pool is None:
+                continue
+            queue = getattr(pool, "pool", None)
+            queued = list(queue.queue) if queue is not None else []
+            idle = sum(1 for conn in queued if conn is not None)
+            in_use = max(0, (queue.maxsize if queue is not None else 0) - len(queued))
+            opened = int(getattr(pool, "num_connections", 0) or 0)
+            served = int(getattr(pool, "num_requests", 0) or 0)
+            reused = max(0, served - opened)
+            stats["hosts"].append({
+                "host": f"{pool.scheme}://{pool.host}:{pool.port}",
+                "connections_opened": opened,
+                "connections_idle": idle,
+                "connections_in_use": in_use,
+                "requests": served,
+                "connections_reused": reused,
+            })
+            stats["connections_opened"] += opened
+            stats["connections_idle"] += idle
+            stats["connections_in_use"] += in_use
+            stats["requests"] += served
+            stats["connections_reused"] += reused
+    return stats
+
+
+def _meta_error_from_response(status: int, payload: Any, text: str = "") -> MetaAPIError:
+    err = payload.get("error") if isinstance(payload, dict) else None
+    message = err.get("message") if isinstance(err, dict) else None
+    return MetaAPIError(
+        status=status,
+        message=message or text or "Meta Graph API request failed",
+        code=err.get("code") if isinstance(err, dict) else None,
+        error_type=err.get("type") if isinstance(err, dict) else None,
+        raw=payload if isinstance(payload, dict) else {"raw": text},
+    )
 
-    # Retry com exponential backoff
-    for attempt in range(MAX_RETRIES):
+
+def _graph_request(method: str, url: str, label: str, token: Optional[str], data: Optional[dict] = None):
+    """
+    Executa a requisição HTTP na sessão compartilhada, passando pelo governador de
+    rate limit (meta_rate_limit) e com retry exponencial para 5xx.
+    Erros definitivos são convertidos em MetaAPIError.
+    """
+    session = _get_http_session()
+    attempts = rate_limit_governor.max_attempts(MAX_RETRIES)
+    for attempt in range(attempts):
         try:
-            logger.debug(f"Request attempt {attempt + 1}/{MAX_RETRIES}: {path}")
-            r = requests.get(url, timeout=REQUEST_TIMEOUT)
+            rate_limit_governor.acquire(token)
+            logger.debug(f"Request attempt {attempt + 1}/{attempts}: {label}")
+            if method == "POST":
+                r = session.post(url, data=data, timeout=REQUEST_TIMEOUT)
+            else:
+                r = session.get(url, timeout=REQUEST_TIMEOUT)
+            rate_limit_governor.observe(token, r.headers)
 
             # Se sucesso, retornar
             if r.ok:
                 return r.json()
 
+            try:
+                payload = r.json()
+            except ValueError:
+                payload = {}
+            error = _meta_error_from_response(r.status_code, payload, r.text)
+
+            # Limite de uso: o governador bloqueia o escopo e a próxima tentativa espera por ele
+            if is_rate_limit_error(r.status_code, error.code):
+                rate_limit_governor.note_throttled(token, r.status_code, error.code)
+                if attempt < attempts - 1:
+                    logger.warning(
+                        f"Rate limited (status {r.status_code}, code {error.code}). "
+                        f"Retrying after budget recovers... (attempt {attempt + 1}/{attempts})"
+                    )
+                    continue
+
             # Se for erro temporário e ainda temos tentativas, fazer retry
-            if r.status_code in (429, 500, 502, 503, 504) and attempt < MAX_RETRIES - 1:
+            elif r.status_code in (500, 502, 503, 504) and attempt < attempts - 1:
                 # Exponential backoff: 2^attempt segundos (1s, 2s, 4s, 8s...)
                 wait_time = 2 ** attempt
                 logger.warning(
                     f"Request failed with status {r.status_code}. "
-                    f"Retrying in {wait_time}s... (attempt {attempt + 1}/{MAX_RETRIES})"
+                    f"Retrying in {wait_time}s... (attempt {attempt + 1}/{attempts})"
                 )
                 time.sleep(wait_time)
                 continue
 
             # Erro definitivo ou última tentativa
-            try:
-                payload = r.json()
-            except ValueError:
-                payload = {}
-
-            err = payload.get("error") if isinstance(payload, dict) else None
-            message = (err or {}).get("message") if isinstance(err, dict) else None
-
-            logger.error(f"Meta API error: {message or r.text}")
-
-            raise MetaAPIError(
-                status=r.status_code,
-                message=message or r.text or "Meta Graph API request failed",
-                code=(err or {}).get("code") if isinstance(err, dict) else None,
-                error_type=(err or {}).get("type") if isinstance(err, dict) else None,
-                raw=payload if isinstance(payload, dict) else {"raw": r.text},
-            )
+            logger.error(f"Meta API error: {error}")
+            raise error
 
         except requests.exceptions.Timeout:
-            if attempt < MAX_RETRIES - 1:
+            if attempt < attempts - 1:
                 wait_time = 2 ** attempt
                 logger.warning(f"Request timeout. Retrying in {wait_time}s...")
                 time.sleep(wait_time)
                 continue
-            logger.error(f"Request timeout after {MAX_RETRIES} attempts")
+            logger.error(f"Request timeout after {attempts} attempts")
             raise MetaAPIError(
                 status=504,
                 message=f"Request timeout after {REQUEST_TIMEOUT}s",
@@ -167,6 +273,276 @@ def gget(path: str, params: Optional[dict] = None, token: Optional[str] = None):
     return {"data": []}
 
 
+_gget_flight = SingleFlight("graph_get")
+
+
+def _auth_params(token: Optional[str]) -> Dict[str, str]:
+    request_token = token or TOKEN
+    if not request_token:
+        raise RuntimeError("META_SYSTEM_USER_TOKEN is not configured")
+    auth = {"access_token": request_token}
+    proof = appsecret_proof(request_token)
+    if proof:
+        auth["appsecret_proof"] = proof
+    return auth
+
+
+def gget(path: str, params: Optional[dict] = None, token: Optional[str] = None):
+    """
+    Faz requisição GET à Meta Graph API com retry exponencial e timeout configurável.
+
+    Args:
+        path: Caminho da API (ex: "/me")
+        params: Parâmetros da query string
+        token: Token de acesso (usa TOKEN global se não fornecido)
+
+    Returns:
+        dict: Resposta JSON da API
+
+    Raises:
+        MetaAPIError: Se a requisição falhar após todos os retries
+    """
+    query = _auth_params(token)
+    if params:
+        query.update(params)
+
+    url = f"{BASE}{path}?{urlencode(query, doseq=True)}"
+    # Chamadas idênticas em voo (mesmo path, params, token e prioridade) compartilham uma única requisição.
+    # A prioridade entra na chave: uma chamada interativa nunca espera um líder de warmup/ingestão,
+    # que pode aguardar o orçamento da Graph API por minutos.
+    flight_key = (
+        current_priority(),
+        path,
+        urlencode(sorted(query.items(), key=lambda item: str(item[0])), doseq=True),
+    )
+    return _gget_flight.do(
+        flight_key,
+        lambda: _graph_request("GET", url, path, query["access_token"]),
+        clone=copy.deepcopy,
+    )
+
+
+def _batch_relative_url(path: str, params: Optional[dict]) -> str:
+    relative = path.lstrip("/")
+    if params:
+        relative = f"{relative}?{urlencode(params, doseq=True)}"
+    return relative
+
+
+_token_slots: Dict[str, threading.BoundedSemaphore] = {}
+_token_slots_lock = threading.Lock()
+
+
+def _token_slot(token: Optional[str]) -> threading.BoundedSemaphore:
+    key = hashlib.sha256((token or TOKEN or "").encode()).hexdigest()
+    with _token_slots_lock:
+        slot = _token_slots.get(key)
+        if slot is None:
+            slot = threading.BoundedSemaphore(MAX_IN_FLIGHT_PER_TOKEN)
+            _token_slots[key] = slot
+        return slot
+
+
+def run_bounded(fn, items: Sequence[Any], token: Optional[str] = None) -> List[Any]:
+    """
+    Executa fn(item) para cada item em paralelo, respeitando MAX_IN_FLIGHT_PER_TOKEN
+    chamadas simultâneas por token (somando todos os fan-outs do processo).
+
+    Returns:
+        list: Resultados na mesma ordem de `items`. Exceções são propagadas.
+    """
+    if len(items) <= 1:
+        return [fn(item) for item in items]
+
+    slot = _token_slot(token)
+
+    def _guarded(item: Any) -> Any:
+        with slot:
+            return fn(item)
+
+    workers = min(len(items), FANOUT_MAX_WORKERS, MAX_IN_FLIGHT_PER_TOKEN)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="meta-fanout") as executor:
+        # Cada tarefa leva uma cópia do contexto de quem chamou (ex.: prioridade da requisição).
+        futures = [
+            executor.submit(contextvars.copy_context().run, _guarded, item)
+            for item in items
+        ]
+        return [future.result() for future in futures]
+
+
+def gbatch(calls: Sequence[Tuple[str, Optional[dict]]], token: Optional[str] = None) -> List[Any]:
+    """
+    Executa várias requisições GET via endpoint `batch` da Graph API
+    (até BATCH_MAX_REQUESTS sub-requisições por POST; POSTs em paralelo limitado).
+
+    Args:
+        calls: Sequência de (path, params) no mesmo formato aceito por gget
+        token: Token de acesso (usa TOKEN global se não fornecido)
+
+    Returns:
+        list: Na mesma ordem de `calls`, o JSON de cada sub-requisição bem-sucedida
+        ou o MetaAPIError correspondente à falha daquele item.
+
+    Raises:
+        MetaAPIError: Se o POST de algum batch falhar por inteiro
+    """
+    auth = _auth_params(token)
+
+    def _post_chunk(chunk: Sequence[Tuple[str, Optional[dict]]]) -> List[Any]:
+        form = dict(auth)
+        form["include_headers"] = "false"
+        form["batch"] = json.dumps([
+            {"method": "GET", "relative_url": _batch_relative_url(path, params)}
+            for path, params in chunk
+        ])
+        items = _graph_request("POST", f"{BASE}/", f"batch[{len(chunk)}]", auth["access_token"], data=form)
+        if not isinstance(items, list):
+            items = []
+        chunk_results: List[Any] = []
+        for offset, (path, params) in enumerate(chunk):
+            item = items[offset] if offset < len(items) else None
+            if not isinstance(item, dict):
+                # A Meta devolve null para sub-requisições que não couberam no tempo do batch.
+                try:
+                    chunk_results.append(gget(path, params, token=token))
+                except MetaAPIError as err:
+                    chunk_results.append(err)
+                continue
+            status = int(item.get("code") or 0)
+            body_text = item.get("body")
+            try:
+                body = json.loads(body_text) if isinstance(body_text, str) else (body_text or {})
+            except ValueError:
+                body = {}
+            if 200 <= status < 300:
+                chunk_results.append(body)
+                continue
+            error = _meta_error_from_response(status, body, body_text if isinstance(body_text, str) else "")
+            if is_rate_limit_error(status, error.code):
+                rate_limit_governor.note_throttled(auth["access_token"], status, error.code)
+            chunk_results.append(error)
+        return chunk_results
+
+    chunks = [calls[start:start + BATCH_MAX_REQUESTS] for start in range(0, len(calls), BATCH_MAX_REQUESTS)]
+    results: List[Any] = []
+    for chunk_results in run_bounded(_post_chunk, chunks, token=token):
+        results.extend(chunk_results)
+    return results
+
+
+def _run_graph_calls(calls: Sequence[Tuple[str, Optional[dict]]], token: Optional[str] = None) -> List[Any]:
+    """
+    Executa as chamadas em batch (ou em paralelo limitado, quando o batch está desativado).
+    Cada posição recebe o JSON, o MetaAPIError do item ou None em falha geral.
+    """
+    if BATCH_ENABLED and len(calls) > 1:
+        try:
+            return gbatch(calls, token=token)
+        except Exception as err:  # noqa: BLE001
+            logger.warning("Falha no batch de %s chamadas da Graph API: %s", len(calls), err)
+            return [None] * len(calls)
+
+    def _call(call: Tuple[str, Optional[dict]]) -> Any:
+        path, params = call
+        try:
+            return gget(path, params, token=token)
+        except MetaAPIError as err:
+            return err
+        except Exception as err:  # noqa: BLE001
+            logger.warning("Falha ao chamar %s: %s", path, err)
+            return None
+
+    return run_bounded(_call, calls, token=token)
+
+
+def fetch_media_insights(
+    items: Sequence[Tuple[str, Sequence[str]]],
+    params: Optional[dict] = None,
+    token: Optional[str] = None,
+    unsupported_metrics: Optional[set] = None,
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Busca /{media_id}/insights de várias mídias agrupando as chamadas em batch.
+
+    Args:
+        items: Sequência de (media_id, métricas)
+        params: Parâmetros extras (ex: {"period": "lifetime"})
+        token: Token de acesso
+        unsupported_metrics: Conjunto compartilhado de métricas rejeitadas; é
+            consultado antes de cada rodada e atualizado com novas rejeições
+            somente nesta thread, depois que os workers terminam.
+
+    Returns:
+        list: Na mesma ordem de `items`, {"data": [...]} com as métricas obtidas
+        ou None quando nada pôde ser lido. Se uma mídia rejeita o conjunto de
+        métricas, somente ela é reenviada, uma métrica por sub-requisição.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    pending: List[Tuple[int, List[str]]] = []
+    for index, (media_id, metrics) in enumerate(items):
+        requested = [m for m in metrics if not unsupported_metrics or m not in unsupported_metrics]
+        if media_id and requested:
+            pending.append((index, requested))
+
+    while pending:
+        calls = [
+            (f"/{items[index][0]}/insights", {**(params or {}), "metric": ",".join(metrics)})
+            for index, metrics in pending
+        ]
+        responses = _run_graph_calls(calls, token=token)
+        retry: List[Tuple[int, List[str]]] = []
+        for (index, metrics), response in zip(pending, responses):
+            if isinstance(response, MetaAPIError):
+                if is_rate_limit_error(response.status, response.code):
+                    # Limite de uso não indica métrica inválida: não reenviar nem marcar como não suportada.
+                    continue
+                if len(metrics) > 1:
+                    retry.extend((index, [metric]) for metric in metrics)
+                    continue
+                logger.debug(
+                    "Metric %s not supported for media %s: %s", metrics[0], items[index][0], response
+                )
+                if unsupported_metrics is not None:
+                    unsupported_metrics.add(metrics[0])
+                continue
+            if not isinstance(response, dict):
+                continue
+            merged = results[index] or {"data": []}
+            merged["data"].extend(response.get("data") or [])
+            results[index] = merged
+        if unsupported_metrics:
+            retry = [(index, metrics) for index, metrics in retry if metrics[0] not in unsupported_metrics]
+        pending = retry
+    return results
+
+
+def _media_insight_values(response: Optional[Dict[str, Any]]) -> Dict[str, float]:
+    """Converte a resposta de /{media_id}/insights em {métrica: valor numérico}."""
+    insight_values: Dict[str, float] = {}
+    for entry in (response or {}).get("data", []) or []:
+        name = str(entry.get("name") or "").lower()
+        values = entry.get("values")
+        value = None
+        if isinstance(values, list):
+            for candidate in values:
+                if isinstance(candidate, dict) and candidate.get("value") is not None:
+                    value = candidate["value"]
+                    break
+        if value is None:
+            value = entry.get("value")
+        if isinstance(value, dict):
+            value = value.get("value")
+        if value is None:
+            continue
+        if not isinstance(value, (int, float)):
+            try:
+                value = float(str(value))
+            except (TypeError, ValueError):
+                continue
+        insight_values[name] = float(value)
+    return insight_values
+
+
 # Cache simples para page tokens (System User token não expira)
 PAGE_TOKEN_CACHE: Dict[str, str] = {}
 
@@ -918,6 +1294,113 @@ def fetch_page_video_metrics(page_id: str, page_token: str, since: int, until: i
 
 # ---- Instagram (orgânico) ----
 
+def _ig_media_is_video(media: Dict[str, Any]) -> bool:
+    media_type = (media.get("media_type") or "").upper()
+    media_product_type = (media.get("media_product_type") or "").upper()
+    return media_type in {"VIDEO", "REEL", "IGTV"} or media_product_type in {"REELS", "VIDEO", "IGTV"}
+
+
+def _ig_post_metrics(media: Dict[str, Any], media_insights: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Normaliza os insights de uma mídia (likes, reach, views, tempo assistido...)."""
+    timestamp_unix = None
+    timestamp_iso = media.get("timestamp")
+    if timestamp_iso:
+        try:
+            timestamp_dt = datetime.fromisoformat(timestamp_iso.replace("Z", "+00:00"))
+            timestamp_unix = int(timestamp_dt.timestamp())
+        except ValueError:
+            pass
+
+    insights_map = {}
+    for item in (media_insights or {}).get("data", []):
+        name = (item.get("name") or "").lower()
+        values = item.get("values") or [{}]
+        insights_map[name] = int((values[0].get("value") or 0))
+
+    reach_value = insights_map.get("reach") or 0
+    if _ig_media_is_video(media):
+        video_views_value = insights_map.get("video_views") or insights_map.get("views") or 0
+        if not video_views_value:
+            video_views_value = reach_value or 0
+    else:
+        video_views_value = reach_value or 0
+
+    return {
+        "timestamp_unix": timestamp_unix,
+        "likes": insights_map.get("likes") or media.get("like_count") or 0,
+        "comments": insights_map.get("comments") or media.get("comments_count") or 0,
+        "shares": insights_map.get("shares") or 0,
+        "saves": insights_map.get("saved") or insights_map.get("saves") or 0,
+        "reach": reach_value,
+        "views": int(video_views_value or 0),
+        "view_time": _coerce_number(
+            insights_map.get("video_view_time")
+            or insights_map.get("total_video_view_time")
+            or insights_map.get("video_view_time_total")
+        ),
+        "avg_watch_time": _coerce_number(
+            insights_map.get("avg_watch_time")
+            or insights_map.get("average_watch_time")
+            or insights_map.get("avg_time")
+        ),
+    }
+
+
+def _iter_ig_media_metrics(ig_user_id: str, since: int, until: int) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    Percorre as mídias publicadas no período (insights de cada página em batch)
+    e devolve pares (mídia, métricas normalizadas).
+    """
+    page = gget(
+        f"/{ig_user_id}/media",
+        {
+            "since": since,
+            "until": until,
+            "limit": 100,
+            "fields": "id,media_type,media_product_type,timestamp,like_count,comments_count,permalink",
+        },
+    )
+    while True:
+        page_media = page.get("data", [])
+        insight_requests = []
+        for media in page_media:
+            metrics_list = ["reach", "shares", "saved", "likes", "comments"]
+            if _ig_media_is_video(media):
+                metrics_list.extend(["video_views", "video_view_time", "avg_watch_time"])
+            insight_requests.append((media.get("id"), metrics_list))
+        page_insights = fetch_media_insights(insight_requests)
+
+        for media, media_insights in zip(page_media, page_insights):
+            yield media, _ig_post_metrics(media, media_insights)
+
+        next_page = (page.get("paging") or {}).get("next")
+        if not next_page:
+            break
+        page = _get_http_session().get(next_page, timeout=15).json()
+
+
+def _follow_type_breakdown(breakdown: Dict[str, float]) -> Optional[Dict[str, int]]:
+    """Agrupa o breakdown follow_type em seguidores / não seguidores / outros."""
+    visitors_breakdown = {"followers": 0.0, "non_followers": 0.0, "other": 0.0}
+    for key, value in breakdown.items():
+        norm = (key or "").strip().lower()
+        if "non" in norm and "follow" in norm:
+            visitors_breakdown["non_followers"] += value or 0
+        elif "follow" in norm:
+            visitors_breakdown["followers"] += value or 0
+        else:
+            visitors_breakdown["other"] += value or 0
+    visitors_total = sum(visitors_breakdown.values())
+    if visitors_total <= 0:
+        return None
+    return {
+        "followers": int(visitors_breakdown["followers"]),
+        "non_followers": int(visitors_breakdown["non_followers"]),
+        "other": int(visitors_breakdown["other"]),
+        "total": int(visitors_total),
+    }
+
+
 def ig_window(ig_user_id: str, since: int, until: int) -> Dict[str, Any]:
     """
     Métricas de conta Instagram para um período.
@@ -1026,136 +1509,58 @@ def ig_window(ig_user_id: str, since: int, until: int) -> Dict[str, Any]:
     post_details: List[Dict[str, Any]] = []
 
     try:
-        media_response = gget(
-            f"/{ig_user_id}/media",
-            {
-                "since": since,
-                "until": until,
-                "limit": 100,
-                "fields": "id,media_type,media_product_type,timestamp,like_count,comments_count,permalink",
-            },
-        )
-
-        page = media_response
-        while True:
-            for media in page.get("data", []):
-                media_id = media.get("id")
-                timestamp_iso = media.get("timestamp")
-                timestamp_unix = None
-
-                if timestamp_iso:
-                    try:
-                        timestamp_dt = datetime.fromisoformat(timestamp_iso.replace("Z", "+00:00"))
-                        timestamp_unix = int(timestamp_dt.timestamp())
-                    except ValueError:
-                        pass
-
-                media_type = (media.get("media_type") or "").upper()
-                media_product_type = (media.get("media_product_type") or "").upper()
-                is_video_type = media_type in {"VIDEO", "REEL", "IGTV"} or media_product_type in {"REELS", "VIDEO", "IGTV"}
-
-                metrics_list = ["reach", "shares", "saved", "likes", "comments"]
-                if is_video_type:
-                    metrics_list.extend(["video_views", "video_view_time", "avg_watch_time"])
-
+        for media, post in _iter_ig_media_metrics(ig_user_id, since, until):
+            likes = post["likes"]
+            comments = post["comments"]
+            shares = post["shares"]
+            saves = post["saves"]
+            reach_value = post["reach"]
+            video_views_value = post["views"]
+            view_time_value = post["view_time"]
+            avg_watch_time_value = post["avg_watch_time"]
+            timestamp_iso = media.get("timestamp")
+
+            sum_likes += likes
+            sum_comments += comments
+            sum_shares += shares
+            sum_saves += saves
+            sum_video_views += video_views_value
+
+            if view_time_value is not None and video_views_value > 0:
+                sum_video_watch_time += float(view_time_value)
+                sum_video_watch_time_views += int(video_views_value)
+            elif avg_watch_time_value is not None and video_views_value > 0:
+                weighted_avg_watch_time_total += float(avg_watch_time_value) * int(video_views_value)
+                weighted_avg_watch_time_views += int(video_views_value)
+
+            if (video_views_value or reach_value) and timestamp_iso:
+                date_key = None
                 try:
-                    media_insights = gget(
-                        f"/{media_id}/insights",
-                        {"metric": ",".join(metrics_list)},
-                    )
-                    insights_map = {}
-                    for item in media_insights.get("data", []):
-                        name = (item.get("name") or "").lower()
-                        values = item.get("values") or [{}]
-                        insights_map[name] = int((values[0].get("value") or 0))
-                except MetaAPIError:
-                    insights_map = {}
-                    try:
-                        fallback_metrics = "reach,shares,saved,likes,comments"
-                        if is_video_type:
-                            fallback_metrics += ",video_views"
-                        fallback_insights = gget(
-                            f"/{media_id}/insights",
-                            {"metric": fallback_metrics},
-                        )
-                        for item in fallback_insights.get("data", []):
-                            name = (item.get("name") or "").lower()
-                            values = item.get("values") or [{}]
-                            insights_map[name] = int((values[0].get("value") or 0))
-                    except MetaAPIError:
-                        insights_map = {}
-
-                likes = insights_map.get("likes") or media.get("like_count") or 0
-                comments = insights_map.get("comments") or media.get("comments_count") or 0
-                shares = insights_map.get("shares") or 0
-                saves = insights_map.get("saved") or insights_map.get("saves") or 0
-                reach_value = insights_map.get("reach") or 0
-                video_views_value = 0
-                if is_video_type:
-                    video_views_value = insights_map.get("video_views") or insights_map.get("views") or 0
-                    if not video_views_value:
-                        video_views_value = reach_value or 0
-                else:
-                    video_views_value = reach_value or 0
-                video_views_value = int(video_views_value or 0)
-
-                view_time_value = _coerce_number(
-                    insights_map.get("video_view_time")
-                    or insights_map.get("total_video_view_time")
-                    or insights_map.get("video_view_time_total")
-                )
-                avg_watch_time_value = _coerce_number(
-                    insights_map.get("avg_watch_time")
-                    or insights_map.get("average_watch_time")
-                    or insights_map.get("avg_time")
-                )
-
-                sum_likes += likes
-                sum_comments += comments
-                sum_shares += shares
-                sum_saves += saves
-                sum_video_views += video_views_value
-
-                if view_time_value is not None and video_views_value > 0:
-                    sum_video_watch_time += float(view_time_value)
-                    sum_video_watch_time_views += int(video_views_value)
-                elif avg_watch_time_value is not None and video_views_value > 0:
-                    weighted_avg_watch_time_total += float(avg_watch_time_value) * int(video_views_value)
-                    weighted_avg_watch_time_views += int(video_views_value)
-
-                if (video_views_value or reach_value) and timestamp_iso:
-                    date_key = None
-                    try:
-                        dt = datetime.fromisoformat(timestamp_iso.replace("Z", "+00:00"))
-                        date_key = dt.date().isoformat()
-                    except ValueError:
-                        date_key = timestamp_iso[:10]
-                    if date_key:
-                        if video_views_value:
-                            video_views_by_date[date_key] = video_views_by_date.get(date_key, 0) + video_views_value
-                        if reach_value:
-                            reach_by_date[date_key] = reach_by_date.get(date_key, 0) + int(reach_value or 0)
-
-                post_details.append({
-                    "id": media_id,
-                    "timestamp": timestamp_iso,
-                    "timestamp_unix": timestamp_unix,
-                    "permalink": media.get("permalink"),
-                    "media_type": media.get("media_type"),
-                    "media_product_type": media_product_type,
-                    "likes": likes,
-                    "comments": comments,
-                    "shares": shares,
-                    "saves": saves,
-                    "reach": reach_value,
-                    "views": video_views_value,
-                    "interactions": likes + comments + shares + saves,
-                })
-
-            next_page = (page.get("paging") or {}).get("next")
-            if not next_page:
-                break
-            page = requests.get(next_page, timeout=15).json()
+                    dt = datetime.fromisoformat(timestamp_iso.replace("Z", "+00:00"))
+                    date_key = dt.date().isoformat()
+                except ValueError:
+                    date_key = timestamp_iso[:10]
+                if date_key:
+                    if video_views_value:
+                        video_views_by_date[date_key] = video_views_by_date.get(date_key, 0) + video_views_value
+                    if reach_value:
+                        reach_by_date[date_key] = reach_by_date.get(date_key, 0) + int(reach_value or 0)
+
+            post_details.append({
+                "id": media.get("id"),
+                "timestamp": timestamp_iso,
+                "timestamp_unix": post["timestamp_unix"],
+                "permalink": media.get("permalink"),
+                "media_type": media.get("media_type"),
+                "media_product_type": (media.get("media_product_type") or "").upper(),
+                "likes": likes,
+                "comments": comments,
+                "shares": shares,
+                "saves": saves,
+                "reach": reach_value,
+                "views": video_views_value,
+                "interactions": likes + comments + shares + saves,
+            })
 
     except MetaAPIError as err:
         logger.warning("Falha ao buscar mídias: %s", err)
@@ -1286,7 +1691,6 @@ def ig_window(ig_user_id: str, since: int, until: int) -> Dict[str, Any]:
         follower_growth = (follows_total or 0) - (unfollows_total or 0)
 
     profile_visitors_breakdown = None
-    visitors_breakdown = {"followers": 0.0, "non_followers": 0.0, "other": 0.0}
 
     for metric_name in ("profile_views", "accounts_engaged"):
         try:
@@ -1303,27 +1707,11 @@ def ig_window(ig_user_id: str, since: int, until: int) -> Dict[str, Any]:
             )
             breakdown = aggregate_dimension_values(breakdown_response, metric_name)
             if breakdown:
-                for key, value in breakdown.items():
-                    norm = (key or "").strip().lower()
-                    if "non" in norm and "follow" in norm:
-                        visitors_breakdown["non_followers"] += value or 0
-                    elif "follow" in norm:
-                        visitors_breakdown["followers"] += value or 0
-                    else:
-                        visitors_breakdown["other"] += value or 0
+                profile_visitors_breakdown = _follow_type_breakdown(breakdown)
                 break
         except MetaAPIError:
             continue
 
-    visitors_total = sum(visitors_breakdown.values())
-    if visitors_total > 0:
-        profile_visitors_breakdown = {
-            "followers": int(visitors_breakdown["followers"]),
-            "non_followers": int(visitors_breakdown["non_followers"]),
-            "other": int(visitors_breakdown["other"]),
-            "total": int(visitors_total),
-        }
-
     return {
         "reach": reach,
         "interactions": interactions,
@@ -1441,6 +1829,241 @@ def _ig_window_chunked(ig_user_id: str, since: int, until: int, chunk_days: int
     return aggregated
 
 
+def _graph_payload(result: Any, label: str) -> Dict[str, Any]:
+    """JSON de um item de _run_graph_calls; erros da Graph (MetaAPIError) viram payload vazio."""
+    if isinstance(result, dict):
+        return result
+    if result is not None:
+        logger.warning("Falha ao buscar %s: %s", label, result)
+    return {"data": []}
+
+
+def _total_value(payload: Dict[str, Any], metric_name: str) -> int:
+    for item in payload.get("data", []):
+        if item.get("name") != metric_name:
+            continue
+        total_value = item.get("total_value")
+        if isinstance(total_value, dict):
+            return int(total_value.get("value") or 0)
+        try:
+            return int(total_value or 0)
+        except (TypeError, ValueError):
+            return 0
+    return 0
+
+
+def ig_window_daily(ig_user_id: str, day_windows: Sequence[Tuple[str, int, int]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Métricas de conta Instagram dia a dia para um intervalo longo, com poucas chamadas.
+
+    - `day_windows`: (dia ISO, since, until) de cada dia, em UTC (ex.: bounds do dia em BRT).
+    - Séries period=day (reach, follower_count, follows_and_unfollows) e a lista de mídias
+      são buscadas uma vez por bloco de até IG_DAILY_SERIES_MAX_DAYS dias e repartidas por dia.
+    - Só as métricas com `metric_type=total_value` (a API devolve um total da janela inteira)
+      continuam com uma janela por dia, agrupadas no endpoint batch.
+    - Dias com alguma chamada que falhou por inteiro (rede, 5xx, batch recusado: item None em
+      _run_graph_calls) ficam fora do retorno, para a ingestão não gravar zeros sobre dados bons.
+
+    Returns:
+        dict: dia ISO -> snapshot com as chaves diárias de ig_window usadas na ingestão
+    """
+    windows = sorted(day_windows, key=lambda window: window[1])
+    if not windows:
+        return {}
+    starts = [window[1] for window in windows]
+    path = f"/{ig_user_id}/insights"
+
+    def _day_of(ts: int) -> Optional[str]:
+        position = bisect_right(starts, ts) - 1
+        if position < 0 or ts > windows[position][2]:
+            return None
+        return windows[position][0]
+
+    def _entry_day(entry: Dict[str, Any]) -> Optional[str]:
+        # Em period=day o end_time marca o fim do dia medido; o valor é do dia anterior.
+        raw_ts, offset = entry.get("end_time"), 86400
+        if not raw_ts:
+            raw_ts, offset = entry.get("start_time"), 0
+        if not raw_ts:
+            return None
+        try:
+            moment = datetime.fromisoformat(str(raw_ts).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        return _day_of(int(moment.timestamp()) - offset)
+
+    reach_by_day: Dict[str, List[float]] = {}
+    followers_by_day: Dict[str, List[Dict[str, Any]]] = {}
+    follows_by_day: Dict[str, List[float]] = {}
+    unfollows_by_day: Dict[str, List[float]] = {}
+    posts_by_day: Dict[str, List[Dict[str, Any]]] = {}
+    follows_fallback_days: List[Tuple[str, int, int]] = []
+    failed_days = set()
+
+    for offset in range(0, len(windows), IG_DAILY_SERIES_MAX_DAYS):
+        chunk = windows[offset:offset + IG_DAILY_SERIES_MAX_DAYS]
+        series_params = {"period": "day", "since": chunk[0][1], "until": chunk[-1][2]}
+        reach_result, follower_result, follows_result = _run_graph_calls(
+            [
+                (path, {**series_params, "metric": "reach"}),
+                (path, {**series_params, "metric": "follower_count"}),
+                (path, {**series_params, "metric": "follows_and_unfollows"}),
+            ],
+        )
+        if reach_result is None or follower_result is None or follows_result is None:
+            failed_days.update(window[0] for window in chunk)
+            continue
+
+        for entry in extract_time_series(_graph_payload(reach_result, "reach diário"), "reach"):
+            day_key = _entry_day(entry)
+            if day_key:
+                reach_by_day.setdefault(day_key, []).append(entry["value"])
+        for entry in extract_time_series(_graph_payload(follower_result, "follower_count"), "follower_count"):
+            day_key = _entry_day(entry)
+            if day_key:
+                followers_by_day.setdefault(day_key, []).append(entry)
+
+        if isinstance(follows_result, dict):
+            for value_key, target in (("follows", follows_by_day), ("unfollows", unfollows_by_day)):
+                for entry in extract_dimension_time_series(follows_result, "follows_and_unfollows", value_key):
+                    day_key = _entry_day(entry)
+                    if day_key:
+                        target.setdefault(day_key, []).append(entry["value"])
+        else:
+            follows_fallback_days.extend(chunk)
+
+        try:
+            for media, post in _iter_ig_media_metrics(ig_user_id, chunk[0][1], chunk[-1][2]):
+                day_key = _day_of(post["timestamp_unix"]) if post["timestamp_unix"] is not None else None
+                if day_key:
+                    posts_by_day.setdefault(day_key, []).append(post)
+        except MetaAPIError as err:
+            logger.warning("Falha ao buscar mídias: %s", err)
+
+    def _total_params(since: int, until: int, metric: str, **extra: Any) -> Dict[str, Any]:
+        params = {"metric": metric, "period": "day", "metric_type": "total_value", "since": since, "until": until}
+        params.update(extra)
+        return params
+
+    daily_calls = []
+    for _day_key, since, until in windows:
+        daily_calls.append((path, _total_params(since, until, "profile_views,website_clicks,accounts_engaged")))
+        daily_calls.append((path, _total_params(since, until, "total_interactions")))
+        daily_calls.append((path, _total_params(since, until, "profile_views", breakdown="follow_type")))
+    for _day_key, since, until in follows_fallback_days:
+        daily_calls.append((path, _total_params(since, until, "follows_and_unfollows")))
+    daily_results = _run_graph_calls(daily_calls)
+
+    totals_by_day: Dict[str, Dict[str, Any]] = {}
+    interactions_by_day: Dict[str, int] = {}
+    breakdown_by_day: Dict[str, Dict[str, float]] = {}
+    for index, (day_key, _since, _until) in enumerate(windows):
+        if any(result is None for result in daily_results[index * 3:index * 3 + 3]):
+            failed_days.add(day_key)
+            continue
+        totals_by_day[day_key] = _graph_payload(daily_results[index * 3], "totais de conta")
+        interactions_by_day[day_key] = _total_value(
+            _graph_payload(daily_results[index * 3 + 1], "total_interactions"), "total_interactions"
+        )
+        breakdown_by_day[day_key] = aggregate_dimension_values(
+            _graph_payload(daily_results[index * 3 + 2], "breakdown profile_views"), "profile_views"
+        )
+    follows_fallback: Dict[str, Dict[str, float]] = {}
+    for index, (day_key, _since, _until) in enumerate(follows_fallback_days):
+        result = daily_results[len(windows) * 3 + index]
+        if result is None:
+            failed_days.add(day_key)
+            continue
+        follows_fallback[day_key] = aggregate_dimension_values(
+            _graph_payload(result, "follows_and_unfollows"), "follows_and_unfollows"
+        )
+
+    # Mesma regra de ig_window: sem breakdown de profile_views, tenta o de accounts_engaged.
+    engaged_days = [
+        window for window in windows if window[0] not in failed_days and not breakdown_by_day[window[0]]
+    ]
+    if engaged_days:
+        engaged_results = _run_graph_calls(
+            [
+                (path, _total_params(since, until, "accounts_engaged", breakdown="follow_type"))
+                for _day_key, since, until in engaged_days
+            ]
+        )
+        for (day_key, _since, _until), result in zip(engaged_days, engaged_results):
+            if result is None:
+                failed_days.add(day_key)
+                continue
+            breakdown_by_day[day_key] = aggregate_dimension_values(
+                _graph_payload(result, "breakdown accounts_engaged"), "accounts_engaged"
+            )
+
+    if failed_days:
+        logger.warning(
+            "Insights diários de %s: %s dia(s) sem resposta da Graph API ficaram de fora (%s a %s).",
+            ig_user_id,
+            len(failed_days),
+            min(failed_days),
+            max(failed_days),
+        )
+
+    snapshots: Dict[str, Dict[str, Any]] = {}
+    for day_key, _since, _until in windows:
+        if day_key in failed_days:
+            continue
+        posts = posts_by_day.get(day_key, [])
+        sum_likes = sum(post["likes"] for post in posts)
+        sum_comments = sum(post["comments"] for post in posts)
+        sum_shares = sum(post["shares"] for post in posts)
+        sum_saves = sum(post["saves"] for post in posts)
+        watch_time = sum(
+            float(post["view_time"]) for post in posts if post["view_time"] is not None and post["views"] > 0
+        )
+
+        reach = int(sum(reach_by_day.get(day_key, [])))
+        if reach == 0:
+            reach = sum(post["reach"] for post in posts)
+
+        follower_series = followers_by_day.get(day_key, [])
+        follower_start = follower_end = follower_growth = None
+        if follower_series:
+            follower_start = int(follower_series[0].get("value") or 0)
+            follower_end = int(follower_series[-1].get("value") or 0)
+            follower_growth = follower_end - follower_start
+
+        if day_key in follows_fallback:
+            follows_total = follows_fallback[day_key].get("follows")
+            unfollows_total = follows_fallback[day_key].get("unfollows")
+        else:
+            follows_total = sum(follows_by_day[day_key]) if day_key in follows_by_day else None
+            unfollows_total = sum(unfollows_by_day[day_key]) if day_key in unfollows_by_day else None
+        if follower_growth is None and (follows_total is not None or unfollows_total is not None):
+            follower_growth = (follows_total or 0) - (unfollows_total or 0)
+
+        totals = totals_by_day[day_key]
+        breakdown = breakdown_by_day[day_key]
+        snapshots[day_key] = {
+            "reach": reach,
+            "interactions": interactions_by_day[day_key] or (sum_likes + sum_comments + sum_shares + sum_saves),
+            "accounts_engaged": _total_value(totals, "accounts_engaged"),
+            "profile_views": _total_value(totals, "profile_views"),
+            "website_clicks": _total_value(totals, "website_clicks"),
+            "video_views": sum(post["views"] for post in posts),
+            "watch_time_total": int(round(watch_time)) if watch_time > 0 else None,
+            "likes": sum_likes,
+            "comments": sum_comments,
+            "shares": sum_shares,
+            "saves": sum_saves,
+            "follower_growth": follower_growth,
+            "follower_count_start": follower_start,
+            "follower_count_end": follower_end,
+            "follows": follows_total,
+            "unfollows": unfollows_total,
+            "profile_visitors_breakdown": _follow_type_breakdown(breakdown) if breakdown else None,
+            "follower_series": follower_series,
+        }
+    return snapshots
+
+
 def _safe(val, cast=float):
     try:
         return cast(val or 0)
@@ -1917,7 +2540,7 @@ def ig_organic_summary(ig_user_id: str, since: int, until: int) -> Dict[str, Any
         nextp = (paging.get("paging") or {}).get("next")
         if not nextp:
             break
-        paging = requests.get(nextp, timeout=15).json()
+        paging = _get_http_session().get(nextp, timeout=15).json()
 
     # TOPS
     def top_by(key):
@@ -1985,7 +2608,7 @@ def ig_organic_summary(ig_user_id: str, since: int, until: int) -> Dict[str, Any
             nextp = (page_s.get("paging") or {}).get("next")
             if not nextp:
                 break
-            page_s = requests.get(nextp, timeout=15).json()
+            page_s = _get_http_session().get(nextp, timeout=15).json()
         top_story = best
     except MetaAPIError:
         top_story = None
@@ -2012,7 +2635,7 @@ def ig_recent_posts(ig_user_id: str, limit: int = 6):
     if cached and cached.get("day") != today_key:
         cached = None
     if cached and (now_ts - cached.get("ts", 0)) < IG_POSTS_MEM_CACHE_TTL_SEC:
-        return copy.deepcopy(cached.get("data"))
+        return cached.get("data")
 
     media_fields = (
         "id,caption,media_type,media_url,thumbnail_url,permalink,timestamp,like_count,comments_count,"
@@ -2030,60 +2653,6 @@ def ig_recent_posts(ig_user_id: str, limit: int = 6):
     VIDEO_TYPES = {"VIDEO", "REEL", "IGTV"}
     unsupported_insight_metrics: set[str] = set()
 
-    def _coerce_numeric(value: Optional[Any]) -> Optional[float]:
-        if value is None:
-            return None
-        if isinstance(value, (int, float)):
-            return float(value)
-        try:
-            return float(str(value))
-        except (TypeError, ValueError):
-            return None
-
-    def _fetch_media_insights(media_id: str, metrics: Sequence[str]) -> Dict[str, float]:
-        request_metrics = [metric for metric in metrics if metric not in unsupported_insight_metrics]
-        if not request_metrics:
-            return {}
-        params = {
-            "metric": ",".join(request_metrics),
-            "period": "lifetime",
-        }
-        try:
-            response = gget(f"/{media_id}/insights", params)
-        except MetaAPIError as err:
-            if len(request_metrics) > 1:
-                combined: Dict[str, float] = {}
-                for metric in request_metrics:
-                    combined.update(_fetch_media_insights(media_id, [metric]))
-                return combined
-            metric_name = request_metrics[0]
-            logger.debug("Metric %s not supported for media %s: %s", metric_name, media_id, err)
-            unsupported_insight_metrics.add(metric_name)
-            return {}
-        except Exception as err:  # noqa: BLE001
-            logger.warning("Falha ao buscar insights do post %s: %s", media_id, err)
-            return {}
-
-        insight_values: Dict[str, float] = {}
-        for entry in response.get("data", []) or []:
-            name = str(entry.get("name") or "").lower()
-            values = entry.get("values")
-            value = None
-            if isinstance(values, list):
-                for candidate in values:
-                    if isinstance(candidate, dict) and candidate.get("value") is not None:
-                        value = candidate["value"]
-                        break
-            if value is None:
-                value = entry.get("value")
-            if isinstance(value, dict):
-                value = value.get("value")
-            numeric = _coerce_numeric(value)
-            if numeric is None:
-                continue
-            insight_values[name] = numeric
-        return insight_values
-
     def normalize_children(child_payload):
         if not child_payload:
             return []
@@ -2154,11 +2723,16 @@ def ig_recent_posts(ig_user_id: str, limit: int = 6):
         "shares": "shares",
     }
 
-    for post in posts:
+    posts_insights = fetch_media_insights(
+        [(post.get("id"), ("saved", "shares")) for post in posts],
+        params={"period": "lifetime"},
+        unsupported_metrics=unsupported_insight_metrics,
+    )
+    for post, post_insights in zip(posts, posts_insights):
         media_id = post.get("id")
         if not media_id:
             continue
-        insights = _fetch_media_insights(media_id, ("saved", "shares"))
+        insights = _media_insight_values(post_insights)
         if insights:
             formatted = {}
             for key, numeric in insights.items():
@@ -2188,15 +2762,16 @@ def ig_recent_posts(ig_user_id: str, limit: int = 6):
         insights_container.setdefault("shares", {"value": post["shares"]})
         post["insights"] = insights_container
 
-    result = {
+    # Somente leitura: o mesmo objeto é devolvido enquanto o cache em memória valer.
+    result = freeze({
         "account": account,
         "posts": posts,
-    }
+    })
 
     IG_POSTS_MEM_CACHE[cache_key] = {
         "ts": now_ts,
         "day": today_key,
-        "data": copy.deepcopy(result),
+        "data": result,
     }
 
     return result
@@ -2236,16 +2811,6 @@ def ig_recent_posts_insights(
         except ValueError:
             return None
 
-    def _coerce_numeric(value: Optional[Any]) -> Optional[float]:
-        if value is None:
-            return None
-        if isinstance(value, (int, float)):
-            return float(value)
-        try:
-            return float(str(value))
-        except (TypeError, ValueError):
-            return None
-
     VIDEO_TYPES = {"VIDEO", "REEL", "IGTV"}
     posts: List[Dict[str, Any]] = []
 
@@ -2286,58 +2851,20 @@ def ig_recent_posts_insights(
     posts.sort(key=lambda post: post.get("timestamp_unix") or 0, reverse=True)
     posts = posts[:limit_sanitized]
 
-    def _fetch_media_insights(media_id: str, metrics: Sequence[str]) -> Dict[str, float]:
-        params = {
-            "metric": ",".join(metrics),
-            "period": "lifetime",
-        }
-        try:
-            response = gget(f"/{media_id}/insights", params)
-        except MetaAPIError as err:
-            if len(metrics) > 1:
-                combined: Dict[str, float] = {}
-                for metric in metrics:
-                    combined.update(_fetch_media_insights(media_id, [metric]))
-                return combined
-            logger.debug("Metric %s not supported for media %s: %s", metrics[0], media_id, err)
-            return {}
-        except Exception as err:  # noqa: BLE001
-            logger.warning("Falha ao buscar insights do post %s: %s", media_id, err)
-            return {}
-
-        insight_values: Dict[str, float] = {}
-        for entry in response.get("data", []) or []:
-            name = str(entry.get("name") or "").lower()
-            values = entry.get("values")
-            value = None
-            if isinstance(values, list):
-                for candidate in values:
-                    if isinstance(candidate, dict) and candidate.get("value") is not None:
-                        value = candidate["value"]
-                        break
-            if value is None:
-                value = entry.get("value")
-            if isinstance(value, dict):
-                value = value.get("value")
-            numeric = _coerce_numeric(value)
-            if numeric is None:
-                continue
-            insight_values[name] = numeric
-        return insight_values
-
+    insight_requests = []
     for post in posts:
-        media_id = post.get("id")
-        if not media_id:
-            continue
-        media_type = (post.get("media_type") or "").upper()
-        media_product_type = (post.get("media_product_type") or "").upper()
-        is_video_type = media_type in VIDEO_TYPES or media_product_type in {"REELS", "VIDEO", "IGTV"}
-
         metrics_list = ["reach", "shares", "saved", "likes", "comments"]
-        if is_video_type:
+        if _ig_media_is_video(post):
             metrics_list.append("video_views")
+        insight_requests.append((post.get("id"), metrics_list))
+    posts_insights = fetch_media_insights(insight_requests, params={"period": "lifetime"})
 
-        insights_map = _fetch_media_insights(media_id, metrics_list)
+    for post, post_insights in zip(posts, posts_insights):
+        media_id = post.get("id")
+        if not media_id:
+            continue
+        is_video_type = _ig_media_is_video(post)
+        insights_map = _media_insight_values(post_insights)
         likes = insights_map.get("likes")
         comments = insights_map.get("comments")
         shares = insights_map.get("shares")
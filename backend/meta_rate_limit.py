@@ -0,0 +1,364 @@
+# backend/meta_rate_limit.py
+"""
+Governador de rate limit da Graph API.
+
+Lê os cabeçalhos de uso da Meta (X-App-Usage, X-Business-Use-Case-Usage,
+X-Ad-Account-Usage) a cada resposta e mantém um orçamento por app e por token.
+Antes de cada chamada, `governor.acquire(token)` decide se a chamada segue, se
+espera o uso estimado baixar ou se aguarda o fim de um bloqueio informado pela Meta.
+
+Prioridades (contextvar): interactive > warmup > ingest. Chamadas de prioridade
+mais baixa começam a desacelerar antes e cedem a vez quando há chamadas
+interativas aguardando. Com META_RATE_LIMIT_SHARED=1 o estado é espelhado na
+tabela meta_rate_limit_state para que workers do gunicorn e o scheduler
+compartilhem o mesmo orçamento.
+"""
+
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_WARMUP = "warmup"
+PRIORITY_INGEST = "ingest"
+_PRIORITY_ORDER = {PRIORITY_INTERACTIVE: 0, PRIORITY_WARMUP: 1, PRIORITY_INGEST: 2}
+
+# Percentual de uso (0-100) a partir do qual cada prioridade passa a esperar.
+_THRESHOLDS = {
+    PRIORITY_INTERACTIVE: float(os.getenv("META_RATE_LIMIT_INTERACTIVE_PCT", "95")),
+    PRIORITY_WARMUP: float(os.getenv("META_RATE_LIMIT_WARMUP_PCT", "75")),
+    PRIORITY_INGEST: float(os.getenv("META_RATE_LIMIT_INGEST_PCT", "60")),
+}
+# Espera máxima antes de seguir mesmo assim (a Meta então devolve o erro e o cache antigo é usado).
+_MAX_WAIT_SECONDS = {
+    PRIORITY_INTERACTIVE: float(os.getenv("META_RATE_LIMIT_INTERACTIVE_MAX_WAIT", "2")),
+    PRIORITY_WARMUP: float(os.getenv("META_RATE_LIMIT_BACKGROUND_MAX_WAIT", "900")),
+    PRIORITY_INGEST: float(os.getenv("META_RATE_LIMIT_BACKGROUND_MAX_WAIT", "900")),
+}
+# Janela da Meta é móvel de 1h: estimamos que o uso cai ~100% por hora sem novas leituras.
+USAGE_DECAY_PER_SECOND = 100.0 / 3600.0
+# Bloqueio aplicado quando a Meta devolve erro de limite sem estimated_time_to_regain_access.
+DEFAULT_BLOCK_SECONDS = float(os.getenv("META_RATE_LIMIT_DEFAULT_BLOCK_SECONDS", "60"))
+# Quantas vezes uma chamada de segundo plano repete após erro de limite.
+BACKGROUND_RATE_LIMIT_RETRIES = int(os.getenv("META_RATE_LIMIT_BACKGROUND_RETRIES", "5"))
+SHARED_STATE_ENABLED = os.getenv("META_RATE_LIMIT_SHARED", "0") == "1"
+SHARED_REFRESH_SECONDS = float(os.getenv("META_RATE_LIMIT_SHARED_REFRESH_SECONDS", "10"))
+SHARED_STATE_TABLE = "meta_rate_limit_state"
+
+# Códigos de erro de limite: app (4), usuário (17), página (32), ação (613), BUC (80001-80014).
+RATE_LIMIT_ERROR_CODES = {4, 17, 32, 613} | set(range(80000, 80015))
+
+_priority: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "meta_request_priority", default=PRIORITY_INTERACTIVE
+)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+@contextmanager
+def request_priority(level: str) -> Iterator[None]:
+    """Define a prioridade das chamadas Graph feitas dentro do bloco (e nos workers de fan-out)."""
+    if level not in _PRIORITY_ORDER:
+        raise ValueError(f"prioridade desconhecida: {level}")
+    reset_token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(reset_token)
+
+
+def is_rate_limit_error(status: Optional[int], code: Optional[int]) -> bool:
+    return status == 429 or (code is not None and code in RATE_LIMIT_ERROR_CODES)
+
+
+def _token_key(token: Optional[str]) -> str:
+    return hashlib.sha256((token or "").encode()).hexdigest()[:16]
+
+
+def _load_header(headers: Mapping[str, str], name: str) -> Any:
+    raw = headers.get(name)
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except ValueError:
+        logger.debug("Cabeçalho %s inválido: %s", name, raw)
+        return None
+
+
+def _usage_pct(entry: Mapping[str, Any]) -> float:
+    values = []
+    for field in ("call_count", "total_cputime", "total_time", "acc_id_util_pct"):
+        try:
+            values.append(float(entry.get(field) or 0))
+        except (TypeError, ValueError):
+            continue
+    return max(values or [0.0])
+
+
+def parse_usage_headers(headers: Mapping[str, str]) -> Dict[str, Any]:
+    """
+    Extrai o uso informado pela Meta.
+
+    Returns:
+        dict: {"app_pct", "token_pct", "regain_seconds"} (valores None quando ausentes)
+    """
+    app_pct: Optional[float] = None
+    token_pct: Optional[float] = None
+    regain_seconds = 0.0
+
+    app_usage = _load_header(headers, "X-App-Usage")
+    if isinstance(app_usage, dict):
+        app_pct = _usage_pct(app_usage)
+
+    buc_usage = _load_header(headers, "X-Business-Use-Case-Usage")
+    if isinstance(buc_usage, dict):
+        for entries in buc_usage.values():
+            for entry in entries if isinstance(entries, list) else [entries]:
+                if not isinstance(entry, dict):
+                    continue
+                token_pct = max(token_pct or 0.0, _usage_pct(entry))
+                try:
+                    regain_minutes = float(entry.get("estimated_time_to_regain_access") or 0)
+                except (TypeError, ValueError):
+                    regain_minutes = 0.0
+                regain_seconds = max(regain_seconds, regain_minutes * 60)
+
+    ad_usage = _load_header(headers, "X-Ad-Account-Usage")
+    if isinstance(ad_usage, dict):
+        token_pct = max(token_pct or 0.0, _usage_pct(ad_usage))
+        try:
+            regain_seconds = max(regain_seconds, float(ad_usage.get("reset_time_duration") or 0))
+        except (TypeError, ValueError):
+            pass
+
+    return {"app_pct": app_pct, "token_pct": token_pct, "regain_seconds": regain_seconds}
+
+
+class _ScopeState:
+    __slots__ = ("usage_pct", "observed_at", "blocked_until")
+
+    def __init__(self) -> None:
+        self.usage_pct = 0.0
+        self.observed_at = 0.0
+        self.blocked_until = 0.0
+
+    def effective_usage(self, now: float) -> float:
+        elapsed = max(0.0, now - self.observed_at)
+        return max(0.0, self.usage_pct - elapsed * USAGE_DECAY_PER_SECOND)
+
+
+class RateLimitGovernor:
+    """Orçamento de chamadas por escopo ("app" e "token:<hash>") compartilhado pelo processo."""
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._scopes: Dict[str, _ScopeState] = {}
+        self._waiting = {level: 0 for level in _PRIORITY_ORDER}
+        self._last_shared_refresh = 0.0
+        self._stats = {"calls": 0, "delayed": 0, "delay_seconds": 0.0, "throttle_errors": 0, "gave_up_waiting": 0}
+
+    def _scope(self, key: str) -> _ScopeState:
+        state = self._scopes.get(key)
+        if state is None:
+            state = _ScopeState()
+            self._scopes[key] = state
+        return state
+
+    def _scope_keys(self, token: Optional[str]) -> List[str]:
+        return ["app", f"token:{_token_key(token)}"]
+
+    def _required_wait(self, keys: List[str], level: str, now: float) -> float:
+        wait = 0.0
+        threshold = _THRESHOLDS[level]
+        for key in keys:
+            state = self._scopes.get(key)
+            if state is None:
+                continue
+            if state.blocked_until > now:
+                wait = max(wait, state.blocked_until - now)
+            usage = state.effective_usage(now)
+            if usage >= threshold:
+                wait = max(wait, (usage - threshold) / USAGE_DECAY_PER_SECOND)
+        rank = _PRIORITY_ORDER[level]
+        if wait <= 0 and any(self._waiting[other] for other, other_rank in _PRIORITY_ORDER.items() if other_rank < rank):
+            # Há chamadas mais prioritárias aguardando orçamento: cede a vez.
+            wait = 0.5
+        return wait
+
+    def acquire(self, token: Optional[str]) -> None:
+        """Bloqueia até que a chamada possa seguir pela prioridade atual (ou até o tempo máximo)."""
+        self._refresh_shared_state()
+        level = current_priority()
+        keys = self._scope_keys(token)
+        started = time.monotonic()
+        deadline = started + _MAX_WAIT_SECONDS[level]
+        with self._cond:
+            self._stats["calls"] += 1
+            self._waiting[level] += 1
+            try:
+                while True:
+                    wait = self._required_wait(keys, level, time.time())
+                    if wait <= 0:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["gave_up_waiting"] += 1
+                        logger.warning(
+                            "Orçamento da Graph API esgotado para %s (%s); seguindo sem esperar mais.",
+                            keys[-1],
+                            level,
+                        )
+                        break
+                    # Acorda antes se chegar leitura nova de uso (notify_all em observe).
+                    self._cond.wait(min(wait, remaining, 30.0))
+            finally:
+                self._waiting[level] -= 1
+                waited = time.monotonic() - started
+                if waited >= 0.01:
+                    self._stats["delayed"] += 1
+                    self._stats["delay_seconds"] += waited
+
+    def observe(self, token: Optional[str], headers: Mapping[str, str]) -> None:
+        """Atualiza o orçamento com os cabeçalhos de uso de uma resposta."""
+        usage = parse_usage_headers(headers)
+        if usage["app_pct"] is None and usage["token_pct"] is None:
+            return
+        now = time.time()
+        app_key, token_key = self._scope_keys(token)
+        with self._cond:
+            changed = []
+            for key, pct in ((app_key, usage["app_pct"]), (token_key, usage["token_pct"])):
+                if pct is None:
+                    continue
+                state = self._scope(key)
+                state.usage_pct = pct
+                state.observed_at = now
+                changed.append(key)
+            if usage["regain_seconds"] > 0:
+                state = self._scope(token_key)
+                state.blocked_until = max(state.blocked_until, now + usage["regain_seconds"])
+            self._cond.notify_all()
+            snapshot = {key: self._scopes[key] for key in changed}
+        self._persist_shared_state(snapshot)
+
+    def note_throttled(self, token: Optional[str], status: Optional[int], code: Optional[int]) -> None:
+        """Registra erro de limite devolvido pela Meta (bloqueia o escopo até a janela aliviar)."""
+        now = time.time()
+        key = "app" if code == 4 else self._scope_keys(token)[1]
+        with self._cond:
+            self._stats["throttle_errors"] += 1
+            state = self._scope(key)
+            state.usage_pct = max(state.usage_pct, 100.0)
+            state.observed_at = now
+            state.blocked_until = max(state.blocked_until, now + DEFAULT_BLOCK_SECONDS)
+            self._cond.notify_all()
+            snapshot = {key: state}
+        logger.warning("Limite da Graph API atingido (status=%s, code=%s) em %s.", status, code, key)
+        self._persist_shared_state(snapshot)
+
+    def max_attempts(self, default: int) -> int:
+        """Tentativas para erros de limite: interativas falham rápido, segundo plano insiste."""
+        if current_priority() == PRIORITY_INTERACTIVE:
+            return default
+        return max(default, BACKGROUND_RATE_LIMIT_RETRIES)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._cond:
+            return {
+                **self._stats,
+                "delay_seconds": round(self._stats["delay_seconds"], 3),
+                "waiting": dict(self._waiting),
+                "shared": SHARED_STATE_ENABLED,
+                "scopes": {
+                    key: {
+                        "usage_pct": round(state.effective_usage(now), 2),
+                        "blocked_for_seconds": round(max(0.0, state.blocked_until - now), 1),
+                    }
+                    for key, state in self._scopes.items()
+                },
+            }
+
+    # Estado compartilhado via Postgres (opcional) -------------------------
+
+    def _persist_shared_state(self, snapshot: Dict[str, _ScopeState]) -> None:
+        if not SHARED_STATE_ENABLED or not snapshot:
+            return
+        try:
+            from db import execute_many
+
+            execute_many(
+                f"""
+                INSERT INTO {SHARED_STATE_TABLE} (scope_key, usage_pct, observed_at, blocked_until, updated_at)
+                VALUES (%(scope_key)s, %(usage_pct)s, to_timestamp(%(observed_at)s), to_timestamp(%(blocked_until)s), NOW())
+                ON CONFLICT (scope_key) DO UPDATE SET
+                    usage_pct = EXCLUDED.usage_pct,
+                    observed_at = EXCLUDED.observed_at,
+                    blocked_until = GREATEST({SHARED_STATE_TABLE}.blocked_until, EXCLUDED.blocked_until),
+                    updated_at = NOW()
+                WHERE {SHARED_STATE_TABLE}.observed_at <= EXCLUDED.observed_at
+                """,
+                [
+                    {
+                        "scope_key": key,
+                        "usage_pct": state.usage_pct,
+                        "observed_at": state.observed_at,
+                        "blocked_until": state.blocked_until,
+                    }
+                    for key, state in snapshot.items()
+                ],
+            )
+        except Exception as err:  # noqa: BLE001
+            logger.debug("Falha ao gravar estado de rate limit compartilhado: %s", err)
+
+    def _refresh_shared_state(self) -> None:
+        if not SHARED_STATE_ENABLED:
+            return
+        now = time.time()
+        with self._cond:
+            if now - self._last_shared_refresh < SHARED_REFRESH_SECONDS:
+                return
+            self._last_shared_refresh = now
+        try:
+            from db import fetch_all
+
+            rows = fetch_all(
+                f"""
+                SELECT scope_key,
+                       usage_pct,
+                       EXTRACT(EPOCH FROM observed_at) AS observed_at,
+                       EXTRACT(EPOCH FROM blocked_until) AS blocked_until
+                FROM {SHARED_STATE_TABLE}
+                WHERE observed_at > NOW() - INTERVAL '1 hour' OR blocked_until > NOW()
+                """
+            )
+        except Exception as err:  # noqa: BLE001
+            logger.debug("Falha ao ler estado de rate limit compartilhado: %s", err)
+            return
+        with self._cond:
+            for row in rows:
+                state = self._scope(row["scope_key"])
+                observed_at = float(row.get("observed_at") or 0)
+                if observed_at > state.observed_at:
+                    state.usage_pct = float(row.get("usage_pct") or 0)
+                    state.observed_at = observed_at
+                state.blocked_until = max(state.blocked_until, float(row.get("blocked_until") or 0))
+            self._cond.notify_all()
+
+
+governor = RateLimitGovernor()
+
+
+def get_rate_limit_stats() -> Dict[str, Any]:
+    return governor.stats()
@@ -1,15 +1,21 @@
 from __future__ import annotations
 
+import copy
+import itertools
 import logging
+import os
 import re
 import threading
+from collections import OrderedDict
+from datetime import date, datetime
 from types import SimpleNamespace
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
 from psycopg2 import sql
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import Json, RealDictCursor
 
 from db import get_pool, is_configured
+from json_utils import dumps as json_dumps
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +24,119 @@ _client: Optional["PostgresLikeClient"] = None
 
 _COLUMN_RE = re.compile(r"^[A-Za-z0-9_]+$")
 _SELECT_SPLITTER = re.compile(r"\s*,\s*")
+# Coluna extra do RETURNING do upsert: true quando a linha foi inserida (xmax = 0), false quando atualizada.
+UPSERT_STATUS_COLUMN = "_upsert_inserted"
+STATEMENT_CACHE_SIZE = int(os.getenv("POSTGRES_STATEMENT_CACHE_SIZE", "512"))
+
+
+def _parse_columns(columns: Union[str, Sequence[str], None]) -> List[str]:
+    if columns is None:
+        return []
+    if isinstance(columns, str):
+        if columns.strip() == "*":
+            return ["*"]
+        parsed = [col.strip() for col in _SELECT_SPLITTER.split(columns) if col.strip()]
+    else:
+        parsed = list(columns)
+    for col in parsed:
+        if col != "*" and not _COLUMN_RE.match(col):
+            raise ValueError(f"Invalid column name '{col}'.")
+    return parsed
+
+
+def _parse_conflict_columns(on_conflict: str) -> List[str]:
+    conflicts = [col.strip() for col in on_conflict.split(",") if col.strip()]
+    if not conflicts:
+        raise ValueError("on_conflict must define at least one column.")
+    for col in conflicts:
+        if not _COLUMN_RE.match(col):
+            raise ValueError(f"Invalid conflict column '{col}'.")
+    return conflicts
+
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _copy_value(value: Any) -> str:
+    """Valor no formato text do COPY (\\N para NULL; dict/list/Json viram JSON)."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, Json):
+        text = value.dumps(value.adapted)
+    elif isinstance(value, (dict, list, tuple)):
+        text = json_dumps(value)
+    elif isinstance(value, (datetime, date)):
+        text = value.isoformat()
+    else:
+        text = str(value)
+    return text.translate(_COPY_ESCAPES)
+
+
+class _CopyStream:
+    """Arquivo somente leitura que gera as linhas do COPY sob demanda (para copy_expert)."""
+
+    def __init__(self, rows: Iterable[Dict[str, Any]], columns: Sequence[str]):
+        self._rows = iter(rows)
+        self._columns = list(columns)
+        self._buffer = bytearray()
+        self.row_count = 0
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            line = "\t".join(_copy_value(row.get(column)) for column in self._columns) + "\n"
+            self._buffer += line.encode("utf-8")
+            self.row_count += 1
+        if size < 0:
+            size = len(self._buffer)
+        chunk = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return chunk
+
+
+class _StatementCache:
+    """LRU do texto SQL já compilado por formato de consulta (ver TableQuery._statement_shape)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[Any, ...], str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, shape: Tuple[Any, ...]) -> Optional[str]:
+        with self._lock:
+            statement = self._entries.get(shape)
+            if statement is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(shape)
+            self._hits += 1
+            return statement
+
+    def put(self, shape: Tuple[Any, ...], statement: str) -> None:
+        with self._lock:
+            self._entries[shape] = statement
+            self._entries.move_to_end(shape)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self._hits, "misses": self._misses}
+
+
+_statements = _StatementCache(STATEMENT_CACHE_SIZE)
+# Nomes dos cursores server-side de stream() (únicos por processo).
+_cursor_ids = itertools.count()
+
+
+def get_statement_cache_stats() -> Dict[str, int]:
+    return _statements.stats()
 
 
 class PostgresLikeClient:
@@ -40,24 +159,16 @@ class TableQuery:
         self._insert_rows: Optional[List[Dict[str, Any]]] = None
         self._update_payload: Optional[Dict[str, Any]] = None
         self._on_conflict: Optional[List[str]] = None
+        self._bulk_rows: Optional[Iterable[Dict[str, Any]]] = None
+        self._bulk_columns: Optional[List[str]] = None
+        self._bulk_before: List[Tuple[str, Optional[Dict[str, Any]]]] = []
+        self._returning: List[str] = []
         self._params: Dict[str, Any] = {}
         self._param_index = 0
 
     # ----- Query modifiers -----
     def select(self, columns: Union[str, Sequence[str]] = "*") -> "TableQuery":
-        if isinstance(columns, str):
-            if columns.strip() == "*":
-                parsed = ["*"]
-            else:
-                parsed = [col.strip() for col in _SELECT_SPLITTER.split(columns) if col.strip()]
-        else:
-            parsed = list(columns)
-        if not parsed:
-            parsed = ["*"]
-        for col in parsed:
-            if col != "*" and not _COLUMN_RE.match(col):
-                raise ValueError(f"Invalid column name '{col}'.")
-        self._select_columns = parsed
+        self._select_columns = _parse_columns(columns) or ["*"]
         self._action = "select"
         return self
 
@@ -78,6 +189,12 @@ class TableQuery:
     def lte(self, column: str, value: Any) -> "TableQuery":
         return self._add_filter(column, "<=", value)
 
+    def gt(self, column: str, value: Any) -> "TableQuery":
+        return self._add_filter(column, ">", value)
+
+    def lt(self, column: str, value: Any) -> "TableQuery":
+        return self._add_filter(column, "<", value)
+
     def in_(self, column: str, values: Sequence[Any]) -> "TableQuery":
         value_list = list(values)
         return self._add_filter(column, "IN", value_list)
@@ -88,6 +205,24 @@ class TableQuery:
         self._orders.append((column, desc))
         return self
 
+    def after(self, columns: Union[str, Sequence[str]], values: Sequence[Any], desc: bool = False) -> "TableQuery":
+        """
+        Filtro de keyset: linhas depois de `values` na ordem de `columns`, como
+        comparação de tupla `(a, b) > (x, y)` (`<` quando desc). Com um índice nas
+        colunas, cada página custa o mesmo, ao contrário de OFFSET.
+        """
+        key_columns = _parse_columns(columns)
+        key_values = list(values)
+        if not key_columns or "*" in key_columns or len(key_columns) != len(key_values):
+            raise ValueError("Keyset requer colunas e valores na mesma quantidade.")
+        placeholders = []
+        for value in key_values:
+            placeholder = self._next_param_name()
+            self._params[placeholder] = value
+            placeholders.append(placeholder)
+        self._filters.append((tuple(key_columns), "<" if desc else ">", tuple(placeholders)))
+        return self
+
     def offset(self, count: int) -> "TableQuery":
         self._offset = int(count)
         return self
@@ -105,9 +240,17 @@ class TableQuery:
         return self
 
     # ----- Mutations -----
-    def insert(self, rows: Union[Dict[str, Any], Sequence[Dict[str, Any]]]) -> "TableQuery":
+    # `returning`: colunas devolvidas em `data` ("id", "id,name", "*"). Por padrão nada volta
+    # do banco além da contagem (`count`) e, no upsert, do status de cada linha.
+    def insert(
+        self,
+        rows: Union[Dict[str, Any], Sequence[Dict[str, Any]]],
+        *,
+        returning: Union[str, Sequence[str], None] = None,
+    ) -> "TableQuery":
         self._action = "insert"
         self._insert_rows = self._normalize_rows(rows)
+        self._returning = _parse_columns(returning)
         return self
 
     def upsert(
@@ -115,21 +258,46 @@ class TableQuery:
         rows: Union[Dict[str, Any], Sequence[Dict[str, Any]]],
         *,
         on_conflict: str,
+        returning: Union[str, Sequence[str], None] = None,
     ) -> "TableQuery":
         self._action = "upsert"
         self._insert_rows = self._normalize_rows(rows)
-        conflicts = [col.strip() for col in on_conflict.split(",") if col.strip()]
-        if not conflicts:
-            raise ValueError("on_conflict must define at least one column.")
-        for col in conflicts:
-            if not _COLUMN_RE.match(col):
-                raise ValueError(f"Invalid conflict column '{col}'.")
-        self._on_conflict = conflicts
+        self._on_conflict = _parse_conflict_columns(on_conflict)
+        self._returning = _parse_columns(returning)
         return self
 
-    def update(self, payload: Dict[str, Any]) -> "TableQuery":
+    def bulk_upsert(
+        self,
+        rows: Iterable[Dict[str, Any]],
+        *,
+        on_conflict: str,
+        columns: Optional[Sequence[str]] = None,
+        before: Sequence[Tuple[str, Optional[Dict[str, Any]]]] = (),
+    ) -> "TableQuery":
+        """
+        Upsert em massa: as linhas vão por COPY para uma tabela temporária e entram na tabela
+        com um único INSERT ... SELECT ... ON CONFLICT. `rows` pode ser um gerador (as linhas
+        são lidas sob demanda); sem `columns`, as colunas são as da primeira linha (ou a união
+        das chaves, quando `rows` é uma lista). Dentro do lote, a última linha de cada chave
+        de conflito vence. `before`: (sql, params) executados na mesma transação antes do COPY
+        (ex.: DELETE das linhas que o lote substitui). execute() devolve `inserted` e `updated`.
+        """
+        self._action = "bulk_upsert"
+        self._on_conflict = _parse_conflict_columns(on_conflict)
+        self._bulk_rows = rows
+        self._bulk_columns = list(columns) if columns is not None else None
+        self._bulk_before = list(before)
+        return self
+
+    def update(
+        self,
+        payload: Dict[str, Any],
+        *,
+        returning: Union[str, Sequence[str], None] = None,
+    ) -> "TableQuery":
         self._action = "update"
         self._update_payload = dict(payload)
+        self._returning = _parse_columns(returning)
         return self
 
     # ----- Execution helpers -----
@@ -138,39 +306,254 @@ class TableQuery:
         if pool is None:
             raise RuntimeError("Database connection is not configured.")
 
+        if self._action == "bulk_upsert":
+            return self._execute_bulk_upsert(pool)
+        if self._action not in ("select", "insert", "upsert", "update"):
+            raise ValueError(f"Ação desconhecida: {self._action}")
+        shape, build = self._statement_shape()
+        params = self._build_params()
         with pool.connection() as conn:
+            statement = _statements.get(shape) if shape is not None else None
+            if statement is None:
+                statement = build().as_string(conn)
+                if shape is not None:
+                    _statements.put(shape, statement)
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                if self._action == "select":
-                    query, params = self._build_select()
-                    cur.execute(query, params)
-                    rows = cur.fetchall()
-                elif self._action == "insert":
-                    query, params = self._build_insert()
-                    cur.execute(query, params)
-                    rows = cur.fetchall()
+                cur.execute(statement, params)
+                rows = cur.fetchall() if cur.description is not None else []
+                count = cur.rowcount
+                if self._action != "select":
                     conn.commit()
-                elif self._action == "upsert":
-                    query, params = self._build_upsert()
-                    cur.execute(query, params)
-                    rows = cur.fetchall()
-                    conn.commit()
-                elif self._action == "update":
-                    query, params = self._build_update()
-                    cur.execute(query, params)
-                    rows = cur.fetchall()
+        if self._action == "select":
+            return SimpleNamespace(data=rows, error=None)
+        if self._action == "upsert":
+            # Status por linha vem do próprio INSERT ... ON CONFLICT (sem SELECT prévio).
+            statuses = [bool(row.pop(UPSERT_STATUS_COLUMN, False)) for row in rows]
+            inserted = sum(statuses)
+            return SimpleNamespace(
+                data=rows if self._returning else [],
+                error=None,
+                count=count,
+                inserted=inserted,
+                updated=len(statuses) - inserted,
+                statuses=["inserted" if status else "updated" for status in statuses],
+            )
+        if self._action == "insert":
+            return SimpleNamespace(data=rows, error=None, count=count, inserted=count, updated=0)
+        return SimpleNamespace(data=rows, error=None, count=count)
+
+    def keyset_pages(
+        self,
+        key_columns: Union[str, Sequence[str]],
+        page_size: int = 1000,
+        desc: bool = False,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Pagina um select por keyset (seek): cada página é ordenada por `key_columns` e a
+        seguinte começa depois da última chave vista, sem OFFSET. As colunas devem formar
+        uma chave única (ex.: "timestamp,id") e estar no select. Cada página é uma consulta
+        própria, então nenhuma conexão fica presa entre páginas.
+        """
+        keys = _parse_columns(key_columns)
+        if not keys or "*" in keys:
+            raise ValueError("keyset_pages requer colunas de chave.")
+        if self._action != "select" or self._orders or self._offset is not None:
+            raise ValueError("keyset_pages só se aplica a select sem order/offset próprios.")
+        last_key: Optional[List[Any]] = None
+        while True:
+            query = self._clone()
+            if last_key is not None:
+                query.after(keys, last_key, desc=desc)
+            for column in keys:
+                query.order(column, desc=desc)
+            query.limit(page_size)
+            page = query.execute().data or []
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            last_key = [page[-1][column] for column in keys]
+
+    def stream(self, batch_size: int = 2000) -> Iterator[Dict[str, Any]]:
+        """
+        Itera o resultado de um select por um cursor nomeado (server-side): o Postgres
+        entrega `batch_size` linhas por vez e só o lote atual fica em memória. A conexão
+        fica reservada do pool até o iterador terminar (ou ser fechado), então consuma
+        sem pausas longas.
+        """
+        if self._action != "select":
+            raise ValueError("stream só se aplica a select.")
+        pool = get_pool()
+        if pool is None:
+            raise RuntimeError("Database connection is not configured.")
+        shape, build = self._statement_shape()
+        params = self._build_params()
+        with pool.connection() as conn:
+            statement = _statements.get(shape)
+            if statement is None:
+                statement = build().as_string(conn)
+                _statements.put(shape, statement)
+            name = f"stream_{next(_cursor_ids)}"
+            with conn.cursor(name=name, cursor_factory=RealDictCursor) as cur:
+                cur.itersize = max(1, int(batch_size))
+                cur.execute(statement, params)
+                yield from cur
+            # Fecha a transação só de leitura aberta pelo cursor nomeado.
+            conn.rollback()
+
+    def _clone(self) -> "TableQuery":
+        clone = copy.copy(self)
+        clone._select_columns = list(self._select_columns)
+        clone._filters = list(self._filters)
+        clone._orders = list(self._orders)
+        clone._params = dict(self._params)
+        return clone
+
+    def _execute_bulk_upsert(self, pool: Any) -> SimpleNamespace:
+        rows = self._bulk_rows if self._bulk_rows is not None else []
+        columns = self._bulk_columns
+        if columns is None:
+            if isinstance(rows, (list, tuple)):
+                columns = self._collect_columns(rows)
+            else:
+                iterator = iter(rows)
+                first = next(iterator, None)
+                columns = list(first.keys()) if first else []
+                rows = itertools.chain([first], iterator) if first else []
+        for column in columns:
+            if not _COLUMN_RE.match(column):
+                raise ValueError(f"Invalid column '{column}'.")
+        conflicts = self._on_conflict or []
+        if not columns:
+            if self._bulk_before:
+                with pool.connection() as conn:
+                    with conn.cursor() as cur:
+                        for statement, params in self._bulk_before:
+                            cur.execute(statement, params)
                     conn.commit()
-                else:
-                    raise ValueError(f"Ação desconhecida: {self._action}")
-        return SimpleNamespace(data=rows, error=None)
+            return SimpleNamespace(data=[], error=None, inserted=0, updated=0)
+        missing = [col for col in conflicts if col not in columns]
+        if missing:
+            raise ValueError(f"Colunas de conflito ausentes nas linhas: {', '.join(missing)}")
+
+        staging = sql.Identifier(f"_bulk_{self.table_name}")
+        cols = self._format_columns(columns)
+        conflict_sql = sql.SQL(", ").join(sql.Identifier(col) for col in conflicts)
+        update_columns = [col for col in columns if col not in conflicts]
+        if update_columns:
+            on_conflict = sql.SQL("DO UPDATE SET {updates}").format(
+                updates=sql.SQL(", ").join(
+                    sql.SQL("{col} = EXCLUDED.{col}").format(col=sql.Identifier(col)) for col in update_columns
+                )
+            )
+        else:
+            on_conflict = sql.SQL("DO NOTHING")
+        stream = _CopyStream(rows, columns)
+        with pool.connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                for statement, params in self._bulk_before:
+                    cur.execute(statement, params)
+                cur.execute(
+                    sql.SQL(
+                        "CREATE TEMP TABLE {staging} ON COMMIT DROP AS SELECT {cols} FROM {table} WITH NO DATA"
+                    ).format(staging=staging, cols=cols, table=sql.Identifier(self.table_name))
+                )
+                cur.execute(
+                    sql.SQL("ALTER TABLE {staging} ADD COLUMN _bulk_ord BIGSERIAL").format(staging=staging)
+                )
+                cur.copy_expert(
+                    sql.SQL("COPY {staging} ({cols}) FROM STDIN").format(staging=staging, cols=cols).as_string(conn),
+                    stream,
+                )
+                # xmax = 0 só na linha recém-inserida; em conflito a versão nova carrega o xmax da antiga.
+                cur.execute(
+                    sql.SQL(
+                        "WITH upserted AS ("
+                        "INSERT INTO {table} ({cols}) "
+                        "SELECT DISTINCT ON ({conflict}) {cols} FROM {staging} "
+                        "ORDER BY {conflict}, _bulk_ord DESC "
+                        "ON CONFLICT ({conflict}) {on_conflict} "
+                        "RETURNING (xmax = 0) AS inserted"
+                        ") SELECT count(*) FILTER (WHERE inserted) AS inserted, "
+                        "count(*) FILTER (WHERE NOT inserted) AS updated FROM upserted"
+                    ).format(
+                        table=sql.Identifier(self.table_name),
+                        cols=cols,
+                        conflict=conflict_sql,
+                        staging=staging,
+                        on_conflict=on_conflict,
+                    )
+                )
+                counts = cur.fetchone() or {}
+            conn.commit()
+        logger.debug("bulk_upsert %s: %s linhas via COPY", self.table_name, stream.row_count)
+        return SimpleNamespace(
+            data=[],
+            error=None,
+            inserted=int(counts.get("inserted") or 0),
+            updated=int(counts.get("updated") or 0),
+        )
+
+    def _statement_shape(self) -> Tuple[Optional[Tuple[Any, ...]], Callable[[], sql.Composable]]:
+        """
+        Chave do SQL compilado: tudo que muda o texto da consulta (mas não os valores).
+        Os nomes dos parâmetros são determinísticos para o mesmo formato.
+        Insert/upsert com várias linhas devolvem chave None (não entram no cache): o texto
+        cresce com o lote e cada tamanho de lote viraria uma entrada de vários KB/MB.
+        """
+        filters = tuple((column, operator) for column, operator, _ in self._filters)
+        if self._action == "select":
+            shape = (
+                "select",
+                self.table_name,
+                tuple(self._select_columns),
+                filters,
+                tuple(self._orders),
+                self._limit,
+                self._offset,
+            )
+            return shape, self._build_select
+        if self._action == "update":
+            columns = tuple(self._update_payload or ())
+            return ("update", self.table_name, columns, filters, tuple(self._returning)), self._build_update
+        rows = self._insert_rows or []
+        if len(rows) > 1:
+            return None, self._build_insert if self._action == "insert" else self._build_upsert
+        columns = tuple(self._collect_columns(rows))
+        shape = (
+            self._action,
+            self.table_name,
+            columns,
+            len(rows),
+            tuple(self._on_conflict or ()),
+            tuple(self._returning),
+        )
+        return shape, self._build_insert if self._action == "insert" else self._build_upsert
+
+    def _build_params(self) -> Dict[str, Any]:
+        if self._action == "select":
+            return dict(self._params)
+        if self._action == "update":
+            params = dict(self._params)
+            for name, value in zip(self._update_param_names(), (self._update_payload or {}).values()):
+                params[name] = value
+            return params
+        rows = self._insert_rows or []
+        columns = self._collect_columns(rows)
+        return {
+            f"val_{row_index}_{column}": row.get(column)
+            for row_index, row in enumerate(rows)
+            for column in columns
+        }
 
     # ----- Build queries -----
-    def _build_select(self) -> Tuple[sql.SQL, Dict[str, Any]]:
+    def _build_select(self) -> sql.Composable:
         columns_sql = self._format_columns(self._select_columns)
         base = sql.SQL("SELECT {columns} FROM {table}").format(
             columns=columns_sql,
             table=sql.Identifier(self.table_name),
         )
-        params = dict(self._params)
         where_clause = self._build_where_clause()
         order_clause = self._build_order_clause()
         limit_clause = sql.SQL("")
@@ -179,32 +562,27 @@ class TableQuery:
         offset_clause = sql.SQL("")
         if self._offset is not None:
             offset_clause = sql.SQL(" OFFSET {offset}").format(offset=sql.Literal(self._offset))
-        return base + where_clause + order_clause + limit_clause + offset_clause, params
+        return base + where_clause + order_clause + limit_clause + offset_clause
 
-    def _build_insert(self) -> Tuple[sql.SQL, Dict[str, Any]]:
+    def _build_insert(self) -> sql.Composable:
         rows = self._insert_rows or []
         if not rows:
             raise ValueError("Nenhuma linha fornecida para insert.")
         columns = self._collect_columns(rows)
-        params: Dict[str, Any] = {}
-        values_sql = self._build_values(rows, columns, params)
-        query = sql.SQL("INSERT INTO {table} ({cols}) VALUES {values} RETURNING *").format(
+        query = sql.SQL("INSERT INTO {table} ({cols}) VALUES {values}").format(
             table=sql.Identifier(self.table_name),
             cols=self._format_columns(columns),
-            values=values_sql,
+            values=self._build_values(len(rows), columns),
         )
-        return query, params
+        return query + self._build_returning_clause()
 
-    def _build_upsert(self) -> Tuple[sql.SQL, Dict[str, Any]]:
+    def _build_upsert(self) -> sql.Composable:
         rows = self._insert_rows or []
         conflicts = self._on_conflict or []
         if not rows or not conflicts:
             raise ValueError("Upsert requer linhas e colunas de conflito.")
 
         columns = self._collect_columns(rows)
-        params: Dict[str, Any] = {}
-        values_sql = self._build_values(rows, columns, params)
-
         conflict_sql = sql.SQL(", ").join(sql.Identifier(col) for col in conflicts)
         update_assignments = sql.SQL(", ").join(
             sql.SQL("{col} = EXCLUDED.{col}").format(col=sql.Identifier(col)) for col in columns
@@ -212,26 +590,29 @@ class TableQuery:
 
         query = sql.SQL(
             "INSERT INTO {table} ({cols}) VALUES {values} "
-            "ON CONFLICT ({conflict}) DO UPDATE SET {updates} RETURNING *"
+            "ON CONFLICT ({conflict}) DO UPDATE SET {updates}"
         ).format(
             table=sql.Identifier(self.table_name),
             cols=self._format_columns(columns),
-            values=values_sql,
+            values=self._build_values(len(rows), columns),
             conflict=conflict_sql,
             updates=update_assignments,
         )
-        return query, params
+        status = sql.SQL("(xmax = 0) AS {status}").format(status=sql.Identifier(UPSERT_STATUS_COLUMN))
+        return query + self._build_returning_clause(status)
 
-    def _build_update(self) -> Tuple[sql.SQL, Dict[str, Any]]:
+    def _update_param_names(self) -> List[str]:
+        # Continuam a numeração dos filtros (p0..pN), sem consumir o contador.
+        count = len(self._update_payload or {})
+        return [f"p{self._param_index + offset}" for offset in range(count)]
+
+    def _build_update(self) -> sql.Composable:
         if not self._update_payload:
             raise ValueError("Payload de update vazio.")
         assignments = []
-        params = dict(self._params)
-        for column, value in self._update_payload.items():
+        for column, placeholder in zip(self._update_payload, self._update_param_names()):
             if not _COLUMN_RE.match(column):
                 raise ValueError(f"Invalid column name '{column}'.")
-            placeholder = self._next_param_name()
-            params[placeholder] = value
             assignments.append(
                 sql.SQL("{col} = {placeholder}").format(
                     col=sql.Identifier(column),
@@ -246,7 +627,14 @@ class TableQuery:
             table=sql.Identifier(self.table_name),
             set_clause=set_clause,
         )
-        return query + where_clause + sql.SQL(" RETURNING *"), params
+        return query + where_clause + self._build_returning_clause()
+
+    def _build_returning_clause(self, *extra: sql.Composable) -> sql.Composable:
+        parts = [self._format_columns(self._returning)] if self._returning else []
+        parts.extend(extra)
+        if not parts:
+            return sql.SQL("")
+        return sql.SQL(" RETURNING ") + sql.SQL(", ").join(parts)
 
     # ----- Utility helpers -----
     def _build_where_clause(self) -> sql.SQL:
@@ -254,6 +642,15 @@ class TableQuery:
             return sql.SQL("")
         clauses = []
         for column, operator, placeholder in self._filters:
+            if isinstance(column, tuple):
+                # Keyset (ver after()): (a, b) > (x, y).
+                clause = sql.SQL("({cols}) {op} ({placeholders})").format(
+                    cols=sql.SQL(", ").join(sql.Identifier(col) for col in column),
+                    op=sql.SQL(operator),
+                    placeholders=sql.SQL(", ").join(sql.Placeholder(name) for name in placeholder),
+                )
+                clauses.append(clause)
+                continue
             col_sql = sql.Identifier(column)
             if operator == "IN":
                 clause = sql.SQL("{col} = ANY({placeholder})").format(
@@ -288,19 +685,10 @@ class TableQuery:
                     columns.append(column)
         return columns
 
-    def _build_values(
-        self,
-        rows: Sequence[Dict[str, Any]],
-        columns: Sequence[str],
-        params: Dict[str, Any],
-    ) -> sql.SQL:
+    def _build_values(self, row_count: int, columns: Sequence[str]) -> sql.Composable:
         compiled_rows = []
-        for row_index, row in enumerate(rows):
-            placeholders = []
-            for column in columns:
-                placeholder_name = f"val_{row_index}_{column}"
-                params[placeholder_name] = row.get(column)
-                placeholders.append(sql.Placeholder(placeholder_name))
+        for row_index in range(row_count):
+            placeholders = [sql.Placeholder(f"val_{row_index}_{column}") for column in columns]
             compiled_rows.append(sql.SQL("({values})").format(values=sql.SQL(", ").join(placeholders)))
         return sql.SQL(", ").join(compiled_rows)
 
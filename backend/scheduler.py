@@ -1,7 +1,8 @@
+import functools
 import logging
 import os
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Callable, Dict, List, Optional, Set
 from zoneinfo import ZoneInfo
 
 from apscheduler.schedulers.background import BackgroundScheduler
@@ -10,6 +11,7 @@ from cache import PLATFORM_TABLES, get_cached_payload, get_table_name, list_due_
 from db import execute
 from jobs.instagram_ingest import ingest_account_range, resolve_ingest_accounts
 from meta import MetaAPIError, gget, ig_audience
+from meta_rate_limit import PRIORITY_INGEST, PRIORITY_WARMUP, request_priority
 from ig_audience_snapshots import persist_audience_snapshot
 from postgres_client import get_postgres_client
 
@@ -58,6 +60,17 @@ def cleanup_old_cache_job() -> None:
             logger.error("[cleanup-cache] Falha ao limpar %s: %s", table, err)
 
 
+def _at_priority(level: str, job: Callable[[], None]) -> Callable[[], None]:
+    """Executa o job com a prioridade informada no governador de rate limit da Graph API."""
+
+    @functools.wraps(job)
+    def run() -> None:
+        with request_priority(level):
+            job()
+
+    return run
+
+
 class MetaSyncScheduler:
     def __init__(self, interval_minutes: int = DEFAULT_INTERVAL_MINUTES):
         self.interval_minutes = max(5, interval_minutes)
@@ -85,7 +98,7 @@ class MetaSyncScheduler:
             return
 
         self._scheduler.add_job(
-            self._run_cache_cycle,
+            _at_priority(PRIORITY_WARMUP, self._run_cache_cycle),
             "interval",
             minutes=self.interval_minutes,
             id="meta_cache_refresh",
@@ -97,7 +110,7 @@ class MetaSyncScheduler:
             ingest_hour, ingest_minute = self._parse_ingest_time(self._ingest_time)
             ingest_tz = self._resolve_timezone(self._ingest_timezone)
             self._scheduler.add_job(
-                self._run_ingest_cycle,
+                _at_priority(PRIORITY_INGEST, self._run_ingest_cycle),
                 "cron",
                 hour=ingest_hour,
                 minute=ingest_minute,
@@ -126,7 +139,7 @@ class MetaSyncScheduler:
 
         if self._warm_enabled:
             self._scheduler.add_job(
-                self._warm_all_accounts,
+                _at_priority(PRIORITY_WARMUP, self._warm_all_accounts),
                 "interval",
                 minutes=self.interval_minutes,
                 id="prewarm_dashboards",
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Compara o tempo de serialização de um payload instagram_metrics: json da stdlib
+(como jsonify / psycopg2 Json faziam antes) contra json_utils.
+
+O payload vem, em ordem de preferência, de --file, do ig_cache (entrada mais recente
+de instagram_metrics, opcionalmente filtrada por --ig-user) ou de um payload sintético
+com o mesmo formato.
+
+Usage examples:
+  python scripts/bench_json.py
+  python scripts/bench_json.py --ig-user 17841400000000000 --iterations 500
+  python scripts/bench_json.py --file /tmp/instagram_metrics.json
+"""
+import argparse
+import json
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+ENV_PATH = BASE_DIR / ".env"
+if ENV_PATH.exists():
+    load_dotenv(ENV_PATH, override=False)
+else:
+    load_dotenv(override=False)
+
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+from json_utils import dumps, orjson, response_bytes  # noqa: E402
+
+
+def _sanitize_json(value: Any) -> Any:
+    # Cópia da passada recursiva que cache._persist_entry fazia antes do json_utils.
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, dict):
+        return {key: _sanitize_json(val) for key, val in value.items()}
+    if isinstance(value, list):
+        return [_sanitize_json(item) for item in value]
+    return value
+
+
+def _synthetic_payload(days: int = 90, posts: int = 20) -> Dict[str, Any]:
+    series = [{"date": f"2024-01-{(day % 28) + 1:02d}", "value": 1000 + day * 7} for day in range(days)]
+    metrics = [
+        {"key": key, "label": key.upper(), "value": 12345.0, "deltaPct": 3.21, "timeseries": series}
+        for key in ("reach", "impressions", "profile_views", "accounts_engaged", "interactions")
+    ]
+    top_posts = [
+        {
+            "id": f"1789{index:012d}",
+            "caption": "Legenda do post com acentuação e emoji 🎉 " * 3,
+            "media_type": "IMAGE",
+            "timestamp": "2024-01-15T12:00:00+0000",
+            "like_count": 321,
+            "comments_count": 12,
+            "insights": {"reach": 4000, "saved": 15, "shares": 7},
+        }
+        for index in range(posts)
+    ]
+    return {
+        "since": 1704067200,
+        "until": 1711843200,
+        "metrics": metrics,
+        "follower_series": series,
+        "followers_gain_series": series,
+        "reach_timeseries": series,
+        "profile_views_timeseries": series,
+        "video_views_timeseries": series,
+        "top_posts": top_posts,
+    }
+
+
+def _load_payload(args: argparse.Namespace) -> Dict[str, Any]:
+    if args.file:
+        return json.loads(Path(args.file).read_text(encoding="utf-8"))
+    try:
+        from cache import get_latest_cached_payload
+
+        cached = get_latest_cached_payload("instagram_metrics", args.ig_user, mutable=True)
+    except Exception as err:  # noqa: BLE001
+        print(f"ig_cache indisponível ({err}); usando payload sintético.")
+        cached = None
+    if cached:
+        return cached[0]
+    print("Nenhum instagram_metrics em cache; usando payload sintético.")
+    return _synthetic_payload()
+
+
+def _bench(label: str, fn: Callable[[], Any], iterations: int) -> float:
+    fn()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    per_call_ms = (time.perf_counter() - started) * 1000 / iterations
+    print(f"  {label:<42} {per_call_ms:8.3f} ms")
+    return per_call_ms
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", help="JSON com o payload a serializar")
+    parser.add_argument("--ig-user", help="owner_id do instagram_metrics no ig_cache")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    payload = _load_payload(args)
+    size = len(dumps(payload))
+    print(f"Payload: {size / 1024:.1f} KiB | orjson: {'sim' if orjson is not None else 'não'}")
+
+    print("Escrita JSONB:")
+    before = _bench("stdlib (_sanitize_json + json.dumps)", lambda: json.dumps(_sanitize_json(payload)), args.iterations)
+    after = _bench("json_utils.dumps", lambda: dumps(payload), args.iterations)
+    print(f"  ganho: {before / after:.1f}x")
+
+    print("Resposta HTTP:")
+    before = _bench(
+        "stdlib (jsonify padrão)",
+        lambda: json.dumps(payload, default=DefaultJSONProvider.default, sort_keys=True, separators=(",", ":")),
+        args.iterations,
+    )
+    after = _bench("json_utils.response_bytes", lambda: response_bytes(payload), args.iterations)
+    print(f"  ganho: {before / after:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
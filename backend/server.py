@@ -1,11 +1,11 @@
 # backend/server.py
+import hashlib
 import os
 import re
 import time
 import logging
 import math
 import secrets
-import unicodedata
 import uuid
 import json
 import threading
@@ -13,13 +13,12 @@ from pathlib import Path
 from collections import Counter, defaultdict
 from datetime import date, datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
-from typing import Any, Dict, List, Optional, Sequence, Union
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
 from urllib.parse import urlparse
 
 from flask import Flask, Response, jsonify, request, send_from_directory
 from flask_cors import CORS
 from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
-from psycopg2.extras import Json
 import requests
 
 from auth_utils import hash_password as _hash_password, verify_password as _verify_password
@@ -27,6 +26,7 @@ from cache import (
     get_cached_payload,
     get_latest_cached_payload,
     mark_cache_error,
+    peek_cache_validator,
     register_fetcher,
 )
 from uuid import uuid4
@@ -37,6 +37,7 @@ from meta import (
     fb_audience,
     fb_page_window,
     fb_recent_posts,
+    get_http_pool_stats,
     ig_audience,
     ig_organic_summary,
     ig_recent_posts,
@@ -45,12 +46,20 @@ from meta import (
     normalize_ig_audience_timeframe,
     gget,
 )
+from meta_rate_limit import get_rate_limit_stats
+from singleflight import get_singleflight_stats
+from cache_l1 import get_l1_stats
+from http_compression import get_compression_stats, register_compression
+from json_response import json_response
+from json_utils import FastJSONProvider, Json
+from wordcloud_text import sanitize_wordcloud_token, tokenize_wordcloud_text
 from ig_audience_snapshots import load_latest_snapshot, persist_audience_snapshot, resolve_snapshot_date
 from jobs.instagram_ingest import ingest_account_range, daterange
-from jobs.instagram_comments_ingest import ingest_account_comments
+from jobs.instagram_comments_ingest import ingest_accounts_comments
+from jobs.facebook_comments_ingest import ingest_page_comments
 from scheduler import MetaSyncScheduler
-from postgres_client import get_postgres_client
-from db import execute, execute_script, fetch_all, fetch_one, is_configured as is_db_configured
+from postgres_client import get_postgres_client, get_statement_cache_stats
+from db import execute, execute_script, fetch_all, fetch_one, get_pool_stats, is_configured as is_db_configured
 
 # Configurar logging
 logging.basicConfig(
@@ -235,11 +244,13 @@ def _load_connected_accounts() -> List[Dict[str, Any]]:
 
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 CORS(
     app,
     resources={r"/api/*": {"origins": _resolve_allowed_origins()}},
     supports_credentials=True,
 )
+register_compression(app)
 LEGAL_DOCS_DIR = os.path.join(app.root_path, "static", "legal")
 
 AUTH_SECRET_KEY = (
@@ -290,6 +301,10 @@ IG_ROLLUP_BUCKETS = ("7d", "30d", "90d")
 DEFAULT_CACHE_PLATFORM = "instagram"
 IG_COMMENTS_TABLE = "ig_comments"
 IG_COMMENTS_DAILY_TABLE = "ig_comments_daily"
+IG_COMMENT_TOKENS_TABLE = "ig_comment_tokens"
+FB_COMMENTS_TABLE = "fb_comments"
+FB_COMMENTS_DAILY_TABLE = "fb_comments_daily"
+FB_COMMENT_TOKENS_TABLE = "fb_comment_tokens"
 APP_USERS_TABLE = "app_users"
 REPORT_TEMPLATES_TABLE = "report_templates"
 REPORTS_TABLE = "reports"
@@ -301,29 +316,14 @@ WORDCLOUD_DEFAULT_TOP = 120
 WORDCLOUD_MAX_TOP = 250
 WORDCLOUD_MAX_RANGE_DAYS = 365
 COMMENTS_INGEST_DEFAULT_DAYS = 30
+# A ingestão roda dentro da requisição: limita quantas contas um único POST pode pedir.
+COMMENTS_INGEST_MAX_ACCOUNTS = int(os.getenv("COMMENTS_INGEST_MAX_ACCOUNTS", "10"))
 COMMENTS_SEARCH_MAX_LIMIT = 200
+WORDCLOUD_STREAM_BATCH = int(os.getenv("WORDCLOUD_STREAM_BATCH", "2000"))
 FB_WORDCLOUD_MAX_POSTS = int(os.getenv("FB_WORDCLOUD_MAX_POSTS", "120"))
 FB_WORDCLOUD_MAX_COMMENTS = int(os.getenv("FB_WORDCLOUD_MAX_COMMENTS", "4000"))
 FB_WORDCLOUD_POST_LIMIT = int(os.getenv("FB_WORDCLOUD_POST_LIMIT", "50"))
 FB_WORDCLOUD_COMMENT_LIMIT = int(os.getenv("FB_WORDCLOUD_COMMENT_LIMIT", "50"))
-WORDCLOUD_MIN_TOKEN_LEN = 3
-WORDCLOUD_STOPWORDS = {
-    "a", "as", "o", "os", "um", "uma", "uns", "umas",
-    "de", "do", "da", "dos", "das", "em", "no", "na", "nos", "nas",
-    "para", "por", "pra", "pro", "com", "sem", "que", "quem", "qual", "quais",
-    "como", "onde", "quando", "porque", "pois", "isso", "isto", "aquele", "aquela",
-    "aqueles", "aquelas", "este", "esta", "estes", "estas", "esse", "essa", "esses", "essas",
-    "ele", "ela", "eles", "elas", "eu", "tu", "voce", "voces", "nos", "nosso", "nossa", "nossos", "nossas",
-    "seu", "sua", "seus", "suas", "meu", "minha", "meus", "minhas", "dele", "dela", "deles", "delas",
-    "mais", "menos", "muito", "muita", "muitos", "muitas", "todo", "toda", "todos", "todas",
-    "ja", "foi", "era", "sao", "sou", "estou", "esta", "estao", "tem", "ter", "ser",
-    "vai", "vao", "vou", "fui", "sido", "havia", "haviam",
-    "bem", "mal", "sim", "nao", "opa", "ola", "oi", "alguem", "ninguem",
-    "se", "so", "ta", "vc", "vcs", "ces",
-    "the", "and", "for", "with", "you", "your", "yours", "from", "this", "that", "was", "are", "were", "been", "have", "has",
-    "to", "of", "in", "on", "at", "by", "or", "an", "is", "be", "it", "its", "we", "us", "our", "ours", "they", "them", "their", "theirs",
-    "https", "http", "www"
-}
 EMAIL_VALIDATION_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
 VALID_USER_ROLES = {"analista", "admin"}
 IG_PROFILE_PICTURE_CACHE_TTL_SEC = int(os.getenv("IG_PROFILE_PICTURE_CACHE_TTL_SEC", "900"))
@@ -434,6 +434,8 @@ def unix_range(args, default_days=DEFAULT_DAYS):
 
 # ================= API Envelope (v2) =================
 ENVELOPE_CACHE_SOURCES = {"cache", "stale", "refresh", "prime", "live", "cache-fallback", "db"}
+# Navegador guarda a resposta mas revalida sempre (If-None-Match -> 304).
+CONDITIONAL_CACHE_CONTROL = "private, no-cache"
 SYNC_SOURCE_CACHE = {"cache", "stale", "cache-fallback"}
 SYNC_SOURCE_LIVE = {"refresh", "prime", "live"}
 
@@ -540,6 +542,69 @@ def _normalize_envelope_cache(cache_meta: Optional[Dict[str, Any]]) -> Dict[str,
     }
 
 
+def _cache_etag(cache_meta: Optional[Dict[str, Any]], *variant: Any) -> Optional[str]:
+    """
+    ETag forte de uma resposta montada a partir de uma entrada do cache. Muda quando a entrada
+    é regravada (fetched_at/updated_at) e com o que mais entra no corpo (`variant`: plataforma,
+    conta, since/until pedidos, versão do resumo da conta...). Entradas vencidas (inclusive pelo
+    meta.sync.is_stale, calculado com o relógio), respostas ao vivo e fallbacks não têm ETag.
+    """
+    if not isinstance(cache_meta, dict) or not cache_meta.get("cache_key"):
+        return None
+    if cache_meta.get("stale") or cache_meta.get("fallback_error") or cache_meta.get("forced"):
+        return None
+    if _build_sync_meta(cache_meta)["is_stale"]:
+        return None
+    stamps = []
+    for field in ("fetched_at", "updated_at"):
+        parsed = _parse_iso_datetime(cache_meta.get(field))
+        stamps.append(f"{parsed.timestamp():.6f}" if parsed else "")
+    raw = "|".join(
+        [str(cache_meta["cache_key"]), *stamps, str(cache_meta.get("source")), *(str(item) for item in variant)]
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def _not_modified_response(validator: Optional[Dict[str, Any]], *variant: Any) -> Optional[Response]:
+    """
+    304 quando o If-None-Match da requisição bate com a entrada atual do cache, antes de
+    carregar o payload. `validator` vem de cache.peek_cache_validator; `variant` deve ser o
+    mesmo usado ao montar a resposta completa.
+    """
+    if not validator or not request.if_none_match:
+        return None
+    # Leitura sem refresh: get_cached_payload devolveria a entrada com source "cache".
+    etag = _cache_etag({**validator, "source": "cache"}, *variant)
+    if not etag or not request.if_none_match.contains(etag):
+        return None
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = CONDITIONAL_CACHE_CONTROL
+    return response
+
+
+def _conditional_json_response(
+    body: Any,
+    cache_meta: Optional[Dict[str, Any]],
+    etag: Optional[str],
+    source: Optional[Any] = None,
+) -> Response:
+    response = json_response(body, source=source)
+    if etag:
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = CONDITIONAL_CACHE_CONTROL
+        last_modified = _parse_iso_datetime((cache_meta or {}).get("fetched_at"))
+        if last_modified is not None:
+            response.last_modified = last_modified
+        response.make_conditional(request)
+    return response
+
+
+def _envelope_response(envelope: Dict[str, Any], source: Optional[Any] = None) -> Response:
+    meta = envelope.get("meta") or {}
+    return _conditional_json_response(envelope, meta.get("cache"), meta.get("etag"), source=source)
+
+
 def _build_api_error(
     message: str,
     code: Optional[Any] = None,
@@ -562,6 +627,7 @@ def _build_api_envelope(
     timezone_name: str = "UTC",
     cache_meta: Optional[Dict[str, Any]] = None,
     error: Optional[Dict[str, Any]] = None,
+    etag_variant: Sequence[Any] = (),
 ) -> Dict[str, Any]:
     return {
         "data": data,
@@ -574,6 +640,11 @@ def _build_api_envelope(
             "source": _map_sync_source(cache_meta),
             "sync": _build_sync_meta(cache_meta),
             "cache": _normalize_envelope_cache(cache_meta),
+            "etag": (
+                _cache_etag(cache_meta, platform, account_id, since, until, timezone_name, *etag_variant)
+                if error is None
+                else None
+            ),
         },
         "error": error,
     }
@@ -688,48 +759,6 @@ def _duration(since_ts: int, until_ts: int) -> int:
     return max(1, until_ts - since_ts)
 
 
-def strip_accents(text: str) -> str:
-    normalized = unicodedata.normalize("NFD", text)
-    return "".join(ch for ch in normalized if unicodedata.category(ch) != "Mn")
-
-
-def sanitize_wordcloud_token(token: str) -> Optional[str]:
-    if not token:
-        return None
-    candidate = str(token).strip().lower()
-    if not candidate:
-        return None
-    cleaned = "".join(ch for ch in candidate if ch.isalpha())
-    if len(cleaned) < WORDCLOUD_MIN_TOKEN_LEN:
-        return None
-    base = strip_accents(cleaned)
-    if cleaned in WORDCLOUD_STOPWORDS or base in WORDCLOUD_STOPWORDS:
-        return None
-    return cleaned
-
-
-def tokenize_wordcloud_text(text: str) -> List[str]:
-    if not text:
-        return []
-    lowered = text.lower()
-    lowered = re.sub(r"https?://\S+|www\.\S+", " ", lowered)
-    lowered = lowered.replace("&amp;", " ")
-    lowered = re.sub(r"\s+", " ", lowered)
-    tokens = lowered.split()
-    words: List[str] = []
-    for token in tokens:
-        if not token:
-            continue
-        if token.startswith("@"):
-            continue
-        if token.startswith("#"):
-            token = token[1:]
-        sanitized = sanitize_wordcloud_token(token)
-        if sanitized:
-            words.append(sanitized)
-    return words
-
-
 def _parse_graph_timestamp(value: Any) -> Optional[datetime]:
     if not value:
         return None
@@ -828,33 +857,108 @@ def fetch_comments_for_wordcloud(
     account_id: str,
     since_iso: Optional[str],
     until_iso: Optional[str],
-) -> List[Dict[str, Any]]:
-    page_size = 1000
-    offset = 0
-    rows: List[Dict[str, Any]] = []
-    while True:
-        query = (
-            client.table(IG_COMMENTS_TABLE)
-            .select("id,text,timestamp,created_at,username,like_count")
-            .eq("account_id", account_id)
-        )
-        if since_iso:
-            query = query.gte("timestamp", since_iso).gte("created_at", since_iso)
-        if until_iso:
-            query = query.lte("timestamp", until_iso).lte("created_at", until_iso)
-        response = (
-            query.order("timestamp", desc=False)
-            .range(offset, offset + page_size - 1)
-            .execute()
-        )
-        data = getattr(response, "data", None) or []
-        if not data:
-            break
-        rows.extend(data)
-        if len(data) < page_size:
-            break
-        offset += page_size
-    return rows
+    desc: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Itera os comentários do período em ordem de (timestamp, id) por um cursor
+    server-side, sem acumular a lista inteira em memória.
+    """
+    query = (
+        client.table(IG_COMMENTS_TABLE)
+        .select("id,text,timestamp,created_at,username,like_count")
+        .eq("account_id", account_id)
+    )
+    if since_iso:
+        query = query.gte("timestamp", since_iso).gte("created_at", since_iso)
+    if until_iso:
+        query = query.lte("timestamp", until_iso).lte("created_at", until_iso)
+    return query.order("timestamp", desc=desc).order("id", desc=desc).stream(batch_size=WORDCLOUD_STREAM_BATCH)
+
+
+def local_comments_cover(table: str, account_id: str, since_day: date, column: str = "comment_date") -> bool:
+    """
+    True quando a conta já foi ingerida e o dia mais antigo da tabela não é posterior a
+    since_day. Um período que começa antes da janela ingerida (--days dos jobs) voltaria
+    incompleto do banco, então quem chama cai para a Graph ou marca o resultado como parcial.
+    """
+    row = fetch_one(
+        f"SELECT min({column}) AS oldest FROM {table} WHERE account_id = %(account_id)s",
+        {"account_id": account_id},
+    )
+    oldest = (row or {}).get("oldest")
+    if oldest is None:
+        return False
+    if isinstance(oldest, datetime):
+        oldest_day = oldest.astimezone(timezone.utc).date() if oldest.tzinfo else oldest.date()
+    elif isinstance(oldest, date):
+        oldest_day = oldest
+    else:
+        oldest_day = datetime.fromisoformat(str(oldest)[:10]).date()
+    return oldest_day <= since_day
+
+
+def search_indexed_comments(
+    account_id: str,
+    word: str,
+    since_iso: str,
+    until_iso: str,
+    limit: int,
+    offset: int,
+    tokens_table: str = IG_COMMENT_TOKENS_TABLE,
+    comments_table: str = IG_COMMENTS_TABLE,
+) -> Optional[Dict[str, Any]]:
+    """
+    Busca pelo índice invertido de tokens (ig_comment_tokens / fb_comment_tokens): totais e
+    página vêm do banco e o custo depende só do número de ocorrências da palavra. Retorna
+    None quando a conta ainda não tem tokens indexados (ver --reindex-tokens nos jobs) ou
+    quando o período começa antes do token mais antigo indexado.
+    """
+    since_day = datetime.fromisoformat(since_iso).date()
+    if not local_comments_cover(tokens_table, account_id, since_day, column="comment_timestamp"):
+        return None
+    params = {
+        "account_id": account_id,
+        "token": word,
+        "since": since_iso,
+        "until": until_iso,
+        "limit": limit,
+        "offset": offset,
+    }
+    matches_sql = f"""
+        FROM {tokens_table} t
+        JOIN {comments_table} c ON c.id = t.comment_id
+        WHERE t.account_id = %(account_id)s
+          AND t.token = %(token)s
+          AND t.comment_timestamp BETWEEN %(since)s AND %(until)s
+    """
+    totals = fetch_one(
+        f"SELECT count(*) AS total_comments, coalesce(sum(t.occurrences), 0) AS total_occurrences {matches_sql}",
+        params,
+    ) or {}
+    rows = fetch_all(
+        f"""
+        SELECT c.id, c.text, c.timestamp, c.username, c.like_count, t.occurrences
+        {matches_sql}
+        ORDER BY t.comment_timestamp DESC, t.comment_id DESC
+        LIMIT %(limit)s OFFSET %(offset)s
+        """,
+        params,
+    )
+    return {
+        "total_comments": int(totals.get("total_comments") or 0),
+        "total_occurrences": int(totals.get("total_occurrences") or 0),
+        "comments": [
+            {
+                "id": row.get("id"),
+                "text": row.get("text") or "",
+                "timestamp": row.get("timestamp"),
+                "username": row.get("username"),
+                "like_count": row.get("like_count") or 0,
+                "occurrences": int(row.get("occurrences") or 0),
+            }
+            for row in rows
+        ],
+    }
 
 
 def fetch_daily_wordcloud(
@@ -862,18 +966,19 @@ def fetch_daily_wordcloud(
     account_id: str,
     since_iso: Optional[str],
     until_iso: Optional[str],
+    table: str = IG_COMMENTS_DAILY_TABLE,
 ) -> Dict[str, Any]:
     """
-    Lê agregados diários de comentários e word_freq da tabela ig_comments_daily.
+    Lê agregados diários de comentários e word_freq (ig_comments_daily / fb_comments_daily).
     """
-    query = client.table(IG_COMMENTS_DAILY_TABLE).select("comment_date,total_comments,word_freq").eq("account_id", account_id)
+    query = client.table(table).select("comment_date,total_comments,word_freq").eq("account_id", account_id)
     if since_iso:
         query = query.gte("comment_date", since_iso.split("T")[0])
     if until_iso:
         query = query.lte("comment_date", until_iso.split("T")[0])
     response = query.order("comment_date", desc=False).execute()
     if response.error:
-        raise RuntimeError(response.error.get("message") or "failed to load ig_comments_daily")
+        raise RuntimeError(response.error.get("message") or f"failed to load {table}")
     rows = response.data or []
 
     counter: Counter[str] = Counter()
@@ -1067,11 +1172,24 @@ def _enrich_facebook_metrics_payload(payload: Dict[str, Any]) -> None:
     if not isinstance(payload, dict):
         return
 
-    metrics: List[Dict[str, Any]] = payload.setdefault("metrics", [])
-    metrics_by_key = {}
-    for item in metrics:
+    # Copy-on-write: o payload pode vir congelado do cache (ver frozen.py). A lista original só
+    # é trocada quando alguma métrica muda, para o json_response reaproveitar o fragmento cacheado.
+    if payload.get("metrics") is None:
+        payload["metrics"] = []
+    metrics: Sequence[Any] = payload["metrics"]
+    copied = False
+    metrics_by_key: Dict[str, int] = {}
+    for index, item in enumerate(metrics):
         if isinstance(item, dict) and item.get("key"):
-            metrics_by_key[item["key"]] = item
+            metrics_by_key[item["key"]] = index
+
+    def writable_metrics() -> List[Any]:
+        nonlocal metrics, copied
+        if not copied:
+            metrics = list(metrics)
+            payload["metrics"] = metrics
+            copied = True
+        return metrics
 
     page_overview = payload.get("page_overview") or {}
     video_data = payload.get("video") or {}
@@ -1086,18 +1204,23 @@ def _enrich_facebook_metrics_payload(payload: Dict[str, Any]) -> None:
         video_breakdown = (breakdowns.get("video") or {}).get("engagement") or {}
 
     if interactions_follow_type and isinstance(breakdowns, dict):
+        breakdowns = dict(breakdowns)
         breakdowns["page_interactions_follow_type"] = interactions_follow_type
         payload["breakdowns"] = breakdowns
 
     def ensure_metric(key: str, label: str, value: Optional[Any], breakdown: Optional[Dict[str, Any]] = None) -> None:
         if value in (None, "", []):
             return
-        metric = metrics_by_key.get(key)
-        if metric:
+        index = metrics_by_key.get(key)
+        if index is not None:
+            metric = metrics[index]
+            updates: Dict[str, Any] = {}
             if metric.get("value") in (None, "", "-"):
-                metric["value"] = value
+                updates["value"] = value
             if breakdown and not metric.get("breakdown"):
-                metric["breakdown"] = breakdown
+                updates["breakdown"] = breakdown
+            if updates:
+                writable_metrics()[index] = {**metric, **updates}
         else:
             entry = {
                 "key": key,
@@ -1107,8 +1230,9 @@ def _enrich_facebook_metrics_payload(payload: Dict[str, Any]) -> None:
             }
             if breakdown:
                 entry["breakdown"] = breakdown
-            metrics.append(entry)
-            metrics_by_key[key] = entry
+            target = writable_metrics()
+            metrics_by_key[key] = len(target)
+            target.append(entry)
 
     ensure_metric("video_views_total", "Video views", page_overview.get("video_views"))
     ensure_metric("engaged_users", "Usuarios engajados", payload.get("post_engaged"))
@@ -2327,6 +2451,21 @@ def _resolve_instagram_account_summary(ig_user_id: str, *, force_refresh: bool =
     return dict(summary)
 
 
+def _instagram_account_summary_version(ig_user_id: str) -> Optional[str]:
+    """
+    Versão do resumo da conta (data/account) que está valendo agora: o instante em que foi
+    resolvido. Entra no ETag das respostas do Instagram; None quando o resumo venceu e a
+    próxima resposta completa vai buscá-lo de novo (não dá para responder 304 antes).
+    """
+    cached = IG_ACCOUNT_SUMMARY_MEM_CACHE.get(str(ig_user_id or "").strip())
+    if not cached:
+        return None
+    resolved_at = float(cached.get("ts") or 0)
+    if time.time() - resolved_at >= IG_ACCOUNT_SUMMARY_CACHE_TTL_SEC:
+        return None
+    return f"{resolved_at:.6f}"
+
+
 def _attach_instagram_account_summary(payload_obj: Any, ig_user_id: str) -> Any:
     if not isinstance(payload_obj, dict):
         return payload_obj
@@ -3548,6 +3687,20 @@ def api_health() -> Any:
     return jsonify(payload), 200 if ready else 503
 
 
+@app.get("/api/health/stats")
+def api_health_stats() -> Any:
+    payload = {
+        "graph_http": get_http_pool_stats(),
+        "graph_rate_limit": get_rate_limit_stats(),
+        "singleflight": get_singleflight_stats(),
+        "cache_l1": get_l1_stats(),
+        "http_compression": get_compression_stats(),
+        "db_pool": get_pool_stats(),
+        "db_statements": get_statement_cache_stats(),
+    }
+    return jsonify(payload), 200
+
+
 @app.post("/api/auth/register")
 def auth_register() -> Any:
     payload = request.get_json(silent=True) or {}
@@ -3992,11 +4145,40 @@ def delete_report(report_id: str) -> Any:
 
     return jsonify({"success": True})
 
+
+def _comment_ingest_account_ids(values: Any, default: Optional[str]) -> List[str]:
+    """IDs de conta para a ingestão de comentários: lista ou "a,b,c"; sem nada, o padrão."""
+    if isinstance(values, str):
+        values = [values]
+    account_ids: List[str] = []
+    for value in values or []:
+        for item in str(value).split(","):
+            item = item.strip()
+            if item and item not in account_ids:
+                account_ids.append(item)
+    if not account_ids and default:
+        account_ids.append(str(default).strip())
+    return account_ids
+
+
+def _comment_ingest_status(results: Dict[str, Dict[str, Any]], ok_status: int) -> int:
+    """Status da ingestão de várias contas: erro só quando todas falharam (502 se todas na Graph API)."""
+    failures = [result for result in results.values() if result.get("error")]
+    if not results or len(failures) < len(results):
+        return ok_status
+    return 502 if all(result.get("graph") for result in failures) else 500
+
+
+def _comment_ingest_meta_error(result: Dict[str, Any]) -> MetaAPIError:
+    graph = result.get("graph") or {}
+    return MetaAPIError(graph.get("status"), result.get("error") or "Meta API error", graph.get("code"), graph.get("type"))
+
+
 @app.post("/api/instagram/comments/ingest")
 def ingest_comments_api() -> Any:
     """
-    Força ingestão de comentários do Instagram (últimos N dias) para um igUserId.
-    Útil para popular a nuvem de palavras.
+    Força ingestão de comentários do Instagram (últimos N dias) para um igUserId, ou para
+    várias contas em paralelo via igUserIds. Útil para popular a nuvem de palavras.
     """
     user, error = _authenticate_request(request)
     if error:
@@ -4004,26 +4186,31 @@ def ingest_comments_api() -> Any:
 
     payload = request.get_json(silent=True) or {}
     ig_user_id = str(payload.get("igUserId") or payload.get("ig_user_id") or IG_ID or "").strip()
+    account_ids = _comment_ingest_account_ids(payload.get("igUserIds"), ig_user_id)
     days = int(payload.get("days") or COMMENTS_INGEST_DEFAULT_DAYS)
     days = max(1, min(90, days))
 
-    if not ig_user_id:
+    if not account_ids:
         return jsonify({"error": "igUserId is required"}), 400
+    if len(account_ids) > COMMENTS_INGEST_MAX_ACCOUNTS:
+        return jsonify({"error": f"at most {COMMENTS_INGEST_MAX_ACCOUNTS} accounts per request"}), 400
 
-    try:
-        medias, inserted, updated = ingest_account_comments(ig_user_id, days=days)
-    except MetaAPIError as err:
-        return meta_error_response(err)
-    except Exception as err:  # noqa: BLE001
-        logger.exception("Falha ao ingerir comentários para %s", ig_user_id)
-        return jsonify({"error": "could not ingest comments"}), 500
+    results = ingest_accounts_comments(account_ids, days)
+    if len(account_ids) > 1:
+        return jsonify({"days": days, "accounts": results}), _comment_ingest_status(results, 202)
 
+    result = results[account_ids[0]]
+    if result["error"]:
+        if result.get("graph"):
+            return meta_error_response(_comment_ingest_meta_error(result))
+        return jsonify({"error": "could not ingest comments"}), 500
     return jsonify({
-        "igUserId": ig_user_id,
+        "igUserId": account_ids[0],
         "days": days,
-        "medias": medias,
-        "inserted": inserted,
-        "updated": updated,
+        "medias": result["medias"],
+        "inserted": result["inserted"],
+        "updated": result["updated"],
+        "duration": result["duration"],
     }), 202
 
 
@@ -4106,6 +4293,14 @@ def facebook_metrics():
                 "forced": True,
             }
         else:
+            if request.if_none_match:
+                not_modified = _not_modified_response(
+                    peek_cache_validator("facebook_metrics", page_id, since, until, extra=extra, platform="facebook"),
+                    "facebook",
+                    page_id,
+                )
+                if not_modified is not None:
+                    return not_modified
             payload, meta = get_cached_payload(
                 "facebook_metrics",
                 page_id,
@@ -4210,6 +4405,7 @@ def facebook_metrics():
                 force=True,
                 refresh_reason="missing_engagement_timeseries",
             )
+            payload = refreshed_payload
             payload_obj = dict(refreshed_payload or {})
             _enrich_facebook_metrics_payload(payload_obj)
             if not payload_obj.get("reach_timeseries"):
@@ -4244,6 +4440,7 @@ def facebook_metrics():
                 force=True,
                 refresh_reason="missing_page_interactions_follow_type",
             )
+            payload = refreshed_payload
             payload_obj = dict(refreshed_payload or {})
             _enrich_facebook_metrics_payload(payload_obj)
             if not payload_obj.get("reach_timeseries"):
@@ -4265,7 +4462,7 @@ def facebook_metrics():
         "sync": _build_sync_meta(meta),
     }
     response["error"] = None
-    return jsonify(response)
+    return _conditional_json_response(response, meta, _cache_etag(meta, "facebook", page_id), source=payload)
 
 
 @app.get("/api/facebook/page-info")
@@ -4692,6 +4889,20 @@ def instagram_metrics():
         )
         return jsonify(envelope)
 
+    summary_version = _instagram_account_summary_version(str(ig))
+    if not force_refresh_flag and request.if_none_match and summary_version:
+        not_modified = _not_modified_response(
+            peek_cache_validator("instagram_metrics", ig, since, until, platform=DEFAULT_CACHE_PLATFORM),
+            "instagram",
+            str(ig),
+            since,
+            until,
+            "UTC",
+            summary_version,
+        )
+        if not_modified is not None:
+            return not_modified
+
     try:
         payload, meta = get_cached_payload(
             "instagram_metrics",
@@ -4881,6 +5092,7 @@ def instagram_metrics():
                 force=True,
                 refresh_reason="missing_reach_timeseries",
             )
+            payload = refreshed_payload
             payload_obj = dict(refreshed_payload) if isinstance(refreshed_payload, dict) else {"payload": refreshed_payload}
             payload_obj = _attach_instagram_account_summary(payload_obj, str(ig))
             meta = refreshed_meta
@@ -4898,8 +5110,9 @@ def instagram_metrics():
         timezone_name="UTC",
         cache_meta=meta,
         error=None,
+        etag_variant=(_instagram_account_summary_version(str(ig)),),
     )
-    return jsonify(envelope)
+    return _envelope_response(envelope, source=payload)
 
 @app.get("/api/instagram/organic")
 def instagram_organic():
@@ -5151,16 +5364,19 @@ def instagram_posts():
     force_refresh = request.args.get("force")
     force_refresh_flag = str(force_refresh).lower() in ("1", "true", "yes", "y")
     if not force_refresh_flag:
-        latest = get_latest_cached_payload(
+        validator = peek_cache_validator(
             "instagram_posts",
             ig,
             extra={"limit": limit},
             platform=DEFAULT_CACHE_PLATFORM,
         )
-        if latest:
-            _, latest_meta = latest
-            if _should_force_daily_refresh(latest_meta.get("fetched_at"), _resolve_cache_timezone()):
-                force_refresh_flag = True
+        summary_version = _instagram_account_summary_version(str(ig))
+        if validator and _should_force_daily_refresh(validator.get("fetched_at"), _resolve_cache_timezone()):
+            force_refresh_flag = True
+        elif summary_version:
+            not_modified = _not_modified_response(validator, "instagram", str(ig), None, None, "UTC", summary_version)
+            if not_modified is not None:
+                return not_modified
     try:
         payload, meta = get_cached_payload(
             "instagram_posts",
@@ -5298,8 +5514,9 @@ def instagram_posts():
         timezone_name="UTC",
         cache_meta=meta,
         error=None,
+        etag_variant=(_instagram_account_summary_version(str(ig)),),
     )
-    return jsonify(envelope)
+    return _envelope_response(envelope, source=payload)
 
 
 @app.get("/api/instagram/posts/insights")
@@ -5326,6 +5543,24 @@ def instagram_posts_insights():
         limit = int(limit_param) if limit_param is not None else 5
     except ValueError:
         limit = 5
+    if request.if_none_match:
+        not_modified = _not_modified_response(
+            peek_cache_validator(
+                "instagram_posts_insights",
+                ig,
+                since,
+                until,
+                extra={"limit": limit},
+                platform=DEFAULT_CACHE_PLATFORM,
+            ),
+            "instagram",
+            str(ig),
+            since,
+            until,
+            "UTC",
+        )
+        if not_modified is not None:
+            return not_modified
     try:
         payload, meta = get_cached_payload(
             "instagram_posts_insights",
@@ -5538,7 +5773,7 @@ def instagram_posts_insights():
         cache_meta=meta,
         error=None,
     )
-    return jsonify(envelope)
+    return _envelope_response(envelope)
 
 
 def _parse_date_param(value: Optional[str]) -> date:
@@ -5602,12 +5837,12 @@ def instagram_comments_wordcloud():
 
         # Se não houver dados diários, busca comentários brutos
         if not counter:
-            rows = fetch_comments_for_wordcloud(client, ig_user_id, since_iso, until_iso)
-            for row in rows:
+            total_comments_daily = 0
+            for row in fetch_comments_for_wordcloud(client, ig_user_id, since_iso, until_iso):
+                total_comments_daily += 1
                 tokens = tokenize_wordcloud_text(str((row or {}).get("text") or ""))
                 if tokens:
                     counter.update(tokens)
-            total_comments_daily = len(rows)
 
     except Exception as err:  # noqa: BLE001
         logger.exception("Failed to fetch comments for wordcloud")
@@ -5682,29 +5917,39 @@ def instagram_comments_search():
         return jsonify({"error": "Database client is not configured"}), 500
 
     try:
-        rows = fetch_comments_for_wordcloud(client, ig_user_id, since_iso, until_iso)
-        matches: List[Dict[str, Any]] = []
-        total_occurrences = 0
-        for row in rows:
-            text = str((row or {}).get("text") or "")
-            tokens = tokenize_wordcloud_text(text)
-            if not tokens:
-                continue
-            occurrences = sum(1 for token in tokens if token == sanitized_word)
-            if occurrences <= 0:
-                continue
-            total_occurrences += occurrences
-            matches.append({
-                "id": row.get("id"),
-                "text": text,
-                "timestamp": row.get("timestamp"),
-                "username": row.get("username"),
-                "like_count": row.get("like_count") or 0,
-                "occurrences": occurrences,
-            })
-        matches.sort(key=lambda item: item.get("timestamp") or "", reverse=True)
-        total_comments = len(matches)
-        sliced = matches[offset: offset + limit]
+        indexed = search_indexed_comments(ig_user_id, sanitized_word, since_iso, until_iso, limit, offset)
+        if indexed is not None:
+            total_comments = indexed["total_comments"]
+            total_occurrences = indexed["total_occurrences"]
+            sliced = indexed["comments"]
+            partial = False
+        else:
+            # Conta sem índice de tokens (ou período anterior a ele): varre os comentários,
+            # mais recentes primeiro; só a página pedida fica em memória. Se nem ig_comments
+            # chega até since, o resultado sai marcado como parcial.
+            partial = not local_comments_cover(IG_COMMENTS_TABLE, ig_user_id, since_date, column="timestamp")
+            sliced = []
+            total_comments = 0
+            total_occurrences = 0
+            for row in fetch_comments_for_wordcloud(client, ig_user_id, since_iso, until_iso, desc=True):
+                text = str((row or {}).get("text") or "")
+                tokens = tokenize_wordcloud_text(text)
+                if not tokens:
+                    continue
+                occurrences = sum(1 for token in tokens if token == sanitized_word)
+                if occurrences <= 0:
+                    continue
+                total_occurrences += occurrences
+                if offset <= total_comments < offset + limit:
+                    sliced.append({
+                        "id": row.get("id"),
+                        "text": text,
+                        "timestamp": row.get("timestamp"),
+                        "username": row.get("username"),
+                        "like_count": row.get("like_count") or 0,
+                        "occurrences": occurrences,
+                    })
+                total_comments += 1
     except Exception as err:  # noqa: BLE001
         logger.exception("Failed to search comments for wordcloud")
         return jsonify({"error": str(err)}), 500
@@ -5719,6 +5964,7 @@ def instagram_comments_search():
         "limit": limit,
         "offset": offset,
         "comments": sliced,
+        "partial": partial,
     })
 
 
@@ -5763,14 +6009,26 @@ def facebook_comments_wordcloud():
     until_dt = datetime.combine(until_date, datetime.max.time()).replace(tzinfo=timezone.utc)
 
     try:
-        payload = fetch_facebook_comments_for_wordcloud(page_id, since_dt, until_dt)
-        comments = payload.get("comments") or []
-        meta = payload.get("meta") or {}
-        counter: Counter[str] = Counter()
-        for comment in comments:
-            tokens = tokenize_wordcloud_text(str(comment.get("text") or ""))
-            if tokens:
-                counter.update(tokens)
+        client = get_postgres_client()
+        if client is not None and local_comments_cover(FB_COMMENTS_DAILY_TABLE, page_id, since_date):
+            # Período dentro da janela já ingerida (jobs/facebook_comments_ingest.py):
+            # agregados diários locais.
+            daily = fetch_daily_wordcloud(
+                client, page_id, since_dt.isoformat(), until_dt.isoformat(), table=FB_COMMENTS_DAILY_TABLE
+            )
+            counter: Counter[str] = Counter(daily.get("words") or {})
+            total_comments = int(daily.get("total_comments") or 0)
+            meta = {"source": "database", "truncated": False}
+        else:
+            payload = fetch_facebook_comments_for_wordcloud(page_id, since_dt, until_dt)
+            comments = payload.get("comments") or []
+            meta = {"source": "graph", **(payload.get("meta") or {})}
+            counter = Counter()
+            for comment in comments:
+                tokens = tokenize_wordcloud_text(str(comment.get("text") or ""))
+                if tokens:
+                    counter.update(tokens)
+            total_comments = len(comments)
     except MetaAPIError as err:
         return meta_error_response(err)
     except Exception as err:  # noqa: BLE001
@@ -5786,7 +6044,7 @@ def facebook_comments_wordcloud():
         "pageId": page_id,
         "since": since_date.isoformat(),
         "until": until_date.isoformat(),
-        "total_comments": len(comments),
+        "total_comments": total_comments,
         "words": words_payload,
         "meta": meta,
     }
@@ -5843,31 +6101,47 @@ def facebook_comments_search():
     until_dt = datetime.combine(until_date, datetime.max.time()).replace(tzinfo=timezone.utc)
 
     try:
-        payload = fetch_facebook_comments_for_wordcloud(page_id, since_dt, until_dt)
-        comments = payload.get("comments") or []
-        meta = payload.get("meta") or {}
-        matches: List[Dict[str, Any]] = []
-        total_occurrences = 0
-        for comment in comments:
-            text = str(comment.get("text") or "")
-            tokens = tokenize_wordcloud_text(text)
-            if not tokens:
-                continue
-            occurrences = sum(1 for token in tokens if token == sanitized_word)
-            if occurrences <= 0:
-                continue
-            total_occurrences += occurrences
-            matches.append({
-                "id": comment.get("id"),
-                "text": text,
-                "timestamp": comment.get("timestamp"),
-                "username": comment.get("username"),
-                "like_count": comment.get("like_count") or 0,
-                "occurrences": occurrences,
-            })
-        matches.sort(key=lambda item: item.get("timestamp") or "", reverse=True)
-        total_comments = len(matches)
-        sliced = matches[offset: offset + limit]
+        indexed = search_indexed_comments(
+            page_id,
+            sanitized_word,
+            since_dt.isoformat(),
+            until_dt.isoformat(),
+            limit,
+            offset,
+            tokens_table=FB_COMMENT_TOKENS_TABLE,
+            comments_table=FB_COMMENTS_TABLE,
+        )
+        if indexed is not None:
+            total_comments = indexed["total_comments"]
+            total_occurrences = indexed["total_occurrences"]
+            sliced = indexed["comments"]
+            meta = {"source": "database", "truncated": False}
+        else:
+            payload = fetch_facebook_comments_for_wordcloud(page_id, since_dt, until_dt)
+            comments = payload.get("comments") or []
+            meta = {"source": "graph", **(payload.get("meta") or {})}
+            matches: List[Dict[str, Any]] = []
+            total_occurrences = 0
+            for comment in comments:
+                text = str(comment.get("text") or "")
+                tokens = tokenize_wordcloud_text(text)
+                if not tokens:
+                    continue
+                occurrences = sum(1 for token in tokens if token == sanitized_word)
+                if occurrences <= 0:
+                    continue
+                total_occurrences += occurrences
+                matches.append({
+                    "id": comment.get("id"),
+                    "text": text,
+                    "timestamp": comment.get("timestamp"),
+                    "username": comment.get("username"),
+                    "like_count": comment.get("like_count") or 0,
+                    "occurrences": occurrences,
+                })
+            matches.sort(key=lambda item: item.get("timestamp") or "", reverse=True)
+            total_comments = len(matches)
+            sliced = matches[offset: offset + limit]
     except MetaAPIError as err:
         return meta_error_response(err)
     except Exception as err:  # noqa: BLE001
@@ -5895,9 +6169,11 @@ def instagram_comments_ingest_http():
     if expected_token and expected_token != provided_token:
         return jsonify({"error": "invalid token"}), 403
 
-    ig_user_id = request.args.get("igUserId", IG_ID)
-    if not ig_user_id:
+    account_ids = _comment_ingest_account_ids(request.args.getlist("igUserId"), IG_ID)
+    if not account_ids:
         return jsonify({"error": "Missing igUserId"}), 400
+    if len(account_ids) > COMMENTS_INGEST_MAX_ACCOUNTS:
+        return jsonify({"error": f"at most {COMMENTS_INGEST_MAX_ACCOUNTS} accounts per request"}), 400
 
     days_param = request.args.get("days")
     try:
@@ -5906,16 +6182,55 @@ def instagram_comments_ingest_http():
         return jsonify({"error": "days must be an integer"}), 400
     days = max(1, min(WORDCLOUD_MAX_RANGE_DAYS, days))
 
+    results = ingest_accounts_comments(account_ids, days)
+    if len(account_ids) > 1:
+        return jsonify({"days": days, "accounts": results}), _comment_ingest_status(results, 200)
+
+    result = results[account_ids[0]]
+    if result["error"]:
+        if result.get("graph"):
+            return meta_error_response(_comment_ingest_meta_error(result))
+        return jsonify({"error": result["error"]}), 500
+    return jsonify({
+        "igUserId": account_ids[0],
+        "days": days,
+        "medias_scanned": result["medias"],
+        "inserted": result["inserted"],
+        "updated": result["updated"],
+        "duration": result["duration"],
+    })
+
+
+@app.post("/api/facebook/comments/ingest")
+def facebook_comments_ingest_http():
+    expected_token = os.getenv("CRON_TOKEN")
+    provided_token = request.args.get("token") or request.headers.get("X-Cron-Token")
+    if expected_token and expected_token != provided_token:
+        return jsonify({"error": "invalid token"}), 403
+
+    page_id = request.args.get("pageId", PAGE_ID)
+    if not page_id:
+        return jsonify({"error": "META_PAGE_ID is not configured"}), 500
+
+    days_param = request.args.get("days")
     try:
-        medias_scanned, inserted, updated = ingest_account_comments(ig_user_id, days)
+        days = int(days_param) if days_param is not None else COMMENTS_INGEST_DEFAULT_DAYS
+    except ValueError:
+        return jsonify({"error": "days must be an integer"}), 400
+    days = max(1, min(WORDCLOUD_MAX_RANGE_DAYS, days))
+
+    try:
+        posts_scanned, inserted, updated = ingest_page_comments(page_id, days)
+    except MetaAPIError as err:
+        return meta_error_response(err)
     except Exception as err:  # noqa: BLE001
-        logger.exception("Failed to ingest comments for %s", ig_user_id)
+        logger.exception("Failed to ingest Facebook comments for %s", page_id)
         return jsonify({"error": str(err)}), 500
 
     return jsonify({
-        "igUserId": ig_user_id,
+        "pageId": page_id,
         "days": days,
-        "medias_scanned": medias_scanned,
+        "posts_scanned": posts_scanned,
         "inserted": inserted,
         "updated": updated,
     })
@@ -0,0 +1,84 @@
+# backend/singleflight.py
+"""
+Single-flight: chamadas concorrentes com a mesma chave esperam uma única execução.
+
+Usado em meta.gget (chave: path + params + token) e em cache.get_cached_payload
+(chave: tabela + cache_key) para que vários cards do dashboard pedindo o mesmo
+recurso ao mesmo tempo gerem uma só ida à Graph API.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+_registry: Dict[str, "SingleFlight"] = {}
+_registry_lock = threading.Lock()
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._leaders = 0
+        self._coalesced = 0
+        with _registry_lock:
+            _registry[name] = self
+
+    def do(self, key: Hashable, fn: Callable[[], Any], clone: Optional[Callable[[Any], Any]] = None) -> Any:
+        """
+        Executa fn() uma vez por chave em voo; quem chega durante a execução recebe o mesmo resultado
+        (ou a mesma exceção). Quando o resultado é compartilhado, cada chamador recebe clone(resultado)
+        para que ninguém altere o objeto de outro.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self._leaders += 1
+            else:
+                call.waiters += 1
+                self._coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return clone(call.result) if clone else call.result
+
+        try:
+            call.result = fn()
+        except BaseException as err:
+            call.error = err
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+                shared = call.waiters > 0
+            call.done.set()
+        return clone(call.result) if clone and shared else call.result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "executed": self._leaders,
+                "coalesced": self._coalesced,
+                "in_flight": len(self._calls),
+            }
+
+
+def get_singleflight_stats() -> Dict[str, Dict[str, int]]:
+    with _registry_lock:
+        groups = list(_registry.values())
+    return {group.name: group.stats() for group in groups}
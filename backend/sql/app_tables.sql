@@ -62,6 +62,16 @@ CREATE TABLE IF NOT EXISTS ig_comments (
     updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
+-- Índice invertido token -> comentário (tokens de wordcloud_text), mantido pela ingestão.
+CREATE TABLE IF NOT EXISTS ig_comment_tokens (
+    account_id TEXT NOT NULL,
+    token TEXT NOT NULL,
+    comment_id TEXT NOT NULL,
+    comment_timestamp TIMESTAMPTZ NOT NULL,
+    occurrences INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (account_id, token, comment_id)
+);
+
 CREATE TABLE IF NOT EXISTS ig_comments_daily (
     account_id TEXT NOT NULL,
     comment_date DATE NOT NULL,
@@ -72,6 +82,54 @@ CREATE TABLE IF NOT EXISTS ig_comments_daily (
     PRIMARY KEY (account_id, comment_date)
 );
 
+-- Checkpoint da ingestão de comentários por mídia: comments_count e high-water mark da
+-- última passada completa e, numa passada interrompida, o cursor de onde retomar.
+CREATE TABLE IF NOT EXISTS ig_media_comment_sync (
+    media_id TEXT PRIMARY KEY,
+    account_id TEXT NOT NULL,
+    comments_count INTEGER,
+    last_comment_at TIMESTAMPTZ,
+    resume_cursor TEXT,
+    resume_comment_at TIMESTAMPTZ,
+    synced_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS ig_media_comment_sync_account_idx
+    ON ig_media_comment_sync (account_id);
+
+-- Comentários do Facebook (mesmo formato do Instagram; account_id = page id)
+CREATE TABLE IF NOT EXISTS fb_comments (
+    id TEXT PRIMARY KEY,
+    account_id TEXT NOT NULL,
+    post_id TEXT,
+    username TEXT,
+    text TEXT NOT NULL,
+    like_count INTEGER DEFAULT 0,
+    timestamp TIMESTAMPTZ NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS fb_comment_tokens (
+    account_id TEXT NOT NULL,
+    token TEXT NOT NULL,
+    comment_id TEXT NOT NULL,
+    comment_timestamp TIMESTAMPTZ NOT NULL,
+    occurrences INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (account_id, token, comment_id)
+);
+
+CREATE TABLE IF NOT EXISTS fb_comments_daily (
+    account_id TEXT NOT NULL,
+    comment_date DATE NOT NULL,
+    total_comments INTEGER NOT NULL DEFAULT 0,
+    word_freq JSONB,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (account_id, comment_date)
+);
+
 -- Tabelas de cache (Instagram, Facebook e Ads)
 CREATE TABLE IF NOT EXISTS ig_cache (
     cache_key TEXT PRIMARY KEY,
@@ -95,6 +153,43 @@ CREATE TABLE IF NOT EXISTS ig_cache (
 
 CREATE TABLE IF NOT EXISTS fb_cache (LIKE ig_cache INCLUDING ALL);
 CREATE TABLE IF NOT EXISTS ads_cache (LIKE ig_cache INCLUDING ALL);
+
+-- Invalidação do cache L1 em memória dos processos (backend/cache_l1.py)
+CREATE OR REPLACE FUNCTION notify_meta_cache_change() RETURNS trigger AS $$
+DECLARE
+    changed_key TEXT;
+    changed_version TEXT := '';
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        changed_key := OLD.cache_key;
+    ELSE
+        changed_key := NEW.cache_key;
+        changed_version := COALESCE(EXTRACT(EPOCH FROM NEW.updated_at)::TEXT, '');
+    END IF;
+    PERFORM pg_notify('meta_cache_invalidate', TG_TABLE_NAME || '|' || changed_key || '|' || changed_version);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS ig_cache_notify_change ON ig_cache;
+CREATE TRIGGER ig_cache_notify_change AFTER INSERT OR UPDATE OR DELETE ON ig_cache
+    FOR EACH ROW EXECUTE FUNCTION notify_meta_cache_change();
+DROP TRIGGER IF EXISTS fb_cache_notify_change ON fb_cache;
+CREATE TRIGGER fb_cache_notify_change AFTER INSERT OR UPDATE OR DELETE ON fb_cache
+    FOR EACH ROW EXECUTE FUNCTION notify_meta_cache_change();
+DROP TRIGGER IF EXISTS ads_cache_notify_change ON ads_cache;
+CREATE TRIGGER ads_cache_notify_change AFTER INSERT OR UPDATE OR DELETE ON ads_cache
+    FOR EACH ROW EXECUTE FUNCTION notify_meta_cache_change();
+
+-- Uso da Graph API compartilhado entre processos (meta_rate_limit, META_RATE_LIMIT_SHARED=1)
+CREATE TABLE IF NOT EXISTS meta_rate_limit_state (
+    scope_key TEXT PRIMARY KEY,
+    usage_pct DOUBLE PRECISION NOT NULL DEFAULT 0,
+    observed_at TIMESTAMPTZ NOT NULL,
+    blocked_until TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
 -- Instagram daily metrics (tall table used by ingest)
 CREATE TABLE IF NOT EXISTS metrics_daily (
     account_id TEXT NOT NULL,
@@ -176,6 +271,31 @@ CREATE INDEX IF NOT EXISTS metrics_daily_rollup_account_platform_date_idx
 CREATE INDEX IF NOT EXISTS ig_comments_account_ts_idx
     ON ig_comments (account_id, timestamp);
 
+CREATE INDEX IF NOT EXISTS ig_comment_tokens_search_idx
+    ON ig_comment_tokens (account_id, token, comment_timestamp DESC, comment_id DESC);
+
+CREATE INDEX IF NOT EXISTS ig_comment_tokens_account_ts_idx
+    ON ig_comment_tokens (account_id, comment_timestamp);
+
+CREATE INDEX IF NOT EXISTS ig_comment_tokens_comment_idx
+    ON ig_comment_tokens (comment_id);
+
+CREATE INDEX IF NOT EXISTS fb_comments_account_ts_id_idx
+    ON fb_comments (account_id, timestamp, id);
+
+CREATE INDEX IF NOT EXISTS fb_comment_tokens_search_idx
+    ON fb_comment_tokens (account_id, token, comment_timestamp DESC, comment_id DESC);
+
+CREATE INDEX IF NOT EXISTS fb_comment_tokens_account_ts_idx
+    ON fb_comment_tokens (account_id, comment_timestamp);
+
+CREATE INDEX IF NOT EXISTS fb_comment_tokens_comment_idx
+    ON fb_comment_tokens (comment_id);
+
+-- Chave de keyset/stream (timestamp, id) dos comentários por conta.
+CREATE INDEX IF NOT EXISTS ig_comments_account_ts_id_idx
+    ON ig_comments (account_id, timestamp, id);
+
 CREATE TABLE IF NOT EXISTS report_templates (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
     name TEXT NOT NULL,
@@ -0,0 +1,46 @@
+"""
+Tests for the in-process L1 cache (LRU by bytes and NOTIFY invalidation).
+"""
+
+from cache_l1 import L1Cache, _handle_notification, l1_cache
+
+
+def _record(size: int, updated_at: str = "2024-01-01T00:00:00+00:00"):
+    return {"payload": {"blob": "x" * size}, "updated_at": updated_at}
+
+
+def test_lru_is_bounded_by_bytes():
+    cache = L1Cache(max_bytes=2000)
+    cache.put("ig_cache", "a", _record(200), 1.0)
+    cache.put("ig_cache", "b", _record(200), 1.0)
+    assert cache.get("ig_cache", "a") is not None  # "a" passa a ser o mais recente
+    cache.put("ig_cache", "c", _record(200), 1.0)
+    cache.put("ig_cache", "d", _record(200), 1.0)
+    cache.put("ig_cache", "e", _record(200), 1.0)
+    assert cache.get("ig_cache", "b") is None
+    assert cache.get("ig_cache", "a") is not None
+    assert cache.stats()["bytes"] <= 2000
+    # Entradas maiores que 1/4 do limite não entram.
+    cache.put("ig_cache", "big", _record(400), 1.0)
+    assert cache.get("ig_cache", "big") is None
+
+
+def test_invalidation_skips_own_write_and_stale_reads():
+    cache = L1Cache(max_bytes=10_000)
+    cache.put("fb_cache", "k", _record(10), 100.0)
+    cache.invalidate("fb_cache", "k", 100.0)
+    assert cache.get("fb_cache", "k") is not None
+    cache.invalidate("fb_cache", "k", 200.0)
+    assert cache.get("fb_cache", "k") is None
+
+    generation = cache.generation()
+    cache.invalidate("fb_cache", "other")
+    cache.put("fb_cache", "k", _record(10), 100.0, since_generation=generation)
+    assert cache.get("fb_cache", "k") is None
+
+
+def test_notification_payload_with_pipes_in_cache_key():
+    key = "instagram_metrics|123|1700000000|1700086400|abcdef"
+    l1_cache.put("ig_cache", key, _record(10), 50.0)
+    _handle_notification(f"ig_cache|{key}|")
+    assert l1_cache.get("ig_cache", key) is None
@@ -0,0 +1,192 @@
+from datetime import datetime, timezone
+
+from jobs import facebook_comments_ingest as fb
+
+
+def test_post_comments_stop_at_lookback(monkeypatch):
+    pages = [
+        {
+            "data": [
+                {"id": "c3", "message": "novo", "created_time": "2024-05-03T10:00:00+0000", "from": {"name": "Ana"}},
+                {"id": "c2", "message": "ok", "created_time": "2024-05-02T10:00:00+0000"},
+            ],
+            "paging": {"cursors": {"after": "A"}},
+        },
+        {
+            "data": [{"id": "c1", "message": "antigo", "created_time": "2024-04-01T10:00:00+0000"}],
+            "paging": {"cursors": {"after": "B"}},
+        },
+    ]
+    calls = []
+
+    def fake_graph_get(path, token, params=None):
+        calls.append(params.get("after"))
+        return pages[len(calls) - 1]
+
+    monkeypatch.setattr(fb, "graph_get", fake_graph_get)
+    since = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    comments = list(fb.iterate_post_comments("post", since, "token"))
+    assert [comment["id"] for comment in comments] == ["c3", "c2"]
+    assert calls == [None, "A"]
+    record = fb.normalize_comment_record("page", "post", comments[0], since)
+    assert record["account_id"] == "page" and record["username"] == "Ana"
+
+
+def test_checkpoints_are_saved_only_after_their_comments(monkeypatch):
+    from jobs import instagram_comments_ingest as ig
+
+    stored, saved = [], []
+    monkeypatch.setattr(ig, "store_comments", lambda account, rows, tables: stored.append(len(rows)) or (len(rows), 0))
+    monkeypatch.setattr(ig, "save_media_checkpoints", lambda table, rows: saved.append([dict(row) for row in rows]))
+
+    def comment(index, day):
+        return {"id": f"c{index}", "text": "legal", "timestamp": datetime(2024, 5, day, tzinfo=timezone.utc)}
+
+    pages = [([comment(1, 9), comment(2, 8)], "CUR1"), ([comment(3, 7)], None)]
+    seen = {}
+
+    def fake_pages(media_id, since_utc, after=None):
+        seen.update(since=since_utc, after=after)
+        return iter(pages)
+
+    monkeypatch.setattr(ig, "iterate_comment_pages", fake_pages)
+    writer = ig.CommentBatchWriter("acc", sync_table="sync", flush_size=2)
+    since = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    previous = {"last_comment_at": datetime(2024, 5, 5, tzinfo=timezone.utc), "resume_cursor": None}
+    media = {"id": "m1", "timestamp": since}
+
+    ig.ingest_media_comments(writer, media, since, since, previous)
+    assert seen == {"since": previous["last_comment_at"], "after": None}
+    assert stored == [2] and saved == []
+    writer.flush()
+    assert stored == [2, 1] and writer.total == 3
+    final = saved[-1][0]
+    assert final["resume_cursor"] is None
+    assert final["last_comment_at"] == datetime(2024, 5, 9, tzinfo=timezone.utc)
+
+
+def test_unchanged_media_is_skipped():
+    from jobs.instagram_comments_ingest import media_needs_sync
+
+    synced = {"comments_count": 12, "synced_at": datetime(2024, 5, 1, tzinfo=timezone.utc), "resume_cursor": None}
+    assert not media_needs_sync({"id": "m", "comments_count": 12}, synced)
+    assert media_needs_sync({"id": "m", "comments_count": 13}, synced)
+    assert media_needs_sync({"id": "m", "comments_count": 12}, dict(synced, resume_cursor="CUR"))
+    assert media_needs_sync({"id": "m", "comments_count": 12}, None)
+
+
+def test_accounts_driver_runs_in_parallel_and_reports_failures(monkeypatch):
+    import threading
+
+    from jobs import instagram_comments_ingest as ig
+
+    barrier = threading.Barrier(2, timeout=5)
+
+    def fake_ingest(account_id, days, media_executor=None):
+        assert media_executor is not None
+        barrier.wait()
+        if account_id == "bad":
+            raise RuntimeError("boom")
+        return 3, 2, 1
+
+    monkeypatch.setattr(ig, "ingest_account_comments", fake_ingest)
+    results = ig.ingest_accounts_comments(["ok", "bad"], days=7, account_concurrency=2, media_concurrency=2)
+    assert results["ok"]["medias"] == 3 and results["ok"]["error"] is None
+    assert results["bad"]["error"] == "boom"
+
+
+def test_token_index_delete_runs_inside_the_bulk_upsert(monkeypatch):
+    from types import SimpleNamespace
+
+    from jobs import instagram_comments_ingest as ig
+
+    captured = {}
+
+    class _Query:
+        def bulk_upsert(self, rows, **kwargs):
+            captured.update(kwargs, rows=list(rows))
+            return self
+
+        def execute(self):
+            return SimpleNamespace(error=None, inserted=len(captured["rows"]), updated=0)
+
+    monkeypatch.setattr(ig, "get_postgres_client", lambda: SimpleNamespace(table=lambda name: _Query()))
+    monkeypatch.setattr(ig, "execute", lambda *args: (_ for _ in ()).throw(AssertionError("DELETE fora da transação")))
+    comment = {"id": "c1", "text": "produto ótimo", "timestamp": datetime(2024, 5, 1, tzinfo=timezone.utc)}
+    assert ig.index_comment_tokens("acc", [comment]) == len(captured["rows"]) > 0
+    (statement, params), = captured["before"]
+    assert statement.startswith("DELETE FROM ig_comment_tokens") and params == {"account_id": "acc", "ids": ["c1"]}
+
+
+def test_comments_ingest_endpoint_status_codes(monkeypatch):
+    import server
+
+    graph_error = {"medias": 0, "inserted": 0, "updated": 0, "duration": 0.1, "error": "token expired",
+                   "graph": {"status": 400, "code": 190, "type": "OAuthException"}}
+    ok = {"medias": 1, "inserted": 1, "updated": 0, "duration": 0.1, "error": None}
+    outcomes = {}
+    monkeypatch.setattr(server, "_authenticate_request", lambda req: ({"id": "u"}, None))
+    monkeypatch.setattr(server, "ingest_accounts_comments", lambda ids, days: {item: dict(outcomes[item]) for item in ids})
+    client = server.app.test_client()
+
+    def post(ids):
+        return client.post("/api/instagram/comments/ingest", json={"igUserIds": ids})
+
+    outcomes.update(a=graph_error, b=graph_error, c=ok)
+    single = post(["a"])
+    assert single.status_code == 502 and single.get_json()["graph"]["code"] == 190
+    assert post(["a", "b"]).status_code == 502
+    assert post(["a", "c"]).status_code == 202
+    assert post([f"x{index}" for index in range(server.COMMENTS_INGEST_MAX_ACCOUNTS + 1)]).status_code == 400
+
+
+def test_accounts_driver_keeps_graph_error_details(monkeypatch):
+    from jobs import instagram_comments_ingest as ig
+
+    def fake_ingest(account_id, days, media_executor=None):
+        raise ig.MetaAPIError(400, "token expired", code=190, error_type="OAuthException")
+
+    monkeypatch.setattr(ig, "ingest_account_comments", fake_ingest)
+    result = ig.ingest_accounts_comments(["acc"], days=7, account_concurrency=1, media_concurrency=1)["acc"]
+    assert result["error"] == "token expired"
+    assert result["graph"] == {"status": 400, "code": 190, "type": "OAuthException"}
+
+
+def test_local_comment_paths_fall_back_before_the_ingested_window(monkeypatch):
+    import server
+    from datetime import date
+
+    oldest = {"fb_comments_daily": date(2024, 5, 10), "fb_comment_tokens": datetime(2024, 5, 10, 9, tzinfo=timezone.utc)}
+    queries = []
+
+    def fake_fetch_one(sql, params=None):
+        queries.append(sql)
+        table = sql.split(" FROM ")[1].split()[0]
+        return {"oldest": oldest.get(table)}
+
+    monkeypatch.setattr(server, "fetch_one", fake_fetch_one)
+    assert server.local_comments_cover("fb_comments_daily", "page", date(2024, 5, 10))
+    assert not server.local_comments_cover("fb_comments_daily", "page", date(2024, 5, 9))
+    assert not server.local_comments_cover("ig_comments_daily", "acc", date(2024, 5, 9))
+
+    queries.clear()
+    indexed = server.search_indexed_comments(
+        "page", "amei", "2024-05-01T00:00:00+00:00", "2024-05-20T23:59:59+00:00", 10, 0,
+        tokens_table="fb_comment_tokens", comments_table="fb_comments",
+    )
+    assert indexed is None and len(queries) == 1
+
+    graph_calls = []
+    monkeypatch.setattr(server, "get_postgres_client", lambda: object())
+    monkeypatch.setattr(
+        server,
+        "fetch_facebook_comments_for_wordcloud",
+        lambda page_id, since_dt, until_dt: graph_calls.append(since_dt.date())
+        or {"comments": [{"text": "amei demais"}], "meta": {"truncated": False}},
+    )
+    response = server.app.test_client().get(
+        "/api/facebook/comments/wordcloud?pageId=page&since=2024-05-01&until=2024-05-20"
+    )
+    assert response.status_code == 200
+    assert response.get_json()["meta"]["source"] == "graph"
+    assert graph_calls == [date(2024, 5, 1)]
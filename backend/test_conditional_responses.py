@@ -0,0 +1,78 @@
+"""
+Tests for ETag / 304 handling on cached dashboard responses.
+"""
+
+import server
+
+
+def _cache_meta(**overrides):
+    meta = {
+        "cache_key": "abc",
+        "fetched_at": "2024-01-01T00:00:00+00:00",
+        "updated_at": "2024-01-01T00:00:00+00:00",
+        "next_refresh_at": "2999-01-01T00:00:00+00:00",
+        "stale": False,
+        "source": "cache",
+    }
+    meta.update(overrides)
+    return meta
+
+
+def _envelope(meta):
+    return server._build_api_envelope(
+        {"metrics": []},
+        platform="instagram",
+        account_id="1",
+        since=10,
+        until=20,
+        cache_meta=meta,
+    )
+
+
+def test_envelope_etag_matches_peek_and_answers_304():
+    meta = _cache_meta()
+    envelope = _envelope(meta)
+    etag = envelope["meta"]["etag"]
+    assert etag
+    with server.app.test_request_context(headers={"If-None-Match": f'"{etag}"'}):
+        response = server._envelope_response(envelope)
+        assert response.status_code == 304
+        assert response.headers["Cache-Control"] == server.CONDITIONAL_CACHE_CONTROL
+        validator = {key: meta[key] for key in ("cache_key", "fetched_at", "updated_at", "stale")}
+        early = server._not_modified_response(validator, "instagram", "1", 10, 20, "UTC")
+        assert early is not None and early.status_code == 304
+    with server.app.test_request_context():
+        response = server._envelope_response(envelope)
+        assert response.status_code == 200
+        assert response.get_etag() == (etag, False)
+
+
+def test_no_etag_for_stale_or_rewritten_entries():
+    assert _envelope(_cache_meta(stale=True))["meta"]["etag"] is None
+    assert _envelope(_cache_meta(cache_key=None))["meta"]["etag"] is None
+    original = _envelope(_cache_meta())["meta"]["etag"]
+    rewritten = _envelope(_cache_meta(updated_at="2024-01-02T00:00:00+00:00"))["meta"]["etag"]
+    assert original != rewritten
+
+
+def test_etag_follows_sync_staleness_and_account_summary(monkeypatch):
+    # next_refresh_at no passado: meta.sync.is_stale é True, então não há validador.
+    assert _envelope(_cache_meta(next_refresh_at="2000-01-01T00:00:00+00:00"))["meta"]["etag"] is None
+
+    monkeypatch.setitem(server.IG_ACCOUNT_SUMMARY_MEM_CACHE, "1", {"ts": server.time.time(), "data": {}})
+    version = server._instagram_account_summary_version("1")
+    assert version
+    with_summary = server._build_api_envelope(
+        {"metrics": []},
+        platform="instagram",
+        account_id="1",
+        since=10,
+        until=20,
+        cache_meta=_cache_meta(),
+        etag_variant=(version,),
+    )["meta"]["etag"]
+    assert with_summary != _envelope(_cache_meta())["meta"]["etag"]
+
+    # Resumo vencido: nenhuma versão, o endpoint monta a resposta completa em vez de 304.
+    monkeypatch.setitem(server.IG_ACCOUNT_SUMMARY_MEM_CACHE, "1", {"ts": 0, "data": {}})
+    assert server._instagram_account_summary_version("1") is None
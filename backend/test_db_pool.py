@@ -0,0 +1,64 @@
+"""
+Tests for the thread-safe Postgres connection pool.
+"""
+
+import threading
+import time
+
+import pytest
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INERROR
+
+import db
+
+
+class _FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.status = TRANSACTION_STATUS_IDLE
+        self.rollbacks = 0
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(db.psycopg2, "connect", lambda **_: _FakeConnection())
+    return db.ConnectionPool(min_size=1, max_size=2, conninfo={}, timeout=0.2)
+
+
+def test_exhausted_pool_waits_then_times_out(pool):
+    first = pool.getconn()
+    second = pool.getconn()
+    assert pool.stats()["in_use"] == 2
+    with pytest.raises(db.PoolTimeout):
+        pool.getconn()
+    assert pool.stats()["timeouts"] == 1
+
+    threading.Timer(0.05, pool.putconn, args=(first,)).start()
+    started = time.monotonic()
+    assert pool.getconn() is first
+    assert time.monotonic() - started < 0.2
+    pool.putconn(first)
+    pool.putconn(second)
+    assert pool.stats()["idle"] == 2
+
+
+def test_returned_connections_are_rolled_back_and_recycled(pool):
+    conn = pool.getconn()
+    conn.status = TRANSACTION_STATUS_INERROR
+    pool.putconn(conn)
+    assert conn.rollbacks == 1 and pool.stats()["rolled_back"] == 1
+
+    pool.max_lifetime = 0
+    reused = pool.getconn()
+    assert reused is not conn and conn.closed
+    pool.putconn(reused)
+    assert reused.closed and pool.stats()["size"] == 0
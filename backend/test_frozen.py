@@ -0,0 +1,56 @@
+"""
+Tests for read-only cached payloads.
+"""
+
+import copy
+import json
+
+import pytest
+
+from frozen import FrozenDict, FrozenList, freeze, thaw
+
+
+def test_frozen_payload_rejects_mutation_and_serializes():
+    payload = freeze({"metrics": [{"key": "reach", "value": 1}], "since": 1})
+    assert isinstance(payload, FrozenDict)
+    assert isinstance(payload["metrics"], FrozenList)
+    with pytest.raises(TypeError):
+        payload["since"] = 2
+    with pytest.raises(TypeError):
+        payload["metrics"].append({})
+    with pytest.raises(TypeError):
+        payload["metrics"][0]["value"] = 3
+    assert json.loads(json.dumps(payload)) == {"metrics": [{"key": "reach", "value": 1}], "since": 1}
+    assert freeze(payload) is payload
+
+
+def test_shallow_copy_enriches_without_touching_original():
+    payload = freeze({"account": None, "posts": [{"id": "1"}]})
+    response = dict(payload)
+    response["account"] = {"id": "ig"}
+    assert payload["account"] is None
+    assert response["posts"] is payload["posts"]
+
+
+def test_thaw_and_deepcopy_return_mutable_copies():
+    payload = freeze({"metrics": [{"key": "reach"}]})
+    for mutable in (thaw(payload), copy.deepcopy(payload)):
+        assert type(mutable) is dict and type(mutable["metrics"]) is list
+        mutable["metrics"][0]["value"] = 5
+    assert "value" not in payload["metrics"][0]
+
+
+def test_enrich_facebook_metrics_accepts_frozen_payload():
+    from server import _enrich_facebook_metrics_payload
+
+    cached = freeze({
+        "metrics": [{"key": "followers_total", "value": None}],
+        "page_overview": {"followers_total": 10, "page_interactions_by_follow_type": {"followers": 1}},
+        "breakdowns": {},
+    })
+    payload = dict(cached)
+    _enrich_facebook_metrics_payload(payload)
+    assert payload["metrics"][0]["value"] == 10
+    assert payload["breakdowns"]["page_interactions_follow_type"] == {"followers": 1}
+    assert cached["metrics"][0]["value"] is None
+    assert cached["breakdowns"] == {}
@@ -0,0 +1,68 @@
+"""
+Tests for /api/* response compression.
+"""
+
+import gzip
+
+from flask import Flask, Response, request
+
+import http_compression
+from http_compression import register_compression
+
+
+def _app():
+    app = Flask(__name__)
+    register_compression(app)
+
+    @app.get("/api/big")
+    def big():
+        response = Response(b'{"k":"' + b"x" * 4096 + b'"}', mimetype="application/json")
+        response.set_etag("abc")
+        return response.make_conditional(request)
+
+    bodies = iter([b"a", b"b"])
+
+    @app.get("/api/shared-etag")
+    def shared_etag():
+        # Mesmo ETag, corpos diferentes (ex.: resumo da conta ao vivo fora do validador).
+        response = Response(b'{"k":"' + next(bodies) * 4096 + b'"}', mimetype="application/json")
+        response.set_etag("shared")
+        return response
+
+    @app.get("/api/small")
+    def small():
+        return Response(b"{}", mimetype="application/json")
+
+    return app
+
+
+def test_gzip_negotiation_and_precompressed_reuse():
+    client = _app().test_client()
+    first = client.get("/api/big", headers={"Accept-Encoding": "gzip"})
+    assert first.headers["Content-Encoding"] == "gzip"
+    assert first.get_etag() == ("abc-gzip", False)
+    assert gzip.decompress(first.get_data()).startswith(b'{"k":"xxx')
+    hits_before = http_compression.get_compression_stats()["codecs"]["gzip"]["precompressed_hits"]
+    second = client.get("/api/big", headers={"Accept-Encoding": "gzip"})
+    assert second.get_data() == first.get_data()
+    stats = http_compression.get_compression_stats()["codecs"]["gzip"]
+    assert stats["precompressed_hits"] == hits_before + 1
+    assert stats["ratio"] < 0.1
+
+
+def test_suffixed_etag_revalidates_and_small_bodies_pass_through():
+    client = _app().test_client()
+    not_modified = client.get("/api/big", headers={"Accept-Encoding": "gzip", "If-None-Match": '"abc-gzip"'})
+    assert not_modified.status_code == 304
+    assert not_modified.get_etag() == ("abc-gzip", False)
+    small = client.get("/api/small", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers
+    assert client.get("/api/big").headers.get("Content-Encoding") is None
+
+
+def test_same_etag_with_different_body_is_recompressed():
+    client = _app().test_client()
+    first = client.get("/api/shared-etag", headers={"Accept-Encoding": "gzip"})
+    second = client.get("/api/shared-etag", headers={"Accept-Encoding": "gzip"})
+    assert gzip.decompress(first.get_data()).startswith(b'{"k":"aaa')
+    assert gzip.decompress(second.get_data()).startswith(b'{"k":"bbb')
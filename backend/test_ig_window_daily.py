@@ -0,0 +1,141 @@
+"""
+Tests for meta.ig_window_daily: daily series fetched per 30-day block and
+split into per-day snapshots; only total_value metrics go out per day.
+"""
+
+from datetime import date, datetime, timedelta, timezone
+
+import meta
+
+BRT_OFFSET = timedelta(hours=3)
+
+
+def _windows(start: date, days: int):
+    windows = []
+    for index in range(days):
+        day = start + timedelta(days=index)
+        since = datetime(day.year, day.month, day.day, tzinfo=timezone.utc) + BRT_OFFSET
+        windows.append((day.isoformat(), int(since.timestamp()), int(since.timestamp()) + 86399))
+    return windows
+
+
+def _end_time(day: date) -> str:
+    # A Graph API marca o fim do dia medido (meia-noite do Pacífico).
+    return f"{(day + timedelta(days=1)).isoformat()}T07:00:00+0000"
+
+
+def _series_payload(metric, since, until, value):
+    start = datetime.fromtimestamp(since, timezone.utc).date()
+    end = datetime.fromtimestamp(until, timezone.utc).date()
+    values = []
+    day = start
+    while day < end:
+        values.append({"value": value(day), "end_time": _end_time(day)})
+        day += timedelta(days=1)
+    return {"data": [{"name": metric, "values": values}]}
+
+
+def _fake_graph(calls_log):
+    def _run(calls, token=None):
+        calls_log.append(list(calls))
+        results = []
+        for _path, params in calls:
+            metric = params["metric"]
+            if params.get("metric_type") == "total_value":
+                if params.get("breakdown"):
+                    results.append({"data": []})
+                    continue
+                results.append({
+                    "data": [
+                        {"name": name, "total_value": {"value": 2}}
+                        for name in metric.split(",")
+                    ]
+                })
+            elif metric == "reach":
+                results.append(_series_payload("reach", params["since"], params["until"], lambda day: day.day))
+            elif metric == "follower_count":
+                results.append(_series_payload("follower_count", params["since"], params["until"], lambda day: 1000 + day.day))
+            else:
+                results.append(meta.MetaAPIError(400, "unsupported", code=100))
+        return results
+
+    return _run
+
+
+def test_ig_window_daily_splits_series_per_day(monkeypatch):
+    calls_log = []
+    post_day = date(2024, 5, 3)
+    post_ts = int((datetime(2024, 5, 3, 12, tzinfo=timezone.utc)).timestamp())
+
+    def _fake_media(ig_user_id, since, until):
+        if since <= post_ts <= until:
+            yield {"id": "m1"}, {
+                "timestamp_unix": post_ts, "likes": 5, "comments": 1, "shares": 0, "saves": 2,
+                "reach": 40, "views": 30, "view_time": 90.0, "avg_watch_time": None,
+            }
+
+    monkeypatch.setattr(meta, "_run_graph_calls", _fake_graph(calls_log))
+    monkeypatch.setattr(meta, "_iter_ig_media_metrics", _fake_media)
+
+    windows = _windows(date(2024, 5, 1), 45)
+    snapshots = meta.ig_window_daily("ig1", windows)
+
+    assert len(snapshots) == 45
+    series_calls = [call for batch in calls_log for call in batch if "metric_type" not in call[1]]
+    # 2 blocos (30 + 15 dias) x 3 séries, em vez de 45 janelas diárias.
+    assert len(series_calls) == 6
+
+    first = snapshots["2024-05-01"]
+    assert first["reach"] == 1
+    assert first["follower_count_end"] == 1001
+    assert first["profile_views"] == 2
+    assert first["interactions"] == 2
+
+    post_snapshot = snapshots[post_day.isoformat()]
+    assert post_snapshot["likes"] == 5
+    assert post_snapshot["video_views"] == 30
+    assert post_snapshot["watch_time_total"] == 90
+    assert snapshots["2024-05-04"]["likes"] == 0
+
+    # follows_and_unfollows sem série -> fallback total_value por dia.
+    follows_fallback = [
+        call for batch in calls_log for call in batch
+        if call[1]["metric"] == "follows_and_unfollows" and call[1].get("metric_type") == "total_value"
+    ]
+    assert len(follows_fallback) == 45
+
+
+def test_ig_window_daily_drops_days_whose_calls_failed(monkeypatch):
+    failing_since = _windows(date(2024, 5, 1), 1)[0][1]
+    graph = _fake_graph([])
+
+    def _run(calls, token=None):
+        # Batch das séries do 1º bloco perdido (rede/5xx): None em todas as posições.
+        if any(params["since"] == failing_since and "metric_type" not in params for _path, params in calls):
+            return [None] * len(calls)
+        return graph(calls, token)
+
+    monkeypatch.setattr(meta, "_run_graph_calls", _run)
+    monkeypatch.setattr(meta, "_iter_ig_media_metrics", lambda *args: iter(()))
+
+    snapshots = meta.ig_window_daily("ig1", _windows(date(2024, 5, 1), 45))
+
+    # O primeiro bloco (30 dias) perdeu as séries; os dias dele não viram zeros.
+    assert "2024-05-01" not in snapshots
+    assert "2024-05-30" not in snapshots
+    assert len(snapshots) == 15
+    assert snapshots["2024-05-31"]["reach"] == 31
+
+
+def test_ig_window_daily_returns_nothing_when_daily_batch_fails(monkeypatch):
+    graph = _fake_graph([])
+
+    def _run(calls, token=None):
+        if any(params.get("metric_type") == "total_value" for _path, params in calls):
+            return [None] * len(calls)
+        return graph(calls, token)
+
+    monkeypatch.setattr(meta, "_run_graph_calls", _run)
+    monkeypatch.setattr(meta, "_iter_ig_media_metrics", lambda *args: iter(()))
+
+    assert meta.ig_window_daily("ig1", _windows(date(2024, 5, 1), 10)) == {}
@@ -0,0 +1,69 @@
+"""
+Tests for JSON responses spliced from cached fragments.
+"""
+
+import json
+
+from flask import Flask, jsonify
+
+from frozen import freeze
+from json_response import json_response
+from json_utils import FastJSONProvider
+
+
+def test_spliced_envelope_matches_jsonify():
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    payload = freeze({"metrics": [{"key": "reach", "value": 1.5}], "since": 1, "title": "ação"})
+    response = dict(payload)
+    response["cache"] = {"stale": False}
+    envelope = {"data": response, "meta": {"platform": "instagram"}, "error": None}
+    with app.app_context():
+        expected = jsonify(envelope).get_data()
+        first = json_response(envelope, source=payload).get_data()
+        second = json_response(envelope, source=payload).get_data()
+    assert first == expected == second
+    assert set(payload._json_fragments) == {"metrics", "since", "title"}
+
+
+def test_replaced_keys_are_reencoded():
+    app = Flask(__name__)
+    payload = freeze({"account": None, "posts": [{"id": "1"}]})
+    response = dict(payload)
+    response["account"] = {"id": "ig"}
+    with app.app_context():
+        body = json_response(response, source=payload).get_data()
+    assert json.loads(body) == {"account": {"id": "ig"}, "posts": [{"id": "1"}]}
+    assert payload["account"] is None
+
+
+def test_enriched_facebook_metrics_reuse_cached_fragment(monkeypatch):
+    import json_response as json_response_module
+    from server import _enrich_facebook_metrics_payload
+
+    app = Flask(__name__)
+    cached = freeze({
+        "metrics": [
+            {"key": "followers_total", "value": 10},
+            {"key": "video_views_total", "value": 4},
+        ],
+        "page_overview": {"followers_total": 10, "video_views": 4},
+    })
+    with app.app_context():
+        json_response(dict(cached), source=cached)
+
+    encoded = []
+    original = json_response_module._encode_member
+    monkeypatch.setattr(
+        json_response_module,
+        "_encode_member",
+        lambda key, value: encoded.append(key) or original(key, value),
+    )
+    payload = dict(cached)
+    _enrich_facebook_metrics_payload(payload)
+    with app.app_context():
+        body = json_response(payload, source=cached).get_data()
+
+    assert payload["metrics"] is cached["metrics"]
+    assert "metrics" not in encoded
+    assert json.loads(body)["metrics"][0] == {"key": "followers_total", "value": 10}
@@ -0,0 +1,38 @@
+"""
+Tests for the fast JSON serializer helpers.
+"""
+
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from flask import Flask, jsonify
+
+from frozen import freeze
+from json_utils import FastJSONProvider, Json, dumps, loads
+
+
+def test_dumps_handles_decimal_and_dates_without_sanitizing():
+    payload = freeze({
+        "value": Decimal("1.5"),
+        "day": date(2024, 1, 2),
+        "at": datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+        "rows": [{"n": Decimal("2")}],
+    })
+    assert loads(dumps(payload)) == {
+        "value": 1.5,
+        "day": "2024-01-02",
+        "at": "2024-01-02T03:04:05+00:00",
+        "rows": [{"n": 2.0}],
+    }
+    assert loads(Json({"v": Decimal("3")}).dumps({"v": Decimal("3")})) == {"v": 3.0}
+
+
+def test_provider_keeps_default_flask_wire_format():
+    default_app = Flask("default")
+    fast_app = Flask("fast")
+    fast_app.json = FastJSONProvider(fast_app)
+    body = {"b": [1, 2], "a": {"d": Decimal("1.10"), "when": datetime(2024, 1, 2, tzinfo=timezone.utc)}}
+    with default_app.app_context():
+        expected = jsonify(body).get_data()
+    with fast_app.app_context():
+        assert jsonify(body).get_data() == expected
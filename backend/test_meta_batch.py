@@ -0,0 +1,154 @@
+"""
+Tests for the Graph API batch engine against a local stub server.
+The stub speaks the `batch` format: form-encoded POST with a JSON list of
+sub-requests, answered by a list of {"code", "body"} items (or null).
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+import meta
+
+UNSUPPORTED = {"shares"}
+
+
+class _GraphStub(BaseHTTPRequestHandler):
+    batch_sizes: list = []
+    gets: list = []
+    timeout_paths: set = set()
+    get_delay = 0.0
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def log_message(self, *args):  # silencia o stderr do pytest
+        pass
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    @staticmethod
+    def _answer(path, query):
+        metrics = (query.get("metric") or [""])[0].split(",")
+        if any(metric in UNSUPPORTED for metric in metrics):
+            return 400, {"error": {"message": "unsupported metric", "code": 100, "type": "OAuthException"}}
+        media_id = path.strip("/").split("/")[-2]
+        return 200, {
+            "data": [
+                {"name": metric, "values": [{"value": len(media_id) + index}]}
+                for index, metric in enumerate(metrics)
+            ]
+        }
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        time.sleep(cls.get_delay)
+        with cls.lock:
+            cls.in_flight -= 1
+        parts = urlsplit(self.path)
+        self.gets.append(parts.path)
+        status, payload = self._answer(parts.path, parse_qs(parts.query))
+        self._reply(status, payload)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        form = parse_qs(self.rfile.read(length).decode())
+        batch = json.loads(form["batch"][0])
+        self.batch_sizes.append(len(batch))
+        items = []
+        for entry in batch:
+            parts = urlsplit("/" + entry["relative_url"])
+            if parts.path in self.timeout_paths:
+                items.append(None)
+                continue
+            status, payload = self._answer(parts.path, parse_qs(parts.query))
+            items.append({"code": status, "headers": [], "body": json.dumps(payload)})
+        self._reply(200, items)
+
+
+@pytest.fixture()
+def graph_stub(monkeypatch):
+    _GraphStub.batch_sizes = []
+    _GraphStub.gets = []
+    _GraphStub.timeout_paths = set()
+    _GraphStub.get_delay = 0.0
+    _GraphStub.max_in_flight = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _GraphStub)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(meta, "BASE", f"http://127.0.0.1:{server.server_address[1]}/v23.0")
+    monkeypatch.setattr(meta, "TOKEN", "test-token")
+    monkeypatch.setattr(meta, "SECRET", None)
+    monkeypatch.setattr(meta, "BATCH_ENABLED", True)
+    yield _GraphStub
+    server.shutdown()
+    server.server_close()
+
+
+def test_gbatch_splits_in_chunks_of_50(graph_stub):
+    calls = [(f"/m{index}/insights", {"metric": "reach"}) for index in range(60)]
+    results = meta.gbatch(calls)
+    # Os chunks saem em paralelo (run_bounded): a ordem de chegada no stub varia.
+    assert sorted(graph_stub.batch_sizes) == [10, 50]
+    assert results[0]["data"][0]["name"] == "reach"
+    assert len(results) == 60
+
+
+def test_fetch_media_insights_one_round_trip(graph_stub):
+    items = [(f"m{index}", ["reach", "saved"]) for index in range(25)]
+    results = meta.fetch_media_insights(items)
+    assert graph_stub.batch_sizes == [25]
+    assert graph_stub.gets == []
+    assert all(len(result["data"]) == 2 for result in results)
+
+
+def test_unsupported_metric_only_resends_failed_items(graph_stub):
+    unsupported = set()
+    items = [("m1", ["reach", "saved"]), ("m2", ["reach", "shares"]), ("m3", ["saved"])]
+    results = meta.fetch_media_insights(items, unsupported_metrics=unsupported)
+    # Primeiro batch com as 3 mídias; depois só m2, métrica a métrica.
+    assert graph_stub.batch_sizes == [3, 2]
+    assert unsupported == {"shares"}
+    assert meta._media_insight_values(results[1]) == {"reach": 2.0}
+    assert [entry["name"] for entry in results[0]["data"]] == ["reach", "saved"]
+
+
+def test_null_batch_items_are_retried_individually(graph_stub):
+    graph_stub.timeout_paths = {"/m2/insights"}
+    results = meta.gbatch([("/m1/insights", {"metric": "reach"}), ("/m2/insights", {"metric": "reach"})])
+    assert graph_stub.gets == ["/v23.0/m2/insights"]
+    assert results[1]["data"][0]["name"] == "reach"
+
+
+def test_item_errors_are_returned_not_raised(graph_stub):
+    results = meta.gbatch([("/m1/insights", {"metric": "shares"}), ("/m2/insights", {"metric": "reach"})])
+    assert isinstance(results[0], meta.MetaAPIError)
+    assert results[0].code == 100
+    assert results[1]["data"][0]["name"] == "reach"
+
+
+def test_unbatched_fanout_is_bounded_and_ordered(graph_stub, monkeypatch):
+    monkeypatch.setattr(meta, "BATCH_ENABLED", False)
+    monkeypatch.setattr(meta, "MAX_IN_FLIGHT_PER_TOKEN", 3)
+    monkeypatch.setattr(meta, "_token_slots", {})
+    graph_stub.get_delay = 0.05
+    items = [("m" + "x" * index, ["reach"]) for index in range(9)]
+    results = meta.fetch_media_insights(items)
+    assert graph_stub.batch_sizes == []
+    assert 1 < graph_stub.max_in_flight <= 3
+    assert [meta._media_insight_values(result)["reach"] for result in results] == [
+        float(len(media_id)) for media_id, _ in items
+    ]
@@ -0,0 +1,94 @@
+"""
+Tests for the Graph API rate-limit governor (header parsing and priorities).
+"""
+
+import json
+import threading
+import time
+
+import meta_rate_limit
+from meta_rate_limit import (
+    PRIORITY_INGEST,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_WARMUP,
+    RateLimitGovernor,
+    parse_usage_headers,
+    request_priority,
+)
+
+
+def test_parse_usage_headers():
+    headers = {
+        "X-App-Usage": json.dumps({"call_count": 12, "total_time": 40, "total_cputime": 5}),
+        "X-Business-Use-Case-Usage": json.dumps(
+            {"123": [{"type": "instagram", "call_count": 70, "total_time": 3, "estimated_time_to_regain_access": 2}]}
+        ),
+    }
+    usage = parse_usage_headers(headers)
+    assert usage["app_pct"] == 40
+    assert usage["token_pct"] == 70
+    assert usage["regain_seconds"] == 120
+
+
+def test_background_priority_waits_while_interactive_passes(monkeypatch):
+    monkeypatch.setitem(meta_rate_limit._MAX_WAIT_SECONDS, PRIORITY_INGEST, 0.2)
+    governor = RateLimitGovernor()
+    governor.observe("tok", {"X-App-Usage": json.dumps({"call_count": 80})})
+
+    started = time.monotonic()
+    with request_priority(PRIORITY_INTERACTIVE):
+        governor.acquire("tok")
+    assert time.monotonic() - started < 0.1
+
+    started = time.monotonic()
+    with request_priority(PRIORITY_INGEST):
+        governor.acquire("tok")
+    assert time.monotonic() - started >= 0.2
+    assert governor.stats()["gave_up_waiting"] == 1
+
+
+def test_throttle_error_blocks_scope(monkeypatch):
+    monkeypatch.setitem(meta_rate_limit._MAX_WAIT_SECONDS, PRIORITY_WARMUP, 0.1)
+    governor = RateLimitGovernor()
+    governor.note_throttled("tok", 400, 17)
+    stats = governor.stats()
+    assert stats["throttle_errors"] == 1
+    assert any(scope["blocked_for_seconds"] > 0 for scope in stats["scopes"].values())
+    with request_priority(PRIORITY_WARMUP):
+        assert governor.max_attempts(3) >= 5
+
+
+def test_interactive_gget_does_not_join_throttled_warmup_leader(monkeypatch):
+    import meta
+
+    monkeypatch.setitem(meta_rate_limit._MAX_WAIT_SECONDS, PRIORITY_WARMUP, 2.0)
+    monkeypatch.setitem(meta_rate_limit._MAX_WAIT_SECONDS, PRIORITY_INTERACTIVE, 0.2)
+    governor = RateLimitGovernor()
+    governor.note_throttled("tok", 400, 17)
+    monkeypatch.setattr(meta, "rate_limit_governor", governor)
+    monkeypatch.setattr(meta, "TOKEN", "tok")
+    monkeypatch.setattr(meta, "SECRET", None)
+    leader_started = threading.Event()
+
+    def fake_request(method, url, label, token, data=None):
+        leader_started.set()
+        governor.acquire(token)
+        return {"priority": meta_rate_limit.current_priority()}
+
+    monkeypatch.setattr(meta, "_graph_request", fake_request)
+
+    def warmup_call():
+        with request_priority(PRIORITY_WARMUP):
+            meta.gget("/me", {"fields": "id"})
+
+    leader = threading.Thread(target=warmup_call)
+    leader.start()
+    assert leader_started.wait(1.0)
+
+    started = time.monotonic()
+    result = meta.gget("/me", {"fields": "id"})
+    elapsed = time.monotonic() - started
+    leader.join()
+
+    assert result == {"priority": PRIORITY_INTERACTIVE}
+    assert elapsed < 1.0
@@ -0,0 +1,238 @@
+"""
+Tests for TableQuery statement shapes and parameter naming.
+"""
+
+import pytest
+from psycopg2 import sql
+
+from postgres_client import TableQuery
+
+
+def _placeholders(composable):
+    if isinstance(composable, sql.Placeholder):
+        return {composable.name}
+    if isinstance(composable, sql.Composed):
+        names = set()
+        for part in composable.seq:
+            names |= _placeholders(part)
+        return names
+    return set()
+
+
+def _check(query):
+    shape, build = query._statement_shape()
+    params = query._build_params()
+    assert _placeholders(build()) == set(params)
+    return shape, params
+
+
+def test_same_shape_reuses_statement_key_with_new_values():
+    first, first_params = _check(TableQuery("ig_cache").select("*").eq("cache_key", "a").limit(1))
+    second, second_params = _check(TableQuery("ig_cache").select("*").eq("cache_key", "b").limit(1))
+    assert first == second
+    assert first_params != second_params
+    assert _check(TableQuery("ig_cache").select("*").eq("owner_id", "a").limit(1))[0] != first
+
+
+def test_mutation_params_match_compiled_placeholders():
+    row = {"cache_key": "k", "payload": "{}", "fetched_at": None}
+    upsert_shape, _ = _check(TableQuery("ig_cache").upsert(row, on_conflict="cache_key"))
+    assert upsert_shape == _check(TableQuery("ig_cache").upsert(dict(row, cache_key="z"), on_conflict="cache_key"))[0]
+    # Lotes de várias linhas não entram no cache de statements (o texto cresce com o lote).
+    assert _check(TableQuery("ig_cache").insert([row, row]))[0] is None
+    assert _check(TableQuery("ig_cache").upsert([row, row], on_conflict="cache_key"))[0] is None
+    _, params = _check(TableQuery("ig_cache").update({"last_refresh_status": "failed"}).eq("cache_key", "k"))
+    assert params == {"p0": "k", "p1": "failed"}
+
+
+def test_copy_stream_encodes_rows_lazily():
+    from postgres_client import _CopyStream
+    from json_utils import Json
+
+    produced = []
+
+    def rows():
+        for index in range(3):
+            produced.append(index)
+            yield {"id": index, "text": "a\tb\nc\\", "meta": Json({"k": 1}), "missing": None}
+
+    stream = _CopyStream(rows(), ["id", "text", "meta", "missing"])
+    first = stream.read(8)
+    assert len(first) == 8 and produced == [0]
+    data = first + stream.read(-1)
+    assert data.decode().splitlines()[0] == '0\ta\\tb\\nc\\\\\t{"k":1}\t\\N'
+    assert stream.row_count == 3 and stream.read(10) == b""
+
+
+def _sql_text(composable):
+    if isinstance(composable, sql.Composed):
+        return "".join(_sql_text(part) for part in composable.seq)
+    if isinstance(composable, sql.SQL):
+        return composable.string
+    if isinstance(composable, sql.Identifier):
+        return ".".join(composable.strings)
+    return ""
+
+
+def test_mutations_only_return_requested_columns():
+    row = {"cache_key": "k", "payload": "{}"}
+    upsert = TableQuery("ig_cache").upsert(row, on_conflict="cache_key")
+    assert _sql_text(upsert._build_upsert()).endswith("RETURNING (xmax = 0) AS _upsert_inserted")
+    assert "RETURNING" not in _sql_text(TableQuery("ig_cache").insert(row)._build_insert())
+    update = TableQuery("ig_cache").update({"payload": "{}"}, returning="cache_key").eq("cache_key", "k")
+    assert _sql_text(update._build_update()).endswith("RETURNING cache_key")
+
+
+def test_keyset_filter_compiles_row_comparison():
+    query = TableQuery("ig_comments").select("id,timestamp").eq("account_id", "1").after("timestamp,id", ["t", "c"])
+    _, params = _check(query)
+    assert params == {"p0": "1", "p1": "t", "p2": "c"}
+    assert _sql_text(query._build_select()).endswith("WHERE account_id =  AND (timestamp, id) > (, )")
+
+
+def test_keyset_pages_seek_from_last_key(monkeypatch):
+    from types import SimpleNamespace
+
+    rows = [{"id": str(index), "ts": index // 2} for index in range(5)]
+    seen_filters = []
+
+    def fake_execute(query):
+        seen_filters.append([f for f in query._filters if isinstance(f[0], tuple)])
+        start = 0
+        if seen_filters[-1]:
+            last = tuple(query._params[name] for name in seen_filters[-1][0][2])
+            start = next(i for i, row in enumerate(rows) if (row["ts"], row["id"]) > last)
+        return SimpleNamespace(data=rows[start:start + query._limit])
+
+    monkeypatch.setattr(TableQuery, "execute", fake_execute)
+    pages = list(TableQuery("ig_comments").select("id,ts").keyset_pages("ts,id", page_size=2))
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert seen_filters[0] == [] and seen_filters[1][0][:2] == (("ts", "id"), ">")
+
+
+class _FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement, params=None):
+        self.conn.log.append(("execute", statement if isinstance(statement, str) else "sql", params))
+        self.description = [("row",)] if self.conn.result_rows is not None else None
+        self.rowcount = len(self.conn.result_rows or [])
+
+    def fetchall(self):
+        return [dict(row) for row in self.conn.result_rows]
+
+    def copy_expert(self, statement, stream):
+        stream.read(-1)
+        if self.conn.fail_copy:
+            raise RuntimeError("copy failed")
+        self.conn.log.append(("copy", statement, None))
+
+    def fetchone(self):
+        return {"inserted": 1, "updated": 0}
+
+
+class _FakeConn:
+    def __init__(self, fail_copy=False, result_rows=None):
+        self.log = []
+        self.fail_copy = fail_copy
+        self.result_rows = result_rows
+
+    def cursor(self, **_):
+        return _FakeCursor(self)
+
+    def commit(self):
+        self.log.append(("commit", None, None))
+
+
+class _FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+        self.checkouts = 0
+
+    def connection(self):
+        import contextlib
+
+        @contextlib.contextmanager
+        def _checkout():
+            self.checkouts += 1
+            yield self.conn
+
+        return _checkout()
+
+
+def test_bulk_upsert_runs_before_statements_in_the_same_transaction(monkeypatch):
+    import postgres_client
+
+    monkeypatch.setattr(sql.Composed, "as_string", lambda self, context: "COPY")
+    delete = ("DELETE FROM t WHERE id = ANY(%(ids)s)", {"ids": ["1"]})
+
+    conn = _FakeConn()
+    pool = _FakePool(conn)
+    monkeypatch.setattr(postgres_client, "get_pool", lambda: pool)
+    result = TableQuery("t").bulk_upsert([{"id": "1"}], on_conflict="id", before=[delete]).execute()
+    assert result.inserted == 1
+    assert pool.checkouts == 1
+    kinds = [entry[0] for entry in conn.log]
+    assert conn.log[0] == ("execute", delete[0], delete[1])
+    assert kinds.index("copy") < kinds.index("commit") and kinds.count("commit") == 1
+
+    # COPY falhou: nada foi commitado, nem o DELETE.
+    failing = _FakeConn(fail_copy=True)
+    monkeypatch.setattr(postgres_client, "get_pool", lambda: _FakePool(failing))
+    with pytest.raises(RuntimeError):
+        TableQuery("t").bulk_upsert([{"id": "1"}], on_conflict="id", before=[delete]).execute()
+    assert failing.log[0][1] == delete[0]
+    assert ("commit", None, None) not in failing.log
+
+
+def _identifiers(composable):
+    if isinstance(composable, sql.Identifier):
+        return set(composable.strings)
+    if isinstance(composable, sql.Composed):
+        names = set()
+        for part in composable.seq:
+            names |= _identifiers(part)
+        return names
+    return set()
+
+
+def _run_upsert(monkeypatch, result_rows, returning=None):
+    import postgres_client
+
+    monkeypatch.setattr(sql.Composed, "as_string", lambda self, context: "UPSERT")
+    conn = _FakeConn(result_rows=result_rows)
+    monkeypatch.setattr(postgres_client, "get_pool", lambda: _FakePool(conn))
+    rows = [{"id": str(index), "value": index} for index in range(len(result_rows))]
+    query = TableQuery("upsert_status_test").upsert(rows, on_conflict="id", returning=returning)
+    return query, query.execute()
+
+
+def test_upsert_reports_inserted_and_updated_rows_without_leaking_status(monkeypatch):
+    from postgres_client import UPSERT_STATUS_COLUMN
+
+    query, result = _run_upsert(
+        monkeypatch,
+        [{"id": "0", UPSERT_STATUS_COLUMN: True}, {"id": "1", UPSERT_STATUS_COLUMN: False}],
+        returning="id",
+    )
+    assert UPSERT_STATUS_COLUMN in _identifiers(query._build_upsert())
+    assert (result.inserted, result.updated) == (1, 1)
+    assert result.statuses == ["inserted", "updated"]
+    assert result.data == [{"id": "0"}, {"id": "1"}]
+
+
+def test_upsert_without_returning_still_counts_statuses(monkeypatch):
+    from postgres_client import UPSERT_STATUS_COLUMN
+
+    query, result = _run_upsert(monkeypatch, [{UPSERT_STATUS_COLUMN: False}])
+    # Sem returning, o RETURNING traz só a coluna de status.
+    assert _identifiers(query._build_upsert()) == {"upsert_status_test", "id", "value", UPSERT_STATUS_COLUMN}
+    assert result.data == []
+    assert (result.inserted, result.updated, result.statuses) == (0, 1, ["updated"])
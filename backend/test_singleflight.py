@@ -0,0 +1,65 @@
+"""
+Tests for single-flight de-duplication of concurrent identical calls.
+"""
+
+import copy
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test_shared")
+    executions = []
+
+    def fetch():
+        executions.append(1)
+        time.sleep(0.1)
+        return {"data": [1, 2]}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(flight.do("k", fetch, clone=copy.deepcopy)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(executions) == 1
+    assert results == [{"data": [1, 2]}] * 5
+    # Cada chamador recebe sua própria cópia.
+    assert len({id(result) for result in results}) == 5
+    assert flight.stats() == {"executed": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_errors_propagate_to_waiters_and_key_is_released():
+    flight = SingleFlight("test_errors")
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        time.sleep(0.05)
+        raise ValueError("boom")
+
+    errors = []
+
+    def follower():
+        started.wait()
+        try:
+            flight.do("k", lambda: "unused")
+        except ValueError as err:
+            errors.append(err)
+
+    thread = threading.Thread(target=follower)
+    thread.start()
+    with pytest.raises(ValueError):
+        flight.do("k", failing)
+    thread.join()
+
+    assert len(errors) == 1
+    assert flight.do("k", lambda: "fresh") == "fresh"
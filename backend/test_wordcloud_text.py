@@ -0,0 +1,19 @@
+from jobs.instagram_comments_ingest import iterate_comment_tokens
+from wordcloud_text import count_wordcloud_tokens, sanitize_wordcloud_token, tokenize_wordcloud_text
+
+
+def test_tokenizer_rules():
+    text = "Amei a promoção!! @loja #Promoção https://x.co/abc você AMEI"
+    assert tokenize_wordcloud_text(text) == ["amei", "promoção", "promoção", "amei"]
+    assert sanitize_wordcloud_token("Você") is None
+    assert count_wordcloud_tokens(text) == {"amei": 2, "promoção": 2}
+
+
+def test_comment_tokens_rows_carry_occurrences():
+    comments = [
+        {"id": "c1", "text": "bolo bolo gostoso", "timestamp": "2024-05-01T10:00:00+00:00"},
+        {"id": "c2", "text": "sem data", "timestamp": None},
+    ]
+    rows = sorted(iterate_comment_tokens("ig1", comments), key=lambda row: row["token"])
+    assert [(row["token"], row["occurrences"]) for row in rows] == [("bolo", 2), ("gostoso", 1)]
+    assert {row["comment_id"] for row in rows} == {"c1"}
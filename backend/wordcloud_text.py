@@ -0,0 +1,77 @@
+# backend/wordcloud_text.py
+"""
+Regras de tokenização da nuvem de palavras (comentários Instagram/Facebook).
+
+Ficam fora do server para que os jobs de ingestão indexem os comentários com as
+mesmas regras que os endpoints usam na consulta.
+"""
+
+import re
+import unicodedata
+from collections import Counter
+from typing import List, Optional
+
+WORDCLOUD_MIN_TOKEN_LEN = 3
+WORDCLOUD_STOPWORDS = {
+    "a", "as", "o", "os", "um", "uma", "uns", "umas",
+    "de", "do", "da", "dos", "das", "em", "no", "na", "nos", "nas",
+    "para", "por", "pra", "pro", "com", "sem", "que", "quem", "qual", "quais",
+    "como", "onde", "quando", "porque", "pois", "isso", "isto", "aquele", "aquela",
+    "aqueles", "aquelas", "este", "esta", "estes", "estas", "esse", "essa", "esses", "essas",
+    "ele", "ela", "eles", "elas", "eu", "tu", "voce", "voces", "nos", "nosso", "nossa", "nossos", "nossas",
+    "seu", "sua", "seus", "suas", "meu", "minha", "meus", "minhas", "dele", "dela", "deles", "delas",
+    "mais", "menos", "muito", "muita", "muitos", "muitas", "todo", "toda", "todos", "todas",
+    "ja", "foi", "era", "sao", "sou", "estou", "esta", "estao", "tem", "ter", "ser",
+    "vai", "vao", "vou", "fui", "sido", "havia", "haviam",
+    "bem", "mal", "sim", "nao", "opa", "ola", "oi", "alguem", "ninguem",
+    "se", "so", "ta", "vc", "vcs", "ces",
+    "the", "and", "for", "with", "you", "your", "yours", "from", "this", "that", "was", "are", "were", "been", "have", "has",
+    "to", "of", "in", "on", "at", "by", "or", "an", "is", "be", "it", "its", "we", "us", "our", "ours", "they", "them", "their", "theirs",
+    "https", "http", "www"
+}
+
+def strip_accents(text: str) -> str:
+    normalized = unicodedata.normalize("NFD", text)
+    return "".join(ch for ch in normalized if unicodedata.category(ch) != "Mn")
+
+
+def sanitize_wordcloud_token(token: str) -> Optional[str]:
+    if not token:
+        return None
+    candidate = str(token).strip().lower()
+    if not candidate:
+        return None
+    cleaned = "".join(ch for ch in candidate if ch.isalpha())
+    if len(cleaned) < WORDCLOUD_MIN_TOKEN_LEN:
+        return None
+    base = strip_accents(cleaned)
+    if cleaned in WORDCLOUD_STOPWORDS or base in WORDCLOUD_STOPWORDS:
+        return None
+    return cleaned
+
+
+def tokenize_wordcloud_text(text: str) -> List[str]:
+    if not text:
+        return []
+    lowered = text.lower()
+    lowered = re.sub(r"https?://\S+|www\.\S+", " ", lowered)
+    lowered = lowered.replace("&amp;", " ")
+    lowered = re.sub(r"\s+", " ", lowered)
+    tokens = lowered.split()
+    words: List[str] = []
+    for token in tokens:
+        if not token:
+            continue
+        if token.startswith("@"):
+            continue
+        if token.startswith("#"):
+            token = token[1:]
+        sanitized = sanitize_wordcloud_token(token)
+        if sanitized:
+            words.append(sanitized)
+    return words
+
+
+def count_wordcloud_tokens(text: str) -> Counter:
+    """Ocorrências de cada token do texto (mesmas regras de tokenize_wordcloud_text)."""
+    return Counter(tokenize_wordcloud_text(text))